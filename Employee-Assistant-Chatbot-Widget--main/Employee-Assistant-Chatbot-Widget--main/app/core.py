@@ -3,18 +3,20 @@
 import os
 import smtplib
 import json
+import threading
+import time
 from datetime import date, timedelta
 from email.message import EmailMessage
 from langchain.vectorstores import FAISS
-from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain.chat_models import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import util
 import torch
 from dotenv import load_dotenv
 import mimetypes
+from .models import registry, DEFAULT_MODEL
 
 load_dotenv()
 
@@ -22,17 +24,24 @@ load_dotenv()
 conversation_state = {}
 
 # --- Helper Functions ---
+_employee_index = {"mtime": None, "by_id": {}}
+
+def _load_employee_index(path="data/employees.json"):
+    # Re-read employees.json only when it changes; lookups are a dict hit
+    mtime = os.path.getmtime(path)
+    if mtime != _employee_index["mtime"]:
+        with open(path, 'r') as f:
+            employees = json.load(f)
+        _employee_index["by_id"] = {emp["employee_id"].lower(): emp for emp in employees}
+        _employee_index["mtime"] = mtime
+    return _employee_index["by_id"]
+
 def get_employee_data(employee_id):
     try:
-        with open("data/employees.json", 'r') as f:
-            employees = json.load(f)
-            for emp in employees:
-                if emp["employee_id"].lower() == employee_id.lower():
-                    return emp
+        return _load_employee_index().get(employee_id.strip().lower())
     except Exception as e:
         print(f"Error reading employee data: {e}")
         return None
-    return None
 
 def send_email(to_address, subject, body, attachment_path=None):
     # Load credentials from the .env file
@@ -95,14 +104,19 @@ CUSTOM_PROMPT = PromptTemplate(
 
 # --- Main Chatbot Class ---
 class ChatbotCore:
-    def __init__(self, faiss_path="data/mpc_faiss_index"):
+    def __init__(self, faiss_path="data/mpc_faiss_index", faq_path="data/faqs.json", models=registry):
+        # Models, the FAISS index and the LLM chain are loaded on first use
+        # (or by warm_up()); one shared encoder serves retrieval and FAQs.
         print("Initializing ChatbotCore...")
-        self._load_models(faiss_path)
+        self.faiss_path = faiss_path
+        self.models = models
+        self.qa_chain = None
+        self.faq_embeddings = None
+        self._lock = threading.Lock()
         self.memory = ConversationBufferMemory(
             memory_key="chat_history", return_messages=True, output_key="answer"
         )
-        self._setup_chains()
-        self._setup_manual_qa()
+        self._setup_manual_qa(faq_path)
         print("✅ ChatbotCore Initialized.")
     
     def reset_conversation_state(self):
@@ -111,20 +125,20 @@ class ChatbotCore:
         print("Conversation task state cleared.")
 
     def _load_models(self, faiss_path):
-    self.embedding_model = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-    self.db = FAISS.load_local(
-        faiss_path, self.embedding_model, allow_dangerous_deserialization=True
-    )
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise ValueError("GROQ_API_KEY environment variable not set.")
-    self.llm = ChatOpenAI(
-        openai_api_key=api_key,
-        model_name="mixtral-8x7b-32768",  # or other Groq models
-        base_url="https://api.groq.com/openai/v1",
-        temperature=0.2,
-        max_tokens=512
-    )
+        self.embedding_model = self.models.embeddings(DEFAULT_MODEL)
+        self.db = FAISS.load_local(
+            faiss_path, self.embedding_model, allow_dangerous_deserialization=True
+        )
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY environment variable not set.")
+        self.llm = ChatOpenAI(
+            openai_api_key=api_key,
+            model_name="mixtral-8x7b-32768",  # or other Groq models
+            base_url="https://api.groq.com/openai/v1",
+            temperature=0.2,
+            max_tokens=512
+        )
 
     def _setup_chains(self):
         self.qa_chain = ConversationalRetrievalChain.from_llm(
@@ -134,18 +148,35 @@ class ChatbotCore:
             combine_docs_chain_kwargs={"prompt": CUSTOM_PROMPT}
         )
 
-    def _setup_manual_qa(self):
-        faq_path = "data/faqs.json"
+    def _setup_manual_qa(self, faq_path):
         try:
             with open(faq_path, 'r') as f:
                 self.manual_qa = json.load(f)
             print("✅ Manual FAQs loaded successfully from faqs.json.")
         except Exception:
             self.manual_qa = {}
-        
-        self.faq_encoder = SentenceTransformer('all-MiniLM-L6-v2')
         self.faq_questions = list(self.manual_qa.keys())
-        self.faq_embeddings = self.faq_encoder.encode(self.faq_questions, convert_to_tensor=True)
+
+    def _ensure_faq_embeddings(self):
+        if self.faq_embeddings is None:
+            with self._lock:
+                if self.faq_embeddings is None:
+                    self.faq_encoder = self.models.get(DEFAULT_MODEL)
+                    self.faq_embeddings = self.faq_encoder.encode(self.faq_questions, convert_to_tensor=True)
+
+    def _ensure_qa_chain(self):
+        if self.qa_chain is None:
+            with self._lock:
+                if self.qa_chain is None:
+                    self._load_models(self.faiss_path)
+                    self._setup_chains()
+
+    def warm_up(self):
+        """Load everything now instead of on the first question; returns load time and memory."""
+        started = time.perf_counter()
+        self._ensure_faq_embeddings()
+        self._ensure_qa_chain()
+        return dict(self.models.info(), warm_up_seconds=round(time.perf_counter() - started, 2))
 
     def get_memory(self):
         return self.memory
@@ -153,6 +184,7 @@ class ChatbotCore:
     def _get_manual_answer(self, query, threshold=0.75):
         if not self.faq_questions:
             return None
+        self._ensure_faq_embeddings()
         query_embedding = self.faq_encoder.encode(query, convert_to_tensor=True)
         cosine_scores = util.pytorch_cos_sim(query_embedding, self.faq_embeddings)[0]
         top_result = torch.topk(cosine_scores, k=1)
@@ -313,5 +345,6 @@ class ChatbotCore:
         if manual_answer:
             return manual_answer
         
+        self._ensure_qa_chain()
         result = self.qa_chain.invoke({"question": query})
         return result['answer']
\ No newline at end of file
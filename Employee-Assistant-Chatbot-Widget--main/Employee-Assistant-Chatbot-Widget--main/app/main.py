@@ -30,6 +30,14 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory="static"), name="static")
 chatbot = ChatbotCore()
 
+@app.post("/warmup")
+def warm_up():
+    """Load the models before the first question; reports load time and memory (RSS)."""
+    try:
+        return JSONResponse(content=chatbot.warm_up())
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
 @app.post("/chat")
 async def handle_chat(request: Request):
     """Handle incoming chat messages."""
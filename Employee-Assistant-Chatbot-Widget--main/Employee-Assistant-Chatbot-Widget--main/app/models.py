@@ -0,0 +1,88 @@
+# In app/models.py
+
+import os
+import threading
+import time
+from langchain.embeddings.base import Embeddings
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+
+def current_rss_mb():
+    """Resident memory of this process in MB (peak RSS where /proc is unavailable, None on Windows)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+# --- LangChain adapter over a shared model ---
+class SharedSentenceEmbeddings(Embeddings):
+    """
+    Same vectors as SentenceTransformerEmbeddings (so the saved FAISS index
+    still matches), but backed by a registry model instead of a private copy.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def embed_documents(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.model.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# --- Model Registry ---
+def load_sentence_transformer(name):
+    # Imported here: sentence_transformers pulls in torch, which is slow to import
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+class ModelRegistry:
+    """Loads each sentence-transformer model once per process, on first use."""
+
+    def __init__(self, loader=load_sentence_transformer):
+        self.loader = loader
+        self._models = {}
+        self._lock = threading.Lock()
+        self.loads = {}
+
+    def get(self, name=DEFAULT_MODEL):
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    print(f"Loading model {name}...")
+                    rss_before, started = current_rss_mb(), time.perf_counter()
+                    model = self.loader(name)
+                    self.loads[name] = {
+                        "load_seconds": round(time.perf_counter() - started, 2),
+                        "rss_added_mb": (round(current_rss_mb() - rss_before, 1)
+                                         if rss_before is not None else None),
+                    }
+                    self._models[name] = model
+                    print(f"✅ Model {name} loaded in {self.loads[name]['load_seconds']}s.")
+        return model
+
+    def embeddings(self, name=DEFAULT_MODEL):
+        return SharedSentenceEmbeddings(self.get(name))
+
+    def info(self):
+        return {"models": dict(self.loads), "rss_mb": current_rss_mb()}
+
+
+registry = ModelRegistry()
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import numpy as np
+
+from app.models import DEFAULT_MODEL, ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.append(texts)
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+class CountingLoader:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.loaded = []
+
+    def __call__(self, name):
+        time.sleep(self.delay)
+        self.loaded.append(name)
+        return FakeModel(name)
+
+
+def test_nothing_is_loaded_until_first_use():
+    loader = CountingLoader()
+    registry = ModelRegistry(loader)
+    assert loader.loaded == [] and registry.info()['models'] == {}
+    model = registry.get()
+    assert registry.get(DEFAULT_MODEL) is model
+    assert loader.loaded == [DEFAULT_MODEL]
+    assert set(registry.info()['models'][DEFAULT_MODEL]) == {'load_seconds', 'rss_added_mb'}
+
+
+def test_concurrent_first_uses_load_once():
+    loader = CountingLoader(delay=0.05)
+    registry = ModelRegistry(loader)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.loaded == [DEFAULT_MODEL]
+    assert all(model is models[0] for model in models)
+
+
+def test_embeddings_share_the_registry_model():
+    loader = CountingLoader()
+    registry = ModelRegistry(loader)
+    embeddings = registry.embeddings()
+    assert embeddings.model is registry.get()
+    assert embeddings.embed_query('dress\ncode') == [10.0, 1.0]
+    assert embeddings.embed_documents(['a', 'bb']) == [[1.0, 1.0], [2.0, 1.0]]
+    assert registry.get().encoded[0] == ['dress code']
+    registry.get('other-model')
+    assert loader.loaded == [DEFAULT_MODEL, 'other-model']
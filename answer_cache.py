@@ -0,0 +1,223 @@
+"""
+Answer Cache - Two-tier cache of chatbot answers
+================================================
+
+Staff keep asking the same few questions (leave types, transfer status,
+how to navigate), and each one used to cost a full Groq round-trip.
+AnswerCache stores LLM answers per role and answers repeats locally:
+
+1. Exact tier: the question is normalized (NFKC, lower case, punctuation
+   stripped, whitespace collapsed) and looked up in a dict.
+2. Semantic tier: the question is embedded and compared by cosine
+   similarity with the cached questions of the same role. The best match
+   at or above `threshold` is served.
+
+The default embedder, HashingEmbedder, hashes the word unigrams/bigrams
+and in-word character trigrams of the non-stop-words into a fixed-size,
+L2-normalized NumPy vector, so it needs no model download. Paraphrases
+("what leave types are there" / "which leave types are available") then
+score 1.0, while questions differing in a content word ("pending" /
+"approved" transfers) stay near 0.6. Any callable mapping a string to a
+unit vector can be passed instead (e.g. a sentence-transformers encoder).
+
+Each role has its own partition: an OrderedDict for LRU order plus a
+preallocated (maxsize x dim) float32 matrix, so the semantic lookup is a
+single matrix-vector product. Entries expire after `ttl` seconds. Each
+gunicorn worker keeps its own cache.
+
+Answers generated from live figures are only valid for those figures:
+get() and put() take the `version` of the data they were generated from
+(DataContext.version()), and an entry stored under another version is
+dropped on lookup instead of served, whichever tier matched it.
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+# Question phrasing that carries no meaning for matching. Negations are kept.
+STOP_WORDS = frozenset('''
+    a an the is are am was were be been do does did i me my we our you your it its
+    this that these those there here what which who whom how can could would should
+    will shall may might please tell show give for of to in on at by with about from
+    and or any some all available
+'''.split())
+
+
+def normalize_question(text):
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class HashingEmbedder:
+    """Signed feature hashing of word and character n-grams into `dim` floats."""
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    def _features(self, text):
+        words = [word for word in text.split() if word not in STOP_WORDS] or text.split()
+        yield from (('w', word) for word in words)
+        yield from (('b', a + ' ' + b) for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f'<{word}>'
+            yield from (('c', padded[i:i + 3]) for i in range(len(padded) - 2))
+
+    def __call__(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for kind, feature in self._features(normalize_question(text)):
+            digest = hashlib.blake2b(f'{kind}:{feature}'.encode('utf-8'), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            # Words carry more meaning than trigrams; the top bit picks the sign
+            weight = 1.0 if kind == 'c' else 2.0
+            vector[value % self.dim] += weight if value >> 63 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class _Partition:
+    """LRU entries of one role, with their question vectors in a fixed matrix."""
+
+    def __init__(self, maxsize, dim):
+        self.entries = OrderedDict()  # normalized question -> entry
+        self.vectors = np.zeros((maxsize, dim), dtype=np.float32)
+        self.live = np.zeros(maxsize, dtype=bool)
+        self.free = list(range(maxsize - 1, -1, -1))
+        self.keys = [None] * maxsize  # slot -> normalized question
+
+    def remove(self, key):
+        entry = self.entries.pop(key)
+        self.live[entry['slot']] = False
+        self.keys[entry['slot']] = None
+        self.free.append(entry['slot'])
+
+    def add(self, key, vector, entry):
+        if key in self.entries:
+            self.remove(key)
+        if not self.free:
+            self.remove(next(iter(self.entries)))
+        slot = self.free.pop()
+        self.vectors[slot] = vector
+        self.live[slot] = True
+        self.keys[slot] = key
+        entry['slot'] = slot
+        self.entries[key] = entry
+
+
+class AnswerCache:
+    """Per-role LRU of chatbot answers with exact and embedding-similarity lookups."""
+
+    def __init__(self, maxsize=256, ttl=600, threshold=0.85, embedder=None, dim=1024):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.embedder = embedder or HashingEmbedder(dim)
+        self.dim = getattr(self.embedder, 'dim', dim)
+        self._partitions = {}
+        self._lock = threading.Lock()
+        self.stats = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'stores': 0,
+                      'expired': 0, 'outdated': 0, 'lookup_ms': 0.0}
+
+    def _partition(self, role):
+        partition = self._partitions.get(role)
+        if partition is None:
+            partition = self._partitions[role] = _Partition(self.maxsize, self.dim)
+        return partition
+
+    def _fresh(self, partition, key, now, version):
+        entry = partition.entries.get(key)
+        if entry is None:
+            return None
+        if entry['expires_at'] <= now:
+            partition.remove(key)
+            self.stats['expired'] += 1
+            return None
+        if entry['version'] != version:
+            partition.remove(key)
+            self.stats['outdated'] += 1
+            return None
+        partition.entries.move_to_end(key)
+        return entry
+
+    def get(self, question, role='', version=None):
+        """
+        Return {'answer', 'tier', 'similarity', 'question'} for a cached
+        answer to `question` generated from data `version`, or None.
+        """
+        started = time.perf_counter()
+        key = normalize_question(question)
+        if not key:
+            return None
+        now = time.monotonic()
+        try:
+            with self._lock:
+                partition = self._partition(role)
+                entry = self._fresh(partition, key, now, version)
+                if entry is not None:
+                    self.stats['exact_hits'] += 1
+                    return {'answer': entry['answer'], 'tier': 'exact', 'similarity': 1.0, 'question': key}
+                if not partition.entries:
+                    self.stats['misses'] += 1
+                    return None
+
+            vector = self.embedder(key)
+            with self._lock:
+                partition = self._partition(role)
+                scores = partition.vectors @ vector
+                scores[~partition.live] = -1.0
+                slot = int(np.argmax(scores))
+                similarity = float(scores[slot])
+                if similarity >= self.threshold:
+                    match = partition.keys[slot]
+                    entry = self._fresh(partition, match, now, version) if match is not None else None
+                    if entry is not None:
+                        self.stats['semantic_hits'] += 1
+                        return {'answer': entry['answer'], 'tier': 'semantic',
+                                'similarity': round(similarity, 3), 'question': match}
+                self.stats['misses'] += 1
+                return None
+        finally:
+            self.stats['lookup_ms'] += (time.perf_counter() - started) * 1000
+
+    def put(self, question, answer, role='', version=None):
+        key = normalize_question(question)
+        if not key or not answer:
+            return
+        vector = self.embedder(key)
+        with self._lock:
+            self._partition(role).add(key, vector, {
+                'answer': answer,
+                'version': version,
+                'expires_at': time.monotonic() + self.ttl
+            })
+            self.stats['stores'] += 1
+
+    def clear(self, role=None):
+        with self._lock:
+            if role is None:
+                self._partitions.clear()
+            else:
+                self._partitions.pop(role, None)
+
+    def info(self):
+        with self._lock:
+            hits = self.stats['exact_hits'] + self.stats['semantic_hits']
+            lookups = hits + self.stats['misses']
+            return dict(
+                self.stats,
+                lookup_ms=round(self.stats['lookup_ms'], 1),
+                avg_lookup_ms=round(self.stats['lookup_ms'] / lookups, 3) if lookups else None,
+                hit_rate=round(hits / lookups, 3) if lookups else None,
+                threshold=self.threshold,
+                ttl=self.ttl,
+                partitions={role: len(p.entries) for role, p in self._partitions.items()}
+            )
@@ -0,0 +1,168 @@
+"""
+Audit Writer - Background, batched persistence of login audit entries
+=====================================================================
+
+log_login_attempt() builds the audit entry inside the request and hands it
+to an AuditWriter, which queues it and returns immediately. A daemon thread
+drains the queue and passes batches to a sink callable (MongoDB insert_many
+with the JSONL store as fallback) whenever `batch_size` entries are waiting
+or `flush_interval` seconds have passed, so login latency no longer depends
+on audit storage latency.
+
+Backpressure: the queue is bounded. When it is full, submit() waits up to
+`put_timeout` seconds for room and then writes the entry synchronously, so
+entries are never dropped; the caller just pays the storage cost.
+close() is registered with atexit and drains whatever is still queued.
+
+Failures: a batch the sink rejects is passed to `fallback(entries)` (the
+app queues it for replay to MongoDB). If there is no fallback or it fails
+too, the entries are held and retried with the next flush; only entries
+beyond `max_queue` held ones are dropped (and counted as `failed`).
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """Bounded in-process queue flushed to `sink(entries)` in batches."""
+
+    def __init__(self, sink, max_queue=10000, batch_size=100,
+                 flush_interval=1.0, put_timeout=0.05, fallback=None):
+        self.sink = sink
+        self.fallback = fallback
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._held = []  # entries neither the sink nor the fallback took
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'sync_writes': 0,
+                      'fallback_writes': 0, 'retried': 0, 'failed': 0}
+
+    def _count(self, stat, n=1):
+        with self._stats_lock:
+            self.stats[stat] += n
+
+    def info(self):
+        with self._stats_lock:
+            return dict(self.stats, held=len(self._held), queue_size=self._queue.qsize())
+
+    def _ensure_started(self):
+        """Start the flusher thread in the current process (fork-safe)."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, entry):
+        """Queue an entry for writing; falls back to a synchronous write when saturated."""
+        if self._closed:
+            self._write([entry])
+            self._count('sync_writes')
+            return
+        self._ensure_started()
+        try:
+            self._queue.put(entry, timeout=self.put_timeout)
+            self._count('queued')
+        except queue.Full:
+            logger.warning("⚠️ Audit queue full, writing entry synchronously")
+            self._write([entry])
+            self._count('sync_writes')
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._write(self._take_held() + batch)
+
+    def _take_held(self):
+        with self._stats_lock:
+            held, self._held = self._held, []
+            self.stats['retried'] += len(held)
+        return held
+
+    def _next_batch(self):
+        """Collect up to batch_size entries, waiting at most flush_interval."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Shutdown sentinel: write what we have, then stop
+                self._write(self._take_held() + batch)
+                return None
+            batch.append(entry)
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self.sink(batch)
+            self._count('written', len(batch))
+            self._count('batches')
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to write {len(batch)} audit entries: {e}")
+        if self.fallback is not None:
+            try:
+                self.fallback(batch)
+                self._count('fallback_writes', len(batch))
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Audit fallback failed for {len(batch)} entries: {e}")
+        with self._stats_lock:
+            self._held.extend(batch)
+            dropped = len(self._held) - self.max_queue
+            if dropped > 0:
+                del self._held[:dropped]
+                self.stats['failed'] += dropped
+        if dropped > 0:
+            logger.error(f"Dropped {dropped} audit entries that could not be written")
+
+    def close(self, timeout=5.0):
+        """Stop accepting queued work and drain the queue (called at exit)."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        # Anything submitted after the sentinel is written here
+        leftovers = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                leftovers.append(entry)
+        self._write(self._take_held() + leftovers)
+        if self._held:
+            logger.error(f"Could not write {len(self._held)} audit entries before exit")
@@ -0,0 +1,232 @@
+"""
+Micro-benchmarks for the Employee Management System hot paths
+==============================================================
+
+Run: python benchmarks.py [name ...]
+
+Each benchmark times the previous implementation against the current one on
+a representative workload and prints per-call cost. Most benchmarks only
+import the framework-free helper modules. require_auth goes through the app
+itself: it imports unified_app with MongoDB disabled (unless MONGO_URI is
+set) inside a scratch directory, so its file stores start empty.
+"""
+
+import sys
+import timeit
+
+SAMPLE_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0',
+]
+
+
+def _report(name, calls, before, after):
+    print(f"{name}:")
+    print(f"  before: {before / calls * 1e6:8.2f} µs/call")
+    print(f"  after:  {after / calls * 1e6:8.2f} µs/call")
+    print(f"  speedup: {before / after:6.1f}x\n")
+
+
+def legacy_parse_user_agent(user_agent_string):
+    """The substring-chain parser user_agent.py replaced."""
+    if not user_agent_string:
+        return {'device_type': 'unknown', 'browser': 'unknown', 'os': 'unknown'}
+    ua = user_agent_string.lower()
+    if 'mobile' in ua or 'android' in ua or 'iphone' in ua:
+        device_type = 'mobile'
+    elif 'tablet' in ua or 'ipad' in ua:
+        device_type = 'tablet'
+    else:
+        device_type = 'desktop'
+    if 'chrome' in ua and 'edge' not in ua:
+        browser = 'Chrome'
+    elif 'firefox' in ua:
+        browser = 'Firefox'
+    elif 'safari' in ua and 'chrome' not in ua:
+        browser = 'Safari'
+    elif 'edge' in ua:
+        browser = 'Edge'
+    else:
+        browser = 'Unknown'
+    if 'windows' in ua:
+        os_name = 'Windows'
+    elif 'mac' in ua:
+        os_name = 'macOS'
+    elif 'linux' in ua:
+        os_name = 'Linux'
+    elif 'android' in ua:
+        os_name = 'Android'
+    elif 'ios' in ua:
+        os_name = 'iOS'
+    else:
+        os_name = 'Unknown'
+    return {'device_type': device_type, 'browser': browser, 'os': os_name}
+
+
+def bench_user_agent(rounds=20000):
+    """Per-login user agent classification."""
+    from user_agent import classify_user_agent
+
+    def run(parse):
+        for ua in SAMPLE_USER_AGENTS:
+            parse(ua)
+
+    calls = rounds * len(SAMPLE_USER_AGENTS)
+    before = timeit.timeit(lambda: run(legacy_parse_user_agent), number=rounds)
+    after = timeit.timeit(lambda: run(classify_user_agent), number=rounds)
+    _report('parse_user_agent', calls, before, after)
+
+
+def bench_require_auth(rounds=5000):
+    """
+    An authenticated request to a @token_required endpoint, through the
+    Flask test client: the original decorator (jwt.decode on every call)
+    against the app's require_auth/verify_token with its token cache and
+    revocation list.
+    """
+    import os
+    import tempfile
+
+    # The app's file stores use relative paths, so stay in the scratch directory
+    scratch = tempfile.TemporaryDirectory()
+    cwd = os.getcwd()
+    os.environ.setdefault('MONGO_URI', '')
+    os.chdir(scratch.name)
+    try:
+        _bench_app_auth(rounds)
+    finally:
+        os.chdir(cwd)
+        scratch.cleanup()
+
+
+def _bench_app_auth(rounds):
+    import datetime
+    from functools import wraps
+    import jwt
+    from flask import jsonify, request
+    import unified_app
+
+    app = unified_app.app
+
+    def legacy_require_auth(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            token = request.headers.get('Authorization')
+            if not token:
+                return jsonify({'error': 'No token provided'}), 401
+            try:
+                if token.startswith('Bearer '):
+                    token = token[7:]
+                payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+                return f(payload, *args, **kwargs)
+            except jwt.ExpiredSignatureError:
+                return jsonify({'error': 'Token expired'}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({'error': 'Invalid token'}), 401
+        return decorated
+
+    def whoami(current_user):
+        return current_user['username']
+
+    app.add_url_rule('/benchmark/legacy-auth', 'benchmark_legacy_auth', legacy_require_auth(whoami))
+    app.add_url_rule('/benchmark/auth', 'benchmark_auth', unified_app.token_required(whoami))
+
+    token = jwt.encode({
+        'userId': '1', 'username': 'admin', 'role': 'CEO',
+        'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    }, app.config['SECRET_KEY'], algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    def call(path):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.status_code
+
+    _report('@token_required request', rounds,
+            timeit.timeit(lambda: call('/benchmark/legacy-auth'), number=rounds),
+            timeit.timeit(lambda: call('/benchmark/auth'), number=rounds))
+
+
+SAMPLE_CHAT_MESSAGES = [
+    'how do I find an employee by school?',
+    'what is the status of my transfer request',
+    'how many casual leave days do I get',
+    'where can I see the login analytics report',
+    'is the database backed up every day?',
+    'thanks, that is all for now',
+]
+
+
+def legacy_chatbot_fallback_intent(message):
+    """The if-chain generate_chatbot_response_fallback() used before intent_router.py."""
+    message_lower = message.lower()
+    if 'employee' in message_lower and ('search' in message_lower or 'find' in message_lower):
+        return 'employee_search'
+    if 'transfer' in message_lower:
+        return 'transfer'
+    if 'leave' in message_lower or 'holiday' in message_lower:
+        return 'leave'
+    if 'dashboard' in message_lower or 'feature' in message_lower or 'navigate' in message_lower or 'how to' in message_lower:
+        return 'navigation'
+    if 'report' in message_lower or 'analytics' in message_lower or 'statistics' in message_lower:
+        return 'reports'
+    if 'login' in message_lower or 'security' in message_lower or 'access' in message_lower:
+        return 'security'
+    if 'data' in message_lower or 'database' in message_lower or 'backup' in message_lower:
+        return 'data'
+    if 'employee id' in message_lower or 'emp id' in message_lower:
+        return 'employee_id'
+    if 'status' in message_lower or 'health' in message_lower:
+        return 'status'
+    return None
+
+
+def bench_intent_router(rounds=5000):
+    """Chatbot fallback intent matching, and its cost as the rule set grows."""
+    import random
+    import string
+    from intent_router import CHATBOT_ROUTER, IntentRouter, Rule
+
+    for message in SAMPLE_CHAT_MESSAGES:
+        assert CHATBOT_ROUTER.route(message) == legacy_chatbot_fallback_intent(message), message
+
+    def run(route):
+        for message in SAMPLE_CHAT_MESSAGES:
+            route(message)
+
+    calls = rounds * len(SAMPLE_CHAT_MESSAGES)
+    before = timeit.timeit(lambda: run(legacy_chatbot_fallback_intent), number=rounds)
+    after = timeit.timeit(lambda: run(CHATBOT_ROUTER.route), number=rounds)
+    _report('chatbot fallback intent (9 rules)', calls, before, after)
+
+    # Synthetic rule sets, three random keywords per rule: the compiled
+    # if-chain against the automaton IntentRouter switches to past
+    # CHAIN_MAX_KEYWORDS keywords
+    rng = random.Random(42)
+    for n_rules in (10, 30, 100, 1000):
+        rules = [Rule(f'intent{i}', keywords=tuple(''.join(rng.choices(string.ascii_lowercase, k=7))
+                                                   for _ in range(3)))
+                 for i in range(n_rules)]
+        chain = IntentRouter(rules, chain_max_keywords=len(rules) * 3)
+        automaton = IntentRouter(rules, chain_max_keywords=0)
+        n = max(rounds * 10 // n_rules, 20)
+        _report(f'intent matching, if-chain -> automaton ({n_rules} rules)', n * len(SAMPLE_CHAT_MESSAGES),
+                timeit.timeit(lambda: run(chain.route), number=n),
+                timeit.timeit(lambda: run(automaton.route), number=n))
+
+
+BENCHMARKS = {
+    'user_agent': bench_user_agent,
+    'require_auth': bench_require_auth,
+    'intent_router': bench_intent_router,
+}
+
+
+if __name__ == '__main__':
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
@@ -0,0 +1,266 @@
+"""
+Chat Sessions - Bounded per-session chatbot conversation history
+================================================================
+
+The chatbot used to send Groq only the system prompt and the latest
+message, so follow-up questions ("and for casual leave?") lost their
+context. ConversationStore keeps recent turns per session, keyed by the
+JWT user (or a server-issued guest session id for anonymous callers):
+
+- Sessions are shared by every gunicorn worker: one document per session
+  in the `chat_sessions` collection, expired by a TTL index on
+  `expires_at`, or one JSON file per session under `directory` while
+  MongoDB is unavailable. Sessions idle for longer than `ttl` seconds are
+  dropped (TTL index / a periodic sweep of the files).
+- Each session's history is kept under `history_tokens` (estimated at
+  4 characters per token). When a new turn pushes it over, the oldest
+  turns are folded into a short extractive summary ("User asked ... /
+  Assistant: <first sentence>") capped at `summary_tokens`. That summary
+  is sent as a second system message instead of the old transcript.
+- Two workers appending to one session at once do not lose a turn:
+  MongoDB writes are a compare-and-set on a `version` field, retried
+  after a short random backoff so contending writers spread out; file
+  writes happen under an flock.
+
+Sessions written to files during an outage are not copied to MongoDB;
+history is short-lived, so such a conversation simply restarts.
+
+Guest session ids are issued by the server and signed
+(`new_guest_session_id` / `check_guest_session_id`), so a caller cannot
+pick, guess or reuse someone else's conversation. Each issued id becomes
+a stored session on its first turn, so the app caps how many it issues
+per client IP and in total (see chatbot_caller in unified_app.py).
+"""
+
+import datetime
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import threading
+import time
+
+from login_log_store import file_lock
+from mongo_connection import usable
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+CAS_ATTEMPTS = 8
+CAS_BACKOFF = 0.002  # seconds; doubled after each conflict
+
+
+def estimate_tokens(text):
+    return max(1, (len(text or '') + 3) // 4)
+
+
+def _first_sentence(text, max_words=20):
+    sentence = _SENTENCE_END.split((text or '').strip(), maxsplit=1)[0]
+    words = sentence.split()
+    return ' '.join(words[:max_words]) + (' ...' if len(words) > max_words else '')
+
+
+def _sign(secret, token):
+    return hmac.new(secret.encode('utf-8'), token.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+
+def new_guest_session_id(secret):
+    """Return a fresh signed guest session id."""
+    token = secrets.token_urlsafe(16)
+    return f"{token}.{_sign(secret, token)}"
+
+
+def check_guest_session_id(secret, session_id):
+    """True if `session_id` was issued by new_guest_session_id with `secret`."""
+    token, _, signature = str(session_id or '').partition('.')
+    return bool(token) and hmac.compare_digest(signature, _sign(secret, token))
+
+
+class ConversationStore:
+    """Shared conversation histories with idle TTL and token-budgeted truncation."""
+
+    def __init__(self, collection=None, directory='logs/chat_sessions', ttl=1800,
+                 history_tokens=1500, summary_tokens=200, sweep_interval=60):
+        self.collection = collection
+        self.directory = directory
+        self.ttl = ttl
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0
+        self._file_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'turns': 0, 'summarized_turns': 0, 'resets': 0, 'conflicts': 0}
+        os.makedirs(directory, exist_ok=True)
+        if collection is not None:
+            try:
+                collection.create_index('expires_at', expireAfterSeconds=0)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create chat session index: {e}")
+
+    def _count(self, stat, n=1):
+        with self._stats_lock:
+            self.stats[stat] += n
+
+    # ---------- storage ----------
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + '.json')
+
+    def _load_file(self, key):
+        path = self._path(key)
+        try:
+            if os.stat(path).st_mtime + self.ttl < time.time():
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save_file(self, key, session):
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(session, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _load_mongo(self, key):
+        doc = self.collection.find_one({'_id': key})
+        if doc is None:
+            return None
+        expires_at = doc['expires_at']
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=datetime.timezone.utc)
+        if expires_at < datetime.datetime.now(datetime.timezone.utc):
+            return {'version': doc.get('version', 0)}  # expired, not yet removed by the TTL monitor
+        return doc
+
+    def _load(self, key):
+        if usable(self.collection):
+            try:
+                return self._load_mongo(key)
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB chat session read failed: {e}. Falling back to file.")
+        return self._load_file(key)
+
+    def _update_mongo(self, key, change):
+        """Apply `change(session) -> session` with a compare-and-set on `version`."""
+        from pymongo.errors import DuplicateKeyError
+
+        for attempt in range(CAS_ATTEMPTS):
+            if attempt:
+                time.sleep(random.uniform(0, CAS_BACKOFF * 2 ** attempt))
+            current = self._load_mongo(key)
+            session = change(current if current and 'turns' in current else None)
+            version = current.get('version', 0) if current else 0
+            doc = dict(session, version=version + 1,
+                       expires_at=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=self.ttl))
+            doc.pop('_id', None)
+            if current is None:
+                try:
+                    self.collection.insert_one(dict(doc, _id=key))
+                    return
+                except DuplicateKeyError:
+                    pass
+            elif self.collection.replace_one({'_id': key, 'version': version}, doc).matched_count:
+                return
+            self._count('conflicts')
+        logger.warning(f"⚠️ Chat session {key} kept changing; dropped one turn")
+
+    def _update(self, key, change):
+        if usable(self.collection):
+            try:
+                return self._update_mongo(key, change)
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB chat session write failed: {e}. Falling back to file.")
+        with file_lock(os.path.join(self.directory, '.lock'), self._file_lock):
+            self._save_file(key, change(self._load_file(key)))
+        self._sweep()
+
+    def _sweep(self):
+        """Remove session files idle for longer than ttl, at most once per sweep_interval."""
+        now = time.time()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith('.json') and entry.stat().st_mtime + self.ttl < now:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    # ---------- conversation ----------
+
+    def history(self, key):
+        """
+        Return the chat messages to send before the next user message: the
+        summary of older turns (as a system message), then recent turns.
+        """
+        if not key:
+            return []
+        session = self._load(key)
+        if not session or not session.get('turns'):
+            return []
+        messages = []
+        if session.get('summary'):
+            messages.append({'role': 'system',
+                             'content': 'Earlier in this conversation:\n' + '\n'.join(session['summary'])})
+        for user_message, reply in session['turns']:
+            messages.append({'role': 'user', 'content': user_message})
+            messages.append({'role': 'assistant', 'content': reply})
+        return messages
+
+    def _add_turn(self, session, user_message, reply):
+        """Return `session` with one more exchange, summarizing the oldest turns if over budget."""
+        turns = list((session or {}).get('turns', []))
+        summary = list((session or {}).get('summary', []))
+        turns.append([user_message, reply])
+        tokens = sum(estimate_tokens(m) + estimate_tokens(r) for m, r in turns)
+
+        # Always keep the latest exchange verbatim
+        summarized = 0
+        while tokens > self.history_tokens and len(turns) > 1:
+            old_message, old_reply = turns.pop(0)
+            tokens -= estimate_tokens(old_message) + estimate_tokens(old_reply)
+            summary.append(f"- User asked: {_first_sentence(old_message)} / Assistant: {_first_sentence(old_reply)}")
+            summarized += 1
+        summary_tokens = sum(estimate_tokens(line) for line in summary)
+        while summary_tokens > self.summary_tokens and len(summary) > 1:
+            summary_tokens -= estimate_tokens(summary.pop(0))
+        if summarized:
+            self._count('summarized_turns', summarized)
+        return {'turns': turns, 'summary': summary}
+
+    def append(self, key, user_message, reply):
+        """Record one exchange."""
+        if not key or not reply:
+            return
+        self._update(key, lambda session: self._add_turn(session, user_message, reply))
+        self._count('turns')
+
+    def reset(self, key):
+        """Forget a session; returns True if there was one."""
+        self._count('resets')
+        cleared = False
+        if usable(self.collection):
+            try:
+                cleared = self.collection.delete_one({'_id': key}).deleted_count > 0
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB chat session delete failed: {e}. Falling back to file.")
+        try:
+            os.remove(self._path(key))
+            cleared = True
+        except FileNotFoundError:
+            pass
+        return cleared
+
+    def info(self):
+        with self._stats_lock:
+            return dict(self.stats, backend='mongo' if usable(self.collection) else 'file',
+                        ttl=self.ttl, history_tokens=self.history_tokens)
@@ -0,0 +1,113 @@
+"""
+Circuit Breaker - Stop calling a failing dependency until it recovers
+=====================================================================
+
+closed     calls go through; consecutive failures are counted and
+           `failure_threshold` of them (or an explicit trip()) opens the
+           circuit.
+open       allow() is False, so callers go straight to their fallback
+           without waiting on the dependency.
+half_open  after `reset_timeout` seconds a single probe runs on a
+           background thread. Success closes the circuit and runs the
+           on_close callbacks (e.g. replaying buffered writes); failure
+           re-opens it for another `reset_timeout`.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a background half-open probe."""
+
+    def __init__(self, name, probe, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._on_close = []
+        self._lock = threading.Lock()
+        self.stats = {'trips': 0, 'probes': 0, 'rejected': 0}
+
+    def on_close(self, callback):
+        self._on_close.append(callback)
+
+    def allow(self):
+        """True if calls should go to the dependency right now."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            with self._lock:
+                if self.state == OPEN:
+                    self.state = HALF_OPEN
+                    self.stats['probes'] += 1
+                    threading.Thread(target=self._run_probe, name=f'{self.name}-probe', daemon=True).start()
+        self.stats['rejected'] += 1
+        return False
+
+    def _run_probe(self):
+        try:
+            self.probe()
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name} probe failed, circuit stays open: {e}")
+            with self._lock:
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+            return
+        self._close()
+
+    def _close(self):
+        with self._lock:
+            was_closed = self.state == CLOSED
+            self.state = CLOSED
+            self._failures = 0
+        if was_closed:
+            return
+        logger.info(f"✅ {self.name} circuit closed")
+        for callback in self._on_close:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"{self.name} on_close callback failed: {e}")
+
+    def record_success(self):
+        self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == CLOSED and self._failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """Open the circuit immediately (e.g. the driver saw the server go away)."""
+        with self._lock:
+            if self.state == CLOSED:
+                self._open()
+
+    def _open(self):
+        """Caller holds _lock."""
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.stats['trips'] += 1
+        logger.warning(f"⚠️ {self.name} circuit open after {self._failures} failure(s); "
+                       f"using local fallbacks for {self.reset_timeout}s")
+
+    def reset(self):
+        """Close without running callbacks (e.g. a fresh connection after fork)."""
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+
+    def info(self):
+        return dict(self.stats, state=self.state, consecutive_failures=self._failures)
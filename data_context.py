@@ -0,0 +1,228 @@
+"""
+Data Context - Live counts for chatbot prompts and reply templates
+==================================================================
+
+The rule-based chatbot and WhatsApp replies quoted fixed numbers ("12
+pending, 156 approved", "Total Employees: 1,247"), and the LLM had no
+numbers at all. DataContext collects current counts from the employee
+directory, the transfer store, the login rollups and the database
+connection into one snapshot:
+
+- The snapshot is cached for `ttl` seconds. After that, the next caller
+  still gets the cached copy while a background thread refreshes it, so
+  chat messages never wait on (or multiply) aggregate queries. Only the
+  very first snapshot is built inline.
+- Each source is queried separately. A failing source keeps its previous
+  values and is logged.
+- render(template) fills `{placeholders}` from the flattened snapshot
+  (e.g. {transfers_pending}, {employees_total}, {system_database}).
+  Unknown or unavailable
+  values render as "n/a".
+- prompt_block() is a short plain-text summary for the LLM system prompt.
+- version() is a digest of the current figures (not of `as_of`), so a
+  cache of answers generated from prompt_block() can tell when they went
+  out of date. It is the same in every worker that sees the same counts.
+
+open_data_context() builds the stores from the same environment variables
+as unified_app.py, for processes that do not import it (the WhatsApp bots).
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+UNAVAILABLE = 'n/a'
+
+# How each database_status() value reads in a reply
+DATABASE_STATES = {
+    'connected': 'database connected',
+    'file_fallback': 'database unavailable (running on local file storage)',
+}
+
+
+class _Values(dict):
+    def __missing__(self, key):
+        return UNAVAILABLE
+
+
+def _number(value):
+    return f'{value:,}' if isinstance(value, int) and not isinstance(value, bool) else value
+
+
+def employee_summary(employee_directory):
+    """Headcounts with `new_this_month` (joined since the 1st of this month)."""
+    counts = employee_directory.counts(joined_since=datetime.date.today().replace(day=1).isoformat())
+    counts['new_this_month'] = counts.pop('joined')
+    return counts
+
+
+def store_sources(employee_directory=None, transfer_store=None, login_rollups=None, staffing_coverage=None,
+                  database_status=None):
+    """
+    Snapshot sections for the given stores; any of them may be None.
+    `database_status` is a callable returning 'connected' or 'file_fallback'.
+    """
+    sources = {}
+    if database_status is not None:
+        sources['system'] = lambda: {'database': DATABASE_STATES.get(database_status(), database_status())}
+    if employee_directory is not None:
+        sources['employees'] = lambda: employee_summary(employee_directory)
+    if transfer_store is not None:
+        sources['transfers'] = lambda: {status.lower(): count
+                                        for status, count in transfer_store.status_counts().items()}
+    if login_rollups is not None:
+        def logins():
+            summary = login_rollups.summary()
+            return {key: summary[key] for key in ('total_logins_today', 'successful_logins_today',
+                                                  'failed_attempts_today', 'unique_users_today')}
+        sources['logins'] = logins
+    if staffing_coverage is not None:
+        sources['schools'] = staffing_coverage.school_counts
+    return sources
+
+
+class DataContext:
+    """Short-TTL, background-refreshed snapshot of live counts."""
+
+    def __init__(self, sources, ttl=30):
+        self.sources = dict(sources)
+        self.ttl = ttl
+        self._snapshot = None
+        self._version = None
+        self._taken_at = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self.stats = {'refreshes': 0, 'source_errors': 0, 'last_refresh_ms': None}
+
+    def _collect(self):
+        started = time.perf_counter()
+        previous = self._snapshot or {}
+        snapshot = {}
+        for name, source in self.sources.items():
+            try:
+                snapshot[name] = source()
+            except Exception as e:
+                self.stats['source_errors'] += 1
+                logger.warning(f"⚠️ Data context source {name} failed: {e}")
+                if name in previous:
+                    snapshot[name] = previous[name]
+        snapshot['as_of'] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        self.stats['refreshes'] += 1
+        self.stats['last_refresh_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return snapshot
+
+    def _store(self, snapshot):
+        figures = {name: counts for name, counts in snapshot.items() if name != 'as_of'}
+        self._version = hashlib.blake2b(json.dumps(figures, sort_keys=True, default=str).encode('utf-8'),
+                                        digest_size=8).hexdigest()
+        self._snapshot = snapshot
+        self._taken_at = time.monotonic()
+
+    def _refresh(self):
+        try:
+            snapshot = self._collect()
+            with self._lock:
+                self._store(snapshot)
+        finally:
+            self._refreshing = False
+
+    def snapshot(self):
+        """Return the current snapshot, refreshing it in the background when stale."""
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._store(self._collect())
+            return self._snapshot
+        if time.monotonic() - self._taken_at > self.ttl and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._refresh, name='data-context', daemon=True).start()
+        return self._snapshot
+
+    def version(self):
+        """Digest of the current figures; changes whenever a count does."""
+        self.snapshot()
+        return self._version
+
+    def values(self):
+        """The snapshot flattened to {section_key: formatted value}."""
+        values = _Values()
+        for section, counts in self.snapshot().items():
+            if isinstance(counts, dict):
+                for key, value in counts.items():
+                    values[f'{section}_{key}'] = _number(value)
+            else:
+                values[section] = counts
+        return values
+
+    def render(self, template):
+        return template.format_map(self.values())
+
+    def prompt_block(self):
+        """Current figures for the LLM system prompt."""
+        values = self.values()
+        lines = [f"Live figures (as of {values['as_of']} UTC):"]
+        if 'employees' in self.sources:
+            lines.append(f"- Employees: {values['employees_total']} total, {values['employees_active']} active, "
+                         f"{values['employees_new_this_month']} joined this month")
+        if 'schools' in self.sources:
+            lines.append(f"- Schools: {values['schools_total']} across {values['schools_zones']} zones "
+                         f"and {values['schools_districts']} districts")
+        if 'transfers' in self.sources:
+            lines.append(f"- Transfer requests: {values['transfers_pending']} pending, "
+                         f"{values['transfers_approved']} approved, {values['transfers_rejected']} rejected, "
+                         f"{values['transfers_completed']} completed")
+        if 'logins' in self.sources:
+            lines.append(f"- Logins today: {values['logins_total_logins_today']} "
+                         f"({values['logins_failed_attempts_today']} failed, "
+                         f"{values['logins_unique_users_today']} unique users)")
+        if 'system' in self.sources:
+            lines.append(f"- Storage: {values['system_database']}")
+        lines.append("Quote these figures when asked; do not invent other numbers.")
+        return '\n'.join(lines)
+
+    def info(self):
+        age = round(time.monotonic() - self._taken_at, 1) if self._snapshot is not None else None
+        return dict(self.stats, ttl=self.ttl, age_seconds=age, version=self._version)
+
+
+def open_data_context(ttl=30):
+    """
+    Build a DataContext over the MongoDB/file stores configured by the
+    environment (MONGO_URI, MONGO_DB, EMPLOYEES_FILE, TRANSFERS_FILE,
+    LOGIN_LOG_DIR) for a process that only reads them: nothing is seeded
+    and no indexes are created (unified_app.py owns both). MongoDB is tried
+    once here, bounded by its server selection timeout, and reconnected in
+    the background afterwards.
+    """
+    from employee_store import EmployeeDirectory
+    from login_analytics import LoginRollups
+    from mongo_connection import MongoConnection
+    from transfer_store import TransferStore
+
+    uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/employee_mgmt')
+    db = mongo = None
+    if uri:
+        mongo = MongoConnection(uri, os.getenv('MONGO_DB', 'employee_mgmt'))
+        mongo.try_connect()
+        db = mongo.lazy_database()
+    return DataContext(store_sources(
+        employee_directory=EmployeeDirectory(
+            db.employees if db is not None else None,
+            path=os.getenv('EMPLOYEES_FILE', os.path.join('data', 'employee_directory.json')),
+            create_indexes=False),
+        transfer_store=TransferStore(
+            db.transfers if db is not None else None,
+            path=os.getenv('TRANSFERS_FILE', os.path.join('data', 'transfers.json')),
+            create_indexes=False),
+        login_rollups=LoginRollups(
+            db.login_rollups if db is not None else None,
+            path=os.path.join(os.getenv('LOGIN_LOG_DIR', 'logs'), 'login_rollups.json'),
+            create_indexes=False),
+        database_status=lambda: 'connected' if mongo is not None and mongo.connected else 'file_fallback',
+    ), ttl=ttl)
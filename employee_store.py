@@ -0,0 +1,395 @@
+"""
+Employee Store - Persistent employee directory with indexed search
+==================================================================
+
+Backs /api/employees. Records live in the MongoDB `employees` collection,
+or in data/employee_directory.json (loaded into an in-memory index) when
+MongoDB is unavailable.
+
+The file mirrors MongoDB so an outage serves current data: after every
+MongoDB write, and at most every `mirror_interval` seconds on reads, a
+daemon thread copies the collection into the file (records written to the
+file during an outage and not yet in MongoDB are kept). Mirroring runs
+off the request path and one at a time; writes arriving meanwhile queue
+one more pass.
+
+Indexing:
+- school, zone, department and status have their own indexes (MongoDB
+  indexes, or value -> id-set maps in memory), so filters never scan.
+- Names and emails are normalized (lowercased, accents stripped) and split
+  into character trigrams stored on each record (`search_grams`, a multikey
+  index in MongoDB). A substring search intersects the posting lists of the
+  query's trigrams and verifies the few survivors, instead of testing every
+  record. Queries shorter than three characters match word prefixes via
+  the indexed `search_words` array.
+- Results are ordered by normalized name and paginated server-side.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from login_log_store import file_lock
+from mongo_connection import usable, defer_write
+
+logger = logging.getLogger(__name__)
+
+FILTER_FIELDS = ('school', 'zone', 'department', 'status')
+INTERNAL_FIELDS = ('_id', 'name_norm', 'search_text', 'search_grams', 'search_words')
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def words(text):
+    return {w for w in re.split(r'[\s.@_\-]+', text) if w}
+
+
+def _search_text(record):
+    return normalize(' '.join(str(record.get(f, '')) for f in ('name', 'email', 'employee_id', 'id')))
+
+
+def _public(record):
+    return {k: v for k, v in record.items() if k not in INTERNAL_FIELDS}
+
+
+class _MemoryDirectory:
+    """In-memory employee records with field and trigram indexes."""
+
+    def __init__(self):
+        self.records = {}
+        self.fields = {field: {} for field in FILTER_FIELDS}
+        self.grams = {}
+        self._order = None  # ids sorted by name, rebuilt lazily after writes
+
+    def put(self, record):
+        self.remove(record['id'])
+        self.records[record['id']] = record
+        for field in FILTER_FIELDS:
+            self.fields[field].setdefault(record.get(field), set()).add(record['id'])
+        for gram in record['search_grams']:
+            self.grams.setdefault(gram, set()).add(record['id'])
+        self._order = None
+
+    def remove(self, employee_id):
+        old = self.records.pop(employee_id, None)
+        if old is None:
+            return
+        for field in FILTER_FIELDS:
+            self.fields[field].get(old.get(field), set()).discard(employee_id)
+        for gram in old['search_grams']:
+            self.grams.get(gram, set()).discard(employee_id)
+        self._order = None
+
+    def search(self, filters, search):
+        """Return matching ids in name order."""
+        candidate_sets = [self.fields[f].get(v, set()) for f, v in filters.items()]
+        query_grams = trigrams(search) if search else set()
+        candidate_sets += [self.grams.get(g, set()) for g in query_grams]
+
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            candidates = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+        else:
+            candidates = None  # everything
+
+        if candidates is None:
+            if self._order is None:
+                self._order = sorted(self.records, key=lambda i: (self.records[i]['name_norm'], i))
+            ordered = self._order
+        else:
+            ordered = sorted(candidates, key=lambda i: (self.records[i]['name_norm'], i))
+
+        if search:
+            if len(search) < 3:
+                ordered = [i for i in ordered if any(
+                    word.startswith(search) for word in self.records[i]['search_words'])]
+            else:
+                ordered = [i for i in ordered if search in self.records[i]['search_text']]
+        return ordered
+
+
+class EmployeeDirectory:
+    """Employee records in MongoDB with an embedded in-memory fallback."""
+
+    def __init__(self, collection=None, path='data/employee_directory.json', create_indexes=True,
+                 mirror_interval=300):
+        self.collection = collection
+        self.path = path
+        self.mirror_interval = mirror_interval
+        self._memory = _MemoryDirectory()
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._listeners = []
+        self._mirror_lock = threading.Lock()
+        self._mirror_running = False
+        self._mirror_pending = False
+        self._next_mirror = 0
+
+        self._loaded_mtime = None
+        self._sync_file()
+
+        if collection is not None and create_indexes:
+            try:
+                for field in FILTER_FIELDS:
+                    collection.create_index(field)
+                collection.create_index('id', unique=True)
+                collection.create_index('name_norm')
+                collection.create_index('search_grams')
+                collection.create_index('search_words')
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create employee indexes: {e}")
+
+    # ---------- storage ----------
+
+    @staticmethod
+    def _prepare(record):
+        record = _public(record)
+        record['id'] = str(record['id'])
+        text = _search_text(record)
+        record['name_norm'] = normalize(record.get('name'))
+        record['search_text'] = text
+        record['search_grams'] = sorted(trigrams(text))
+        record['search_words'] = sorted(words(text))
+        return record
+
+    def _load_file(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _sync_file(self):
+        """Reload the in-memory index if another worker rewrote the file. Caller holds _lock or is __init__."""
+        mtime = self._file_mtime()
+        if mtime == self._loaded_mtime:
+            return
+        memory = _MemoryDirectory()
+        for record in self._load_file():
+            memory.put(self._prepare(record))
+        self._memory = memory
+        self._loaded_mtime = mtime
+
+    def _save_file(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([_public(r) for r in self._memory.records.values()], f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._loaded_mtime = self._file_mtime()
+
+    def mirror(self):
+        """Copy every MongoDB record into the file; raises if MongoDB fails."""
+        self._next_mirror = time.monotonic() + self.mirror_interval
+        records = [self._prepare(r) for r in self.collection.find({}, {f: 0 for f in INTERNAL_FIELDS})]
+        with file_lock(self.path + '.lock', self._file_lock):
+            with self._lock:
+                self._sync_file()
+                for record in records:
+                    self._memory.put(record)
+                self._save_file()
+
+    def _schedule_mirror(self):
+        """Run mirror() on a daemon thread, or once more after the running pass."""
+        if not usable(self.collection):
+            return
+        with self._mirror_lock:
+            if self._mirror_running:
+                self._mirror_pending = True
+                return
+            self._mirror_running = True
+        threading.Thread(target=self._run_mirror, name='employee-mirror', daemon=True).start()
+
+    def _run_mirror(self):
+        while True:
+            try:
+                self.mirror()
+            except Exception as e:
+                logger.warning(f"⚠️ Employee file mirror failed: {e}")
+            with self._mirror_lock:
+                if not self._mirror_pending:
+                    self._mirror_running = False
+                    return
+                self._mirror_pending = False
+
+    def _mirror_if_due(self):
+        if time.monotonic() >= self._next_mirror:
+            self._schedule_mirror()
+
+    def on_change(self, listener):
+        """Register listener(old, new) called with public records after every upsert."""
+        self._listeners.append(listener)
+
+    def upsert(self, record):
+        """Create or replace an employee by id; returns the stored record."""
+        prepared = self._prepare(record)
+        old = None
+        saved = False
+        if usable(self.collection):
+            try:
+                old = self.collection.find_one_and_replace(
+                    {'id': prepared['id']}, prepared, upsert=True,
+                    projection={f: 0 for f in INTERNAL_FIELDS}
+                )
+                saved = True
+                self._schedule_mirror()
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB employee write failed: {e}. Falling back to file.")
+        if not saved:
+            defer_write(self.collection, 'replace_one', {'id': prepared['id']}, dict(prepared), upsert=True)
+            with file_lock(self.path + '.lock', self._file_lock):
+                with self._lock:
+                    self._sync_file()
+                    previous = self._memory.records.get(prepared['id'])
+                    old = _public(previous) if previous else None
+                    self._memory.put(prepared)
+                    self._save_file()
+        stored = _public(prepared)
+        for listener in self._listeners:
+            try:
+                listener(old, stored)
+            except Exception as e:
+                logger.error(f"Employee listener failed: {e}")
+        return stored
+
+    def seed(self, records):
+        """Insert records whose id is not present yet."""
+        for record in records:
+            if self.get(str(record['id'])) is None:
+                self.upsert(record)
+
+    # ---------- reads ----------
+
+    def get(self, employee_id):
+        # A miss in MongoDB is a miss: the file only stands in when MongoDB fails
+        self._mirror_if_due()
+        if usable(self.collection):
+            try:
+                return self.collection.find_one({'id': employee_id}, {f: 0 for f in INTERNAL_FIELDS})
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB employee read failed: {e}. Falling back to file.")
+        with self._lock:
+            self._sync_file()
+            record = self._memory.records.get(employee_id)
+        return _public(record) if record else None
+
+    def search(self, search='', filters=None, page=1, limit=50):
+        """Return (employees, total) for one page of matching records."""
+        filters = {k: v for k, v in (filters or {}).items() if k in FILTER_FIELDS and v}
+        search = normalize(search)
+        skip = (page - 1) * limit
+        self._mirror_if_due()
+
+        if usable(self.collection):
+            try:
+                return self._search_mongo(search, filters, skip, limit)
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB employee search failed: {e}. Falling back to file.")
+
+        with self._lock:
+            self._sync_file()
+            ids = self._memory.search(filters, search)
+            page_records = [_public(self._memory.records[i]) for i in ids[skip:skip + limit]]
+        return page_records, len(ids)
+
+    def _search_mongo(self, search, filters, skip, limit):
+        query = dict(filters)
+        if search:
+            if len(search) < 3:
+                query['search_words'] = {'$regex': '^' + re.escape(search)}
+            else:
+                query['search_grams'] = {'$all': sorted(trigrams(search))}
+                query['search_text'] = {'$regex': re.escape(search)}
+        total = self.collection.count_documents(query)
+        cursor = (self.collection.find(query, {f: 0 for f in INTERNAL_FIELDS})
+                  .sort([('name_norm', 1), ('id', 1)])
+                  .skip(skip)
+                  .limit(limit))
+        return list(cursor), total
+
+    def counts(self, joined_since=''):
+        """
+        Return headcounts: total, active, inactive, joined (joining_date on
+        or after `joined_since`, an ISO date), schools and zones.
+        """
+        if usable(self.collection):
+            try:
+                facets = next(self.collection.aggregate([{'$facet': {
+                    'status': [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}],
+                    'schools': [{'$group': {'_id': '$school'}}, {'$count': 'count'}],
+                    'zones': [{'$group': {'_id': '$zone'}}, {'$count': 'count'}],
+                    'joined': [{'$match': {'joining_date': {'$gte': joined_since}}}, {'$count': 'count'}],
+                }}]))
+                by_status = {row['_id']: row['count'] for row in facets['status']}
+                distinct = {name: facets[name][0]['count'] if facets[name] else 0
+                            for name in ('schools', 'zones', 'joined')}
+                return self._summarize_counts(by_status, **distinct)
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB employee counts failed: {e}. Falling back to file.")
+        with self._lock:
+            self._sync_file()
+            memory = self._memory
+            by_status = {status: len(ids) for status, ids in memory.fields['status'].items() if ids}
+            return self._summarize_counts(
+                by_status,
+                schools=sum(1 for ids in memory.fields['school'].values() if ids),
+                zones=sum(1 for ids in memory.fields['zone'].values() if ids),
+                joined=sum(1 for r in memory.records.values()
+                           if str(r.get('joining_date') or '') >= joined_since)
+            )
+
+    @staticmethod
+    def _summarize_counts(by_status, schools, zones, joined):
+        total = sum(by_status.values())
+        active = sum(count for status, count in by_status.items()
+                     if str(status or 'Active').lower() == 'active')
+        return {'total': total, 'active': active, 'inactive': total - active,
+                'joined': joined, 'schools': schools, 'zones': zones}
+
+    def schools_by_zone(self):
+        """Return {zone: set of schools} across every employee record."""
+        if usable(self.collection):
+            try:
+                rows = self.collection.aggregate([
+                    {'$group': {'_id': '$zone', 'schools': {'$addToSet': '$school'}}}
+                ])
+                return {row['_id']: set(row['schools']) for row in rows if row['_id']}
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB employee aggregation failed: {e}. Falling back to file.")
+        with self._lock:
+            self._sync_file()
+            zones = {}
+            for record in self._memory.records.values():
+                if record.get('zone'):
+                    zones.setdefault(record['zone'], set()).add(record.get('school'))
+            return zones
+
+    def all_records(self):
+        """Return every employee record (public fields)."""
+        if usable(self.collection):
+            try:
+                return list(self.collection.find({}, {f: 0 for f in INTERNAL_FIELDS}))
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB employee scan failed: {e}. Falling back to file.")
+        with self._lock:
+            self._sync_file()
+            return [_public(r) for r in self._memory.records.values()]
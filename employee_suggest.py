@@ -0,0 +1,243 @@
+"""
+Employee Suggest - As-you-type prefix and typo-tolerant employee lookup
+======================================================================
+
+Backs /api/employees/suggest. Every employee contributes a few normalized
+keys (full name, each name word, email, email local part, employee ID) to
+one sorted list of (key, position) pairs.
+
+- Prefix matches are a bisect into the sorted keys: O(log n + k).
+- When there are fewer than `limit` prefix matches, queries of four or
+  more characters also match keys whose prefix is one edit away
+  (Levenshtein plus adjacent transpositions), in two steps:
+  1. A deletion-neighbourhood filter (as in SymSpell) picks candidate key
+     prefixes: each distinct FUZZY_PREFIX-character key prefix is indexed
+     under every string made by deleting one of its characters. A key one
+     edit away shares one of those with the query's first FUZZY_PREFIX
+     characters, so a few dictionary lookups replace a walk over every key.
+  2. The edit-distance rows are computed along each candidate prefix and
+     then down the sorted keys below it as an implicit trie (a node is the
+     range of keys sharing a prefix, children are found by bisecting on
+     the next character), pruning every branch whose edit distance
+     already exceeds the budget.
+
+  Long queries get one edit too: at 30k employees a two-edit walk takes
+  100+ ms and a two-edit deletion index costs 60+ MB per worker.
+
+The index is rebuilt from the employee directory in a background thread
+when it is older than `max_age` seconds or has been invalidated by a write.
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+from employee_store import normalize, words
+
+logger = logging.getLogger(__name__)
+
+# Lower weight ranks first when distances tie
+KEY_WEIGHTS = {'name': 0, 'word': 1, 'id': 2, 'email': 3}
+
+# Length of the key prefixes in the deletion index; also the shortest
+# query that gets typo tolerance
+FUZZY_PREFIX = 4
+
+
+def _max_distance(query):
+    return 0 if len(query) < FUZZY_PREFIX else 1
+
+
+def _deletes(text):
+    """text with one character removed, each way."""
+    return {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+class SuggestIndex:
+    """Sorted-key prefix index with bounded edit-distance fallback."""
+
+    def __init__(self, records=()):
+        self.records = []
+        entries = []
+        for record in records:
+            position = len(self.records)
+            self.records.append(record)
+            for key, kind in self._keys(record):
+                entries.append((key, KEY_WEIGHTS[kind], position))
+        entries.sort()
+        self._keys_sorted = [e[0] for e in entries]
+        self._entries = entries
+        # Distinct FUZZY_PREFIX-character key prefixes (in key order) and
+        # {prefix with one character deleted: [prefix number, ...]}. Keys one
+        # character shorter can still be one edit away and are indexed as is.
+        self._prefixes, self._prefix_deletes = [], {}
+        for key in self._keys_sorted:
+            prefix = key[:FUZZY_PREFIX]
+            if self._prefixes and self._prefixes[-1] == prefix:
+                continue
+            if len(prefix) >= FUZZY_PREFIX - 1:
+                for variant in _deletes(prefix) if len(prefix) == FUZZY_PREFIX else (prefix,):
+                    self._prefix_deletes.setdefault(variant, []).append(len(self._prefixes))
+            self._prefixes.append(prefix)
+
+    @staticmethod
+    def _keys(record):
+        name = normalize(record.get('name'))
+        email = normalize(record.get('email'))
+        keys = set()
+        if name:
+            keys.add((name, 'name'))
+            keys.update((w, 'word') for w in words(name) if w != name)
+        if email:
+            keys.add((email, 'email'))
+            keys.add((email.split('@')[0], 'email'))
+        for field in ('employee_id', 'id'):
+            if record.get(field):
+                keys.add((normalize(record[field]), 'id'))
+        return keys
+
+    def _prefix_matches(self, query, limit):
+        """Return {position: (0, weight, key)} for keys starting with query."""
+        found = {}
+        start = bisect.bisect_left(self._keys_sorted, query)
+        for key, weight, position in self._entries[start:start + max(200, limit * 20)]:
+            if not key.startswith(query):
+                break
+            best = found.get(position)
+            if best is None or (0, weight, len(key)) < best[:3]:
+                found[position] = (0, weight, len(key), key)
+        return found
+
+    def _fuzzy_matches(self, query, max_distance, limit):
+        """Return {position: (distance, weight, key)} for keys whose prefix is within max_distance."""
+        found = {}
+        keys = self._keys_sorted
+
+        def collect(lo, hi, distance):
+            for key, weight, position in self._entries[lo:min(hi, lo + limit * 4)]:
+                best = found.get(position)
+                if best is None or (distance, weight, len(key)) < best[:3]:
+                    found[position] = (distance, weight, len(key), key)
+
+        over = max_distance + 1
+
+        def step(row, prev_row, char, prev_char):
+            # Cells more than max_distance off the diagonal are at least
+            # max_distance + 1; only the band around it is computed
+            depth = row[0] + 1
+            new_row = [depth] + [over] * len(query)
+            for col in range(max(1, depth - max_distance), min(len(query), depth + max_distance) + 1):
+                best = min(row[col - 1] + (query[col - 1] != char), new_row[col - 1] + 1, row[col] + 1)
+                if col > 1 and prev_row and query[col - 1] == prev_char and query[col - 2] == char:
+                    # Adjacent transposition ("jhon" -> "john") costs one edit
+                    best = min(best, prev_row[col - 2] + 1)
+                new_row[col] = min(best, over)
+            return new_row
+
+        def visit(prefix, lo, hi, row):
+            """Collect the node's keys if in budget; True if descending could still do better."""
+            if row[-1] <= max_distance:
+                # Whole query matched a prefix of everything below this node
+                collect(lo, hi, row[-1])
+            # Deeper rows never drop below min(row), so descend only
+            # while that could still beat the distance collected here
+            return min(row) <= max_distance and min(row) < row[-1]
+
+        def walk(prefix, lo, hi, row, prev_row):
+            depth = len(prefix)
+            prev_char = prefix[-1] if prefix else ''
+            # Keys equal to `prefix` sort first in the range; skip them
+            i = lo
+            while i < hi and len(keys[i]) == depth:
+                i += 1
+            while i < hi:
+                char = keys[i][depth]
+                end = bisect.bisect_left(keys, prefix + chr(ord(char) + 1), i, hi)
+                new_row = step(row, prev_row, char, prev_char)
+                if visit(prefix + char, i, end, new_row):
+                    walk(prefix + char, i, end, new_row, row)
+                i = end
+
+        candidates = set()
+        for variant in _deletes(query[:FUZZY_PREFIX]):
+            candidates.update(self._prefix_deletes.get(variant, ()))
+
+        # prefix -> (row, previous row, worth descending); candidates share prefixes
+        nodes = {'': (list(range(len(query) + 1)), None, True)}
+        for number in sorted(candidates):
+            candidate = self._prefixes[number]
+            for depth in range(1, len(candidate) + 1):
+                prefix = candidate[:depth]
+                node = nodes.get(prefix)
+                if node is None:
+                    row, prev_row, _ = nodes[prefix[:-1]]
+                    new_row = step(row, prev_row, prefix[-1], prefix[-2:-1])
+                    lo = bisect.bisect_left(keys, prefix)
+                    hi = bisect.bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+                    node = nodes[prefix] = (new_row, row, visit(prefix, lo, hi, new_row))
+                if not node[2]:
+                    break
+            else:
+                row, prev_row, _ = nodes[candidate]
+                lo = bisect.bisect_left(keys, candidate)
+                hi = bisect.bisect_left(keys, candidate[:-1] + chr(ord(candidate[-1]) + 1), lo)
+                walk(candidate, lo, hi, row, prev_row)
+        return found
+
+    def suggest(self, query, limit=10):
+        """Return up to `limit` (record, distance, matched_key) tuples, best first."""
+        query = normalize(query)
+        if not query:
+            return []
+        found = self._prefix_matches(query, limit)
+        max_distance = _max_distance(query)
+        if len(found) < limit and max_distance:
+            for position, match in self._fuzzy_matches(query, max_distance, limit).items():
+                if position not in found or match[:3] < found[position][:3]:
+                    found[position] = match
+        ranked = sorted(found.items(), key=lambda item: (item[1][:3], item[1][3]))[:limit]
+        return [(self.records[position], match[0], match[3]) for position, match in ranked]
+
+
+class EmployeeSuggester:
+    """Keeps a SuggestIndex fresh against an EmployeeDirectory."""
+
+    def __init__(self, directory, max_age=60):
+        self.directory = directory
+        self.max_age = max_age
+        self._index = None
+        self._built_at = 0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def _rebuild(self):
+        try:
+            index = SuggestIndex(self.directory.all_records())
+            with self._lock:
+                self._index = index
+                self._built_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Failed to rebuild employee suggest index: {e}")
+        finally:
+            self._rebuilding = False
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = 0
+
+    def index(self):
+        """Return the current index, refreshing it in the background when stale."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = SuggestIndex(self.directory.all_records())
+                    self._built_at = time.monotonic()
+            return self._index
+        if time.monotonic() - self._built_at > self.max_age and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild, name='employee-suggest', daemon=True).start()
+        return self._index
+
+    def suggest(self, query, limit=10):
+        return self.index().suggest(query, limit)
@@ -0,0 +1,271 @@
+"""
+Intent Classifier - Local-first answers for routable chatbot questions
+======================================================================
+
+Many chatbot messages ("leave types", "how do I transfer", "system
+status") have a rule-based answer in generate_chatbot_response_fallback(),
+yet every one of them used to go to Groq first. IntentClassifier decides
+locally, in microseconds, whether a message is one of those:
+
+- Features are word unigrams/bigrams and in-word character trigrams,
+  TF-IDF weighted and L2-normalized over a vocabulary built from the
+  training examples. N-grams not in the vocabulary are ignored.
+- A softmax linear model is trained by full-batch gradient descent with
+  NumPy when the app starts (a few hundred examples, well under a
+  second).
+- Training data: the keywords of each CHATBOT_ROUTER rule, the seed
+  utterances in CHATBOT_EXAMPLES, and optional FAQ question/answer
+  pairs (one intent per FAQ). Out-of-scope examples form an `escalate`
+  class.
+
+classify() returns (intent, confidence). Callers answer locally when the
+intent is not `escalate` and the confidence reaches `threshold`, and
+otherwise escalate to the LLM. The stats record the escalation rate and
+the classifier's own cost. Each gunicorn worker trains its own copy.
+"""
+
+import json
+import logging
+import math
+import re
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ESCALATE = 'escalate'
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Seed utterances per fallback intent, plus questions that need the LLM
+CHATBOT_EXAMPLES = {
+    'employee_search': [
+        'how do I search for an employee', 'find an employee by name', 'search staff by school',
+        'where can I look up a teacher', 'find employee in my zone', 'search employees by department',
+    ],
+    'transfer': [
+        'how do I transfer', 'how do I apply for a transfer', 'transfer request status',
+        'how many transfers are pending', 'where do I approve transfers', 'posting change request',
+        'request a transfer to a different school', 'view the transfer queue',
+    ],
+    'leave': [
+        'leave types', 'what are the leave types', 'how many sick leave days do I get',
+        'casual leave policy', 'maternity leave duration', 'how do I apply for leave',
+        'holiday list', 'leave policy', 'kinds of leave', 'what leave can staff take', 'leave categories',
+        'public holidays',
+    ],
+    'navigation': [
+        'how do I use the dashboard', 'where is the settings page', 'how to navigate the system',
+        'what features does the dashboard have', 'how to find the analytics section',
+        'what can the dashboard do', 'dashboard help', 'how do I move between pages',
+    ],
+    'reports': [
+        'show me reports', 'where are the analytics', 'employee statistics', 'export a report',
+        'download transfer analytics', 'school distribution report',
+        'where is the reports page', 'reports section', 'view statistics',
+    ],
+    'security': [
+        'login problems', 'who has access to what', 'how is security handled', 'role based access',
+        'failed login attempts', 'is my account secure',
+        'who is allowed to access which pages', 'access permissions', 'access control',
+    ],
+    'data': [
+        'is the data backed up', 'database backup', 'how do I export data', 'where is the data stored',
+        'export employee records', 'data export', 'is data backed up regularly',
+    ],
+    'employee_id': [
+        'employee id lookup', 'find by emp id', 'what is the employee id format', 'look up EMP001',
+        'search by employee id', 'what does an employee id look like',
+    ],
+    'status': [
+        'system status', 'is the system healthy', 'health check', 'is everything running',
+        'is the database connected', 'is the server up', 'is the app working', 'system uptime',
+    ],
+    ESCALATE: [
+        'hello', 'hi there', 'thanks', 'thank you so much', 'who are you', 'tell me a joke',
+        'write an email to my principal', 'draft a letter requesting a meeting',
+        'explain the new pay commission rules', 'summarize our conversation',
+        'what is the weather today', 'can you help me with a personal problem',
+        'translate this into hindi', 'what should I say to my manager',
+        'compare two teachers performance', 'why was my request rejected',
+        'what is the capital of france', 'give me advice on classroom management',
+        'good evening', 'good afternoon', 'hey there',
+        # Hard negatives: a routable topic, but about the user's own case or
+        # asking for writing, which the canned answers cannot handle
+        'who rejected my transfer request', 'who signed off on my leave', 'when was my transfer approved',
+        'I was ill for two weeks, do I get extra sick leave', 'my medical leave ran out, what now',
+        'can I extend my maternity leave', 'which leave should I take in my situation',
+        'write a reason for my transfer application', 'help me word my leave request',
+        'draft a transfer request letter', 'compose an email about my leave',
+        'my password does not work', 'I am locked out of my account', 'login keeps failing for me',
+        'I forgot my password', 'someone logged into my account', 'my account was hacked',
+        'cancel my transfer request', 'can I withdraw my leave application',
+        'is my transfer going to be approved', 'check the status of my own request',
+    ],
+}
+
+
+def _features(text):
+    words = _TOKEN.findall((text or '').lower())
+    features = ['w:' + word for word in words]
+    features += ['b:' + a + ' ' + b for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f'<{word}>'
+        features += ['c:' + padded[i:i + 3] for i in range(len(padded) - 2)]
+    return features
+
+
+def router_examples(router):
+    """Training examples from an IntentRouter's keyword rules."""
+    examples = {}
+    for rule in router.rules:
+        phrases = list(rule.keywords)
+        for group in rule.all_of:
+            phrases = [f'{p} {k}' for p in phrases for k in group]
+        examples.setdefault(rule.intent, []).extend(phrases)
+    return examples
+
+
+def load_faqs(path):
+    """Return {question: answer} from a JSON FAQ file (dict, or list of {question, answer})."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            faqs = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Could not load FAQ file {path}: {e}")
+        return {}
+    if isinstance(faqs, dict):
+        return dict(faqs)
+    return {item['question']: item['answer'] for item in faqs}
+
+
+def chatbot_training_set(router, faqs=None):
+    """
+    Return (examples, answers) for IntentClassifier: the router's keyword
+    rules and CHATBOT_EXAMPLES, plus one `faq:<n>` intent per FAQ entry
+    whose answer is the FAQ answer.
+    """
+    examples = {intent: list(texts) for intent, texts in CHATBOT_EXAMPLES.items()}
+    for intent, texts in router_examples(router).items():
+        examples.setdefault(intent, []).extend(texts)
+    answers = {}
+    for n, (question, answer) in enumerate((faqs or {}).items()):
+        examples[f'faq:{n}'] = [question, answer]
+        answers[f'faq:{n}'] = answer
+    return examples, answers
+
+
+class IntentClassifier:
+    """TF-IDF n-gram softmax classifier over chatbot intents."""
+
+    def __init__(self, examples, answers=None, threshold=0.75, epochs=300,
+                 learning_rate=5.0, l2=1e-4):
+        """
+        examples: {intent: [utterance, ...]}; answers: {intent: text} for
+        intents that are not answered by the caller (e.g. FAQs).
+        """
+        self.threshold = threshold
+        self.answers = dict(answers or {})
+        self._lock = threading.Lock()
+        self.stats = {'classified': 0, 'local': 0, 'escalated': 0, 'classify_us': 0.0}
+
+        started = time.perf_counter()
+        self.intents = sorted(examples)
+        texts, labels = [], []
+        for label, intent in enumerate(self.intents):
+            for text in examples[intent]:
+                texts.append(text)
+                labels.append(label)
+
+        rows = [_features(text) for text in texts]
+        self.vocabulary = {}
+        document_frequency = {}
+        for row in rows:
+            for feature in set(row):
+                if feature not in self.vocabulary:
+                    self.vocabulary[feature] = len(self.vocabulary)
+                document_frequency[feature] = document_frequency.get(feature, 0) + 1
+        self.idf = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for feature, column in self.vocabulary.items():
+            self.idf[column] = math.log((1 + len(rows)) / (1 + document_frequency[feature])) + 1
+
+        X = np.vstack([self._vector(row) for row in rows]) if rows else np.zeros((0, len(self.vocabulary)))
+        Y = np.zeros((len(rows), len(self.intents)), dtype=np.float32)
+        Y[np.arange(len(rows)), labels] = 1
+        self.weights = np.zeros((len(self.vocabulary), len(self.intents)), dtype=np.float32)
+        self.bias = np.zeros(len(self.intents), dtype=np.float32)
+        for _ in range(epochs if rows else 0):
+            gradient = self._softmax(X @ self.weights + self.bias) - Y
+            self.weights -= learning_rate * (X.T @ gradient / len(rows) + l2 * self.weights)
+            self.bias -= learning_rate * gradient.mean(axis=0)
+
+        self.train_ms = round((time.perf_counter() - started) * 1000, 1)
+        accuracy = float((self._softmax(X @ self.weights + self.bias).argmax(axis=1) == labels).mean()) if rows else 0
+        logger.info(f"Trained intent classifier on {len(rows)} examples, {len(self.intents)} intents, "
+                    f"{len(self.vocabulary)} features in {self.train_ms} ms (train accuracy {accuracy:.2f})")
+
+    @staticmethod
+    def _softmax(scores):
+        scores = scores - scores.max(axis=-1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def _vector(self, features):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for feature in features:
+            column = self.vocabulary.get(feature)
+            if column is not None:
+                vector[column] += 1
+        nonzero = vector > 0
+        vector[nonzero] = (1 + np.log(vector[nonzero])) * self.idf[nonzero]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def classify(self, message):
+        """Return (intent, confidence); (ESCALATE, 0.0) when nothing is known."""
+        counts = {}
+        for feature in _features(message):
+            column = self.vocabulary.get(feature)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+        if not counts:
+            return ESCALATE, 0.0
+        columns = np.fromiter(counts, dtype=np.intp, count=len(counts))
+        values = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self.idf[columns]
+        values /= np.linalg.norm(values)
+        probabilities = self._softmax(values @ self.weights[columns] + self.bias)
+        best = int(probabilities.argmax())
+        return self.intents[best], float(probabilities[best])
+
+    def route(self, message):
+        """
+        Return the intent to answer locally, or None to escalate to the LLM.
+        Updates the escalation statistics.
+        """
+        started = time.perf_counter()
+        intent, confidence = self.classify(message)
+        local = intent != ESCALATE and confidence >= self.threshold
+        with self._lock:
+            self.stats['classified'] += 1
+            self.stats['local' if local else 'escalated'] += 1
+            self.stats['classify_us'] += (time.perf_counter() - started) * 1e6
+        return intent if local else None
+
+    def info(self, llm_avg_ms=None):
+        """Statistics; `llm_avg_ms` (average LLM call) estimates the latency saved."""
+        with self._lock:
+            classified = self.stats['classified']
+            return {
+                'intents': len(self.intents),
+                'features': len(self.vocabulary),
+                'threshold': self.threshold,
+                'train_ms': self.train_ms,
+                'classified': classified,
+                'local': self.stats['local'],
+                'escalated': self.stats['escalated'],
+                'escalation_rate': round(self.stats['escalated'] / classified, 3) if classified else None,
+                'avg_classify_us': round(self.stats['classify_us'] / classified, 1) if classified else None,
+                'latency_saved_ms': round(self.stats['local'] * llm_avg_ms) if llm_avg_ms is not None else None,
+            }
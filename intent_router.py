@@ -0,0 +1,325 @@
+"""
+Intent Router - Keyword intent matching shared by the chatbot and WhatsApp bots
+===============================================================================
+
+generate_chatbot_response_fallback() in unified_app.py and
+process_user_message() in twilio_whatsapp.py / whatsapp_demo.py each used
+a chain of `in` tests, so the cost of a message grew with every rule and
+the WhatsApp command lists and replies were copied between files.
+
+An IntentRouter is built from an ordered list of Rules (earlier rules win,
+like the if-chains they replace):
+
+- `exact`: whole-message commands ("hi", "help").
+- `keywords`: substrings, any of which selects the rule.
+- `all_of`: extra keyword groups that must each match as well
+  (e.g. 'employee' together with 'search' or 'find').
+
+Matching is on substrings of the lower-cased message, as the `in` tests
+were. How rules are checked depends on the size of the rule set:
+
+- Up to CHAIN_MAX_KEYWORDS keywords, the rules are compiled into the same
+  if-chain of `in` tests that was written by hand; each test runs in C,
+  which no Python-level scan beats for a handful of rules.
+- Above that, all keywords are compiled into a single Aho-Corasick
+  automaton whose transitions are precomputed (a DFA over the keywords'
+  alphabet), so a message is scanned once, character by character,
+  whatever the number of rules. Only rules owning a keyword that was found
+  are then checked, in priority order.
+
+`python benchmarks.py intent_router`, per message:
+
+    rules (keywords)     if-chain    automaton
+    9 (20, chatbot)      0.6 µs *    4-6 µs
+    10 (30)              1.8 µs      4.2 µs
+    30 (90)              3.5 µs      3.9 µs
+    100 (300)            15 µs       5.1 µs
+    1000 (3000)          170 µs      4.0 µs
+
+* the hand-written chain; through IntentRouter.route() (strip, command
+lookup, method calls) it is 1.0 µs. One alternation regex was measured
+too and lost to both: `re` tries every alternative at every position
+(1.3 µs per search on the chatbot rules, 4.3 µs to report overlapping
+keywords).
+"""
+
+from collections import deque, namedtuple
+
+# Largest keyword count still matched by an if-chain of `in` tests
+CHAIN_MAX_KEYWORDS = 90
+
+Rule = namedtuple('Rule', 'intent keywords all_of exact')
+Rule.__new__.__defaults__ = ((), (), ())
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton returning the set of keywords found in a text."""
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        goto = [{}]
+        out = [set()]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    out.append(set())
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            out[state].add(index)
+
+        # Breadth-first: fail links, output sets and the full transition table.
+        # Transitions back to the root are left out; lookups default to 0.
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] |= out[fail[state]]
+            transitions = dict(delta[fail[state]])
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0) if state else 0
+                transitions[ch] = child
+                queue.append(child)
+            delta[state] = transitions
+        self._delta = delta
+        self._out = [frozenset(found) for found in out]
+
+    def find(self, text):
+        """Return the indexes (into self.keywords) of every keyword in `text`."""
+        delta, out = self._delta, self._out
+        found = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+def _compile_chain(rules):
+    """
+    Build `chain(text) -> priority of the first rule matching text` (len(rules)
+    if none) as the literal if-chain of `in` tests it replaces, e.g.
+
+        if ('employee' in text) and ('search' in text or 'find' in text):
+            return 0
+
+    Commands and keywords are embedded with repr(), so no rule text is ever
+    executed.
+    """
+    lines = ['def chain(text):']
+    for priority, rule in enumerate(rules):
+        tests = []
+        if rule.exact:
+            tests.append(f'text in {tuple(command.lower() for command in rule.exact)!r}')
+        groups = [group for group in (rule.keywords, *rule.all_of) if group]
+        if groups:
+            tests.append(' and '.join('(' + ' or '.join(f'{k.lower()!r} in text' for k in group) + ')'
+                                      for group in groups))
+        if tests:
+            lines.append(f'    if {" or ".join(tests)}:\n        return {priority}')
+    lines.append(f'    return {len(rules)}')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['chain']
+
+
+class IntentRouter:
+    """Maps a message to the intent of the first Rule it satisfies."""
+
+    def __init__(self, rules, chain_max_keywords=CHAIN_MAX_KEYWORDS):
+        self.rules = list(rules)
+        self._exact = {}  # command -> priority
+        keywords = []
+        for priority, rule in enumerate(self.rules):
+            for command in rule.exact:
+                self._exact.setdefault(command.lower(), priority)
+            for group in (rule.keywords, *rule.all_of):
+                keywords.extend(k.lower() for k in group)
+        self.automaton = None
+        if len(set(keywords)) <= chain_max_keywords:
+            self._chain = _compile_chain(self.rules)
+            self._by_priority = self.rules + [None]
+            return
+        self.automaton = KeywordAutomaton(keywords)
+
+        index = {keyword: i for i, keyword in enumerate(self.automaton.keywords)}
+        self._groups = []  # priority -> one keyword index set per group
+        self._owners = {}  # keyword index -> priorities of rules whose first group lists it
+        for priority, rule in enumerate(self.rules):
+            groups = [frozenset(index[k.lower()] for k in group)
+                      for group in (rule.keywords, *rule.all_of) if group]
+            self._groups.append(groups)
+            for i in groups[0] if groups else ():
+                self._owners.setdefault(i, set()).add(priority)
+
+    def match(self, message):
+        """Return the first matching Rule for `message`, or None."""
+        text = (message or '').strip().lower()
+        if self.automaton is None:
+            return self._by_priority[self._chain(text)]
+
+        best = self._exact.get(text, len(self.rules))
+        found = self.automaton.find(text)
+        candidates = sorted({p for i in found for p in self._owners.get(i, ()) if p < best})
+        for priority in candidates:
+            if all(group & found for group in self._groups[priority]):
+                return self.rules[priority]
+        return self.rules[best] if best < len(self.rules) else None
+
+    def route(self, message, default=None):
+        """Return the intent name for `message`, or `default`."""
+        rule = self.match(message)
+        return rule.intent if rule is not None else default
+
+
+# Rule-based answers of the web chatbot when the LLM is unavailable
+CHATBOT_ROUTER = IntentRouter([
+    Rule('employee_search', keywords=('employee',), all_of=(('search', 'find'),)),
+    Rule('transfer', keywords=('transfer',)),
+    Rule('leave', keywords=('leave', 'holiday')),
+    Rule('navigation', keywords=('dashboard', 'feature', 'navigate', 'how to')),
+    Rule('reports', keywords=('report', 'analytics', 'statistics')),
+    Rule('security', keywords=('login', 'security', 'access')),
+    Rule('data', keywords=('data', 'database', 'backup')),
+    Rule('employee_id', keywords=('employee id', 'emp id')),
+    Rule('status', keywords=('status', 'health')),
+])
+
+# WhatsApp bot commands (whole-message matches)
+WHATSAPP_ROUTER = IntentRouter([
+    Rule('welcome', exact=('hello', 'hi', 'hey', 'start')),
+    Rule('report', exact=('report', 'reports', 'stats', 'statistics')),
+    Rule('leave', exact=('leave', 'leaves', 'apply leave', 'leave request')),
+    Rule('transfer', exact=('transfer', 'transfers', 'posting', 'postings')),
+    Rule('employee', exact=('employee', 'employees', 'staff', 'search')),
+    Rule('help', exact=('help', 'commands', 'menu', 'options')),
+    Rule('analytics', exact=('analytics', 'dashboard', 'system', 'status')),
+])
+
+# WhatsApp replies by WHATSAPP_ROUTER intent; {placeholders} are filled from
+# the live counts of a data_context.DataContext
+WHATSAPP_REPLIES = {
+    'welcome': (
+        "👋 *Welcome to 3U1 Integrated Management System!*\n\n"
+        "🏫 Your complete Employee Management solution for educational institutions.\n\n"
+        "✨ *Available Features:*\n"
+        "• Employee records & transfers\n"
+        "• School & district management\n"
+        "• Real-time analytics\n"
+        "• Security monitoring\n\n"
+        "Type *'help'* to see available commands! 🚀"
+    ),
+    'report': (
+        "📊 *3U1 IMS System Report*\n"
+        "━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        "👥 *Employee Statistics:*\n"
+        "• Total Employees: {employees_total}\n"
+        "• Active Staff: {employees_active}\n"
+        "• New Hires This Month: {employees_new_this_month}\n\n"
+        "🏫 *School Management:*\n"
+        "• Total Schools: {employees_schools}\n"
+        "• Zones: {employees_zones}\n\n"
+        "🔄 *Transfer Updates:*\n"
+        "• Pending Transfers: {transfers_pending}\n"
+        "• Approved: {transfers_approved}\n"
+        "• Completed: {transfers_completed}\n\n"
+        "✅ All systems operational!"
+    ),
+    'leave': (
+        "📝 *Leave Management System*\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        "✅ *Demo Leave Request Recorded!*\n\n"
+        "📋 *Leave Types Available:*\n"
+        "• Sick Leave: 12 days/year\n"
+        "• Casual Leave: 8 days/year\n"
+        "• Maternity Leave: 180 days\n"
+        "• Paternity Leave: 15 days\n\n"
+        "⏱️ *Processing Time:* 24-48 hours\n"
+        "📧 *Status Updates:* Via SMS & Email\n\n"
+        "🔗 Use the web dashboard for detailed leave management!"
+    ),
+    'transfer': (
+        "🔄 *Transfer Management System*\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        "📊 *Current Status:*\n"
+        "• Pending Requests: {transfers_pending}\n"
+        "• Approved: {transfers_approved}\n"
+        "• Rejected: {transfers_rejected}\n\n"
+        "📋 *Transfer Process:*\n"
+        "1️⃣ Submit request online\n"
+        "2️⃣ Department approval\n"
+        "3️⃣ Zone verification\n"
+        "4️⃣ Final posting order\n\n"
+        "⏱️ *Average Processing:* 15-30 days\n\n"
+        "Access full transfer management via dashboard!"
+    ),
+    'employee': (
+        "👥 *Employee Information System*\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        "🔍 *Search Capabilities:*\n"
+        "• By Name or Employee ID\n"
+        "• School-wise filtering\n"
+        "• Zone & District view\n"
+        "• Department-wise reports\n\n"
+        "📈 *Quick Stats:*\n"
+        "• Total Staff: {employees_total}\n"
+        "• Active Staff: {employees_active}\n"
+        "• Schools: {employees_schools}\n\n"
+        "🌐 Use the web interface for detailed employee management!"
+    ),
+    'help': (
+        "🤖 *3U1 IMS WhatsApp Bot Commands*\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        "💬 *Available Commands:*\n\n"
+        "🔸 *hello* - Welcome message & system info\n"
+        "🔸 *report* - View system statistics\n"
+        "🔸 *leave* - Leave management demo\n"
+        "🔸 *transfer* - Transfer system info\n"
+        "🔸 *employee* - Employee search info\n"
+        "🔸 *help* - Show this menu\n\n"
+        "🌐 *Full System Access:*\n"
+        "Visit the web dashboard for complete functionality!\n\n"
+        "📞 *Support:* Type any command to get started!"
+    ),
+    'analytics': (
+        "📊 *3U1 IMS Analytics Dashboard*\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        "⚡ *System Status:* All Green\n"
+        "🔐 *Security:* IP Tracking Active\n"
+        "💾 *Database:* Connected & Healthy\n\n"
+        "📈 *Today's Activity:*\n"
+        "• Login Attempts: {logins_total_logins_today}\n"
+        "• Unique Users: {logins_unique_users_today}\n"
+        "• Failed Logins: {logins_failed_attempts_today}\n\n"
+        "🔄 *Real-time Updates:*\n"
+        "• Employee transfers\n"
+        "• Leave applications\n"
+        "• System notifications\n\n"
+        "Access full analytics via web dashboard!"
+    ),
+}
+
+
+def whatsapp_reply(user_message, data_context):
+    """Reply of the WhatsApp bots to `user_message`; unknown commands get the help hint."""
+    intent = WHATSAPP_ROUTER.route(user_message)
+    if intent in WHATSAPP_REPLIES:
+        return data_context.render(WHATSAPP_REPLIES[intent])
+    
+    # Default response for unknown commands
+    return (
+        "❓ *Command Not Recognized*\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        f"I didn't understand: *'{user_message}'*\n\n"
+        "🤖 *Try these commands:*\n"
+        "• *hello* - Get started\n"
+        "• *report* - System statistics\n"
+        "• *leave* - Leave management\n"
+        "• *transfer* - Transfer info\n"
+        "• *employee* - Staff information\n"
+        "• *help* - Full command list\n\n"
+        "💡 Type *'help'* for all available options!"
+    )
@@ -0,0 +1,271 @@
+"""
+LLM Client - Process-wide chat completion client for the chatbot
+=================================================================
+
+generate_chatbot_response_with_ai() used to import groq and build a new
+Groq client (and so a new HTTP connection and TLS handshake) for every
+message, re-reading and logging the API key each time.
+
+LLMClientManager instead holds one backend per process:
+- GroqBackend wraps a single Groq SDK client over a persistent httpx
+  connection pool (keep-alive), with connect/read timeouts. The SDK's own
+  retries are disabled; the manager retries timeouts, connection errors,
+  429s and 5xx responses with exponential backoff and full jitter.
+- MockBackend answers locally (canned or echo responses, optional fake
+  latency) for tests and offline demos: LLM_BACKEND=mock. A canned
+  exception is raised instead of answering; TimeoutError and
+  ConnectionError count as transient, like a Groq timeout.
+- stream() yields text deltas as they arrive (stream=True), for the SSE
+  chat endpoint. Retries only happen before the first delta.
+
+The API key is read once at construction and never logged. Backends are
+created lazily and re-created after fork, because httpx pools must not be
+shared between gunicorn workers.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_KEYS = {'', 'your_groq_api_key_here', 'your-groq-api-key-here'}
+
+
+class LLMError(Exception):
+    """The completion failed after all retries (or no backend is configured)."""
+
+
+class _Retryable(Exception):
+    """Internal: wraps an error worth retrying."""
+
+
+class GroqBackend:
+    """Groq chat completions over a pooled keep-alive HTTP client."""
+
+    name = 'groq'
+
+    def __init__(self, api_key, timeout=20.0, connect_timeout=5.0,
+                 max_connections=10, keepalive_expiry=60.0, base_url=None):
+        import httpx
+        from groq import Groq
+
+        self._http = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections,
+                                keepalive_expiry=keepalive_expiry)
+        )
+        self._client = Groq(api_key=api_key, base_url=base_url, max_retries=0, http_client=self._http)
+
+    @staticmethod
+    def _retryable(error):
+        import groq
+        if isinstance(error, (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)):
+            return True  # APITimeoutError is an APIConnectionError
+        return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+    def complete(self, messages, **params):
+        try:
+            completion = self._client.chat.completions.create(messages=messages, **params)
+        except Exception as e:
+            if self._retryable(e):
+                raise _Retryable(e) from e
+            raise
+        return (completion.choices[0].message.content or '').strip()
+
+    def stream(self, messages, **params):
+        chunks = None
+        try:
+            chunks = self._client.chat.completions.create(messages=messages, stream=True, **params)
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            if self._retryable(e):
+                raise _Retryable(e) from e
+            raise
+        finally:
+            # Hand the connection back to the pool even if the client went away mid-reply
+            if chunks is not None:
+                chunks.close()
+
+    def close(self):
+        self._http.close()
+
+
+class MockBackend:
+    """Local stand-in for tests: canned responses or an echo of the last user message."""
+
+    name = 'mock'
+
+    def __init__(self, responses=None, latency=0.0):
+        self.responses = list(responses or [])
+        self.latency = latency
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def complete(self, messages, **params):
+        with self._lock:
+            self.calls.append({'messages': messages, **params})
+            canned = self.responses.pop(0) if self.responses else None
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(canned, (TimeoutError, ConnectionError)):
+            raise _Retryable(canned) from canned
+        if isinstance(canned, Exception):
+            raise canned
+        if canned is not None:
+            return canned
+        user_messages = [m['content'] for m in messages if m.get('role') == 'user']
+        return f"(mock) You said: {user_messages[-1] if user_messages else ''}"
+
+    def stream(self, messages, **params):
+        text = self.complete(messages, **params)
+        for i, word in enumerate(text.split(' ')):
+            yield word if i == 0 else ' ' + word
+
+    def close(self):
+        pass
+
+
+class LLMClientManager:
+    """Lazily created, per-process LLM backend with retries and call statistics."""
+
+    def __init__(self, backend='groq', api_key=None, model='llama-3.3-70b-versatile',
+                 timeout=20.0, connect_timeout=5.0, max_retries=2, backoff_base=0.5,
+                 backoff_max=4.0, max_connections=10, base_url=None, mock_responses=None):
+        self.backend_name = (backend or 'groq').lower()
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._api_key = api_key or ''
+        self._backend_options = {
+            'timeout': timeout, 'connect_timeout': connect_timeout,
+            'max_connections': max_connections, 'base_url': base_url,
+        }
+        self._mock_responses = mock_responses
+        self._backend = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'total_ms': 0.0,
+                      'streams': 0, 'first_token_ms': 0.0}
+
+    @property
+    def configured(self):
+        """True if a completion can be attempted (mock, or a real-looking API key)."""
+        return self.backend_name == 'mock' or self._api_key not in PLACEHOLDER_KEYS
+
+    def backend(self):
+        if self._backend is None or self._pid != os.getpid():
+            with self._lock:
+                if self._backend is None or self._pid != os.getpid():
+                    if self.backend_name == 'mock':
+                        self._backend = MockBackend(self._mock_responses)
+                    elif self.backend_name == 'groq':
+                        if not self.configured:
+                            raise LLMError('GROQ_API_KEY is not set')
+                        self._backend = GroqBackend(self._api_key, **self._backend_options)
+                    else:
+                        raise LLMError(f'Unknown LLM backend: {self.backend_name}')
+                    self._pid = os.getpid()
+        return self._backend
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter: uniform(0, min(cap, base * 2^attempt))
+        time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+    def complete(self, messages, model=None, **params):
+        """Return the completion text for `messages`; raises LLMError on failure."""
+        started = time.perf_counter()
+        try:
+            try:
+                backend = self.backend()
+            except LLMError:
+                raise
+            except Exception as e:  # e.g. groq/httpx not installed
+                raise LLMError(f"Could not create {self.backend_name} client: {e}") from e
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return backend.complete(messages, model=model or self.model, **params)
+                except _Retryable as e:
+                    if attempt == self.max_retries:
+                        raise LLMError(str(e.__cause__ or e)) from e
+                    self.stats['retries'] += 1
+                    logger.warning(f"⚠️ LLM call failed ({e.__cause__ or e}); retrying")
+                    self._sleep_before_retry(attempt)
+                except LLMError:
+                    raise
+                except Exception as e:
+                    raise LLMError(str(e)) from e
+        except LLMError:
+            self.stats['failures'] += 1
+            raise
+        finally:
+            self.stats['calls'] += 1
+            self.stats['total_ms'] += (time.perf_counter() - started) * 1000
+
+    def stream(self, messages, model=None, **params):
+        """
+        Yield completion text deltas; raises LLMError on failure.
+
+        Failures before the first delta are retried like complete(); once
+        text has been yielded the error is raised to the caller.
+        """
+        started = time.perf_counter()
+        try:
+            try:
+                backend = self.backend()
+            except LLMError:
+                raise
+            except Exception as e:
+                raise LLMError(f"Could not create {self.backend_name} client: {e}") from e
+            for attempt in range(self.max_retries + 1):
+                yielded = False
+                try:
+                    for delta in backend.stream(messages, model=model or self.model, **params):
+                        if not yielded:
+                            yielded = True
+                            self.stats['first_token_ms'] += (time.perf_counter() - started) * 1000
+                            self.stats['streams'] += 1
+                        yield delta
+                    return
+                except _Retryable as e:
+                    if yielded or attempt == self.max_retries:
+                        raise LLMError(str(e.__cause__ or e)) from e
+                    self.stats['retries'] += 1
+                    logger.warning(f"⚠️ LLM stream failed ({e.__cause__ or e}); retrying")
+                    self._sleep_before_retry(attempt)
+                except LLMError:
+                    raise
+                except Exception as e:
+                    raise LLMError(str(e)) from e
+        except LLMError:
+            self.stats['failures'] += 1
+            raise
+        finally:
+            self.stats['calls'] += 1
+            self.stats['total_ms'] += (time.perf_counter() - started) * 1000
+
+    def info(self):
+        calls = self.stats['calls']
+        streams = self.stats['streams']
+        return {
+            'backend': self.backend_name,
+            'model': self.model,
+            'configured': self.configured,
+            'calls': calls,
+            'retries': self.stats['retries'],
+            'failures': self.stats['failures'],
+            'avg_ms': round(self.stats['total_ms'] / calls, 1) if calls else None,
+            'avg_first_token_ms': round(self.stats['first_token_ms'] / streams, 1) if streams else None,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._backend is not None and self._pid == os.getpid():
+                self._backend.close()
+            self._backend = None
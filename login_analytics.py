@@ -0,0 +1,338 @@
+"""
+Login Analytics - Incremental per-minute/hour/day login rollups
+===============================================================
+
+Backs the `login_stats` block of /api/analytics/summary. Instead of scanning
+raw login logs, each persisted batch of login entries is folded into rollup
+buckets (one per minute, hour and day) holding:
+
+    total, success, failure        - counters
+    device / browser / os          - breakdowns from parse_user_agent
+    hll                            - HyperLogLog registers for unique users
+
+Buckets live in the MongoDB `login_rollups` collection (counters via $inc,
+HyperLogLog registers via per-register $max, expiry via a TTL index) or, when
+MongoDB is unavailable, in a small JSON file next to the login log segments.
+Reading today's numbers is a single bucket lookup regardless of log volume.
+
+Each batch has an id derived from its entries' `_id`s, and a bucket
+remembers the last BATCH_MEMORY batch ids applied to it. The MongoDB update
+only matches a bucket that has not seen the batch, so replaying a batch
+whose bulk_write failed ambiguously (the deferred replay, or the audit
+writer's retry) does not count it twice; the already-applied updates fail
+with a duplicate key and are skipped.
+
+The file fallback does not rewrite the rollups per batch: each batch's
+deltas are appended as one line to a journal (`<path>.journal`), folded
+into the snapshot at `path` once the journal reaches `compact_bytes`.
+Readers fold the journal lines added since their last read.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+
+from login_log_store import file_lock
+from mongo_connection import usable, defer_write
+
+logger = logging.getLogger(__name__)
+
+HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error
+
+# granularity -> (bucket key format, retention)
+GRANULARITIES = {
+    'minute': ('%Y-%m-%dT%H:%M', datetime.timedelta(hours=2)),
+    'hour': ('%Y-%m-%dT%H', datetime.timedelta(days=2)),
+    'day': ('%Y-%m-%d', datetime.timedelta(days=90)),
+}
+
+BREAKDOWN_FIELDS = {'device': 'device_type', 'browser': 'browser', 'os': 'os'}
+
+BATCH_MEMORY = 100  # batch ids remembered per MongoDB bucket
+FILE_BATCH_MEMORY = 1000  # batch ids remembered by the file fallback
+
+DUPLICATE_KEY = 11000
+
+
+class HyperLogLog:
+    """Sparse HyperLogLog; registers map register index -> max rank seen."""
+
+    def __init__(self, registers=None, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = {int(k): v for k, v in (registers or {}).items()}
+
+    def add(self, value):
+        x = int.from_bytes(hashlib.sha1(str(value).encode('utf-8')).digest()[:8], 'big')
+        bits = 64 - self.precision
+        index = x >> bits
+        rank = bits - (x & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers.get(index, 0):
+            self.registers[index] = rank
+
+    def merge(self, registers):
+        for index, rank in registers.items():
+            index = int(index)
+            if rank > self.registers.get(index, 0):
+                self.registers[index] = rank
+
+    def count(self):
+        m = 1 << self.precision
+        alpha = 0.7213 / (1 + 1.079 / m)
+        zeros = m - len(self.registers)
+        harmonic = zeros + sum(2.0 ** -rank for rank in self.registers.values())
+        estimate = alpha * m * m / harmonic
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+def _safe_key(value):
+    """MongoDB field names cannot contain '.' or start with '$'."""
+    return str(value or 'unknown').replace('.', '_').lstrip('$') or 'unknown'
+
+
+def _parse_timestamp(value):
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.datetime.now(datetime.timezone.utc)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+def bucket_id(granularity, when):
+    return f"{granularity}:{when.strftime(GRANULARITIES[granularity][0])}"
+
+
+def _empty_bucket():
+    return {'total': 0, 'success': 0, 'failure': 0,
+            'device': {}, 'browser': {}, 'os': {}, 'hll': {}}
+
+
+def batch_id(entries):
+    """Stable id of a batch of log entries (by `_id`, else by content)."""
+    digest = hashlib.blake2b(digest_size=12)
+    for entry in entries:
+        key = entry['_id'] if '_id' in entry else json.dumps(entry, sort_keys=True, default=str)
+        digest.update(str(key).encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def _fold(buckets, deltas):
+    """Add serialized `deltas` (bucket id -> delta) into `buckets`."""
+    for key, delta in deltas.items():
+        bucket = buckets.setdefault(key, _empty_bucket())
+        for counter in ('total', 'success', 'failure'):
+            bucket[counter] += delta[counter]
+        for field in BREAKDOWN_FIELDS:
+            for name, count in delta[field].items():
+                bucket[field][name] = bucket[field].get(name, 0) + count
+        hll = HyperLogLog(bucket['hll'])
+        hll.merge(delta['hll'])
+        bucket['hll'] = {str(k): v for k, v in hll.registers.items()}
+        bucket['expires_at'] = max(bucket.get('expires_at', ''), delta['expires_at'])
+
+
+class LoginRollups:
+    """Maintains login rollup buckets in MongoDB or a local JSON file."""
+
+    def __init__(self, collection=None, path='logs/login_rollups.json', create_indexes=True,
+                 compact_bytes=256 * 1024):
+        self.collection = collection
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        # Folded file state, and the snapshot/journal it was read from
+        self._file_state = {'snapshot': None, 'journal': None, 'offset': 0,
+                            'buckets': {}, 'batches': []}
+        if collection is not None and create_indexes:
+            try:
+                collection.create_index('expires_at', expireAfterSeconds=0)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create rollup TTL index: {e}")
+
+    # ---------- writes ----------
+
+    def _deltas(self, entries):
+        """Fold entries into per-bucket deltas."""
+        deltas = {}
+        for entry in entries:
+            when = _parse_timestamp(entry.get('timestamp'))
+            for granularity in GRANULARITIES:
+                key = bucket_id(granularity, when)
+                delta = deltas.get(key)
+                if delta is None:
+                    delta = deltas[key] = _empty_bucket()
+                    delta['hll'] = HyperLogLog()
+                    delta['expires_at'] = when + GRANULARITIES[granularity][1]
+                delta['total'] += 1
+                delta['success' if entry.get('success') else 'failure'] += 1
+                for field, source in BREAKDOWN_FIELDS.items():
+                    name = _safe_key(entry.get(source))
+                    delta[field][name] = delta[field].get(name, 0) + 1
+                if entry.get('username'):
+                    delta['hll'].add(entry['username'])
+        return deltas
+
+    def record_many(self, entries):
+        """Apply a batch of login log entries to the rollups (at most once per batch)."""
+        if not entries:
+            return
+        batch = batch_id(entries)
+        deltas = self._deltas(entries)
+        if usable(self.collection):
+            try:
+                self._write_mongo(self._mongo_ops(batch, deltas))
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB rollup write failed: {e}. Falling back to file.")
+        defer_write(self.collection, 'bulk_write', self._mongo_ops(batch, deltas), ordered=False)
+        self._apply_file(batch, deltas)
+
+    def _write_mongo(self, ops):
+        from pymongo.errors import BulkWriteError
+
+        try:
+            self.collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate keys are buckets that already have this batch
+            errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != DUPLICATE_KEY]
+            if errors or e.details.get('writeConcernErrors'):
+                raise
+
+    def _mongo_ops(self, batch, deltas):
+        from pymongo import UpdateOne
+
+        ops = []
+        for key, delta in deltas.items():
+            inc = {'total': delta['total'], 'success': delta['success'], 'failure': delta['failure']}
+            for field in BREAKDOWN_FIELDS:
+                for name, count in delta[field].items():
+                    inc[f'{field}.{name}'] = count
+            update = {'$inc': inc, '$max': {'expires_at': delta['expires_at']},
+                      '$push': {'batches': {'$each': [batch], '$slice': -BATCH_MEMORY}}}
+            for index, rank in delta['hll'].registers.items():
+                update['$max'][f'hll.{index}'] = rank
+            ops.append(UpdateOne({'_id': key, 'batches': {'$ne': batch}}, update, upsert=True))
+        return ops
+
+    def _apply_file(self, batch, deltas):
+        line = json.dumps({'batch': batch, 'deltas': {
+            key: dict(delta, hll={str(k): v for k, v in delta['hll'].registers.items()},
+                      expires_at=delta['expires_at'].isoformat())
+            for key, delta in deltas.items()
+        }})
+        with file_lock(self.path + '.lock', self._lock):
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                size = f.tell()
+            if size >= self.compact_bytes:
+                self._compact()
+
+    def _compact(self):
+        """Write the folded rollups as the new snapshot and start an empty journal."""
+        state = self._load_file()
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        buckets = {k: v for k, v in state['buckets'].items() if v.get('expires_at', now) >= now}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'buckets': buckets, 'batches': state['batches']}, f)
+        os.replace(tmp_path, self.path)
+        with open(self.journal_path + '.tmp', 'w', encoding='utf-8'):
+            pass
+        os.replace(self.journal_path + '.tmp', self.journal_path)
+
+    # ---------- reads ----------
+
+    def _load_file(self):
+        """
+        Return the file state {'buckets', 'batches'} folded from the snapshot
+        and journal (shared; do not mutate). Call with the file lock held.
+        Only journal lines added since the last call are parsed.
+        """
+        state = self._file_state
+        try:
+            snapshot = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            snapshot = None
+        try:
+            journal = os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            journal = None
+        if (snapshot, journal) != (state['snapshot'], state['journal']):
+            # Compacted (or first read): start over from the snapshot
+            data = {}
+            if snapshot is not None:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except ValueError:
+                    data = {}
+            if 'buckets' not in data:
+                data = {'buckets': data, 'batches': []}  # pre-journal file: buckets only
+            state = {'snapshot': snapshot, 'journal': journal, 'offset': 0,
+                     'buckets': data['buckets'], 'batches': data['batches']}
+        if journal is not None:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                f.seek(state['offset'])
+                lines = f.readlines()
+            applied = set(state['batches'])
+            for line in lines:
+                if not line.endswith('\n'):
+                    break
+                state['offset'] += len(line.encode('utf-8'))
+                record = json.loads(line)
+                if record['batch'] in applied:
+                    continue
+                applied.add(record['batch'])
+                state['batches'] = (state['batches'] + [record['batch']])[-FILE_BATCH_MEMORY:]
+                _fold(state['buckets'], record['deltas'])
+        self._file_state = state
+        return state
+
+    def bucket(self, granularity, when=None):
+        """Return the rollup for the bucket containing `when` (default: now)."""
+        when = when or datetime.datetime.now(datetime.timezone.utc)
+        key = bucket_id(granularity, when)
+        doc = None
+        if usable(self.collection):
+            try:
+                doc = self.collection.find_one({'_id': key})
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB rollup read failed: {e}. Falling back to file.")
+        if doc is None:
+            with file_lock(self.path + '.lock', self._lock):
+                doc = self._load_file()['buckets'].get(key)
+        doc = doc or _empty_bucket()
+        return {
+            'total': doc.get('total', 0),
+            'success': doc.get('success', 0),
+            'failure': doc.get('failure', 0),
+            'unique_users': HyperLogLog(doc.get('hll')).count(),
+            'device': dict(doc.get('device', {})),
+            'browser': dict(doc.get('browser', {})),
+            'os': dict(doc.get('os', {})),
+        }
+
+    def summary(self, now=None):
+        """Return the login_stats block for /api/analytics/summary."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        today = self.bucket('day', now)
+        last_hour = self.bucket('hour', now)
+        return {
+            'total_logins_today': today['total'],
+            'successful_logins_today': today['success'],
+            'failed_attempts_today': today['failure'],
+            'unique_users_today': today['unique_users'],
+            'logins_this_hour': last_hour['total'],
+            'devices_today': today['device'],
+            'browsers_today': today['browser'],
+            'os_today': today['os'],
+        }
@@ -0,0 +1,78 @@
+"""
+Login Log Export - Streaming CSV/NDJSON encoding
+================================================
+
+Turns an iterator of login log entries into an iterator of byte chunks for
+a streamed HTTP response. Rows are encoded a batch at a time and optionally
+gzip-compressed incrementally, so memory use stays constant no matter how
+many entries the underlying MongoDB cursor or JSONL segments yield.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+CSV_COLUMNS = ['timestamp', 'username', 'success', 'client_ip', 'server_ip',
+               'device_type', 'browser', 'os', 'user_agent', 'note']
+
+ROWS_PER_CHUNK = 500
+
+# Leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    """Quote attacker-controlled text (username, user agent) out of formula mode."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _encode(rows, fmt):
+    """Yield text chunks of ROWS_PER_CHUNK encoded rows."""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+
+        def write(row):
+            writer.writerow({column: _csv_cell(row.get(column)) for column in CSV_COLUMNS})
+    else:
+        def write(row):
+            buffer.write(json.dumps(row, ensure_ascii=False, default=str))
+            buffer.write('\n')
+
+    pending = 0
+    for row in rows:
+        write(row)
+        pending += 1
+        if pending >= ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_chunks(rows, fmt='csv', compress=False):
+    """Yield encoded (and optionally gzip-compressed) byte chunks."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if not compress:
+        for text in _encode(rows, fmt):
+            yield text.encode('utf-8')
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for text in _encode(rows, fmt):
+        data = compressor.compress(text.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,188 @@
+"""
+Login Log Query - Indexed, cursor-paginated reads from MongoDB
+==============================================================
+
+Backs /api/login-logs/logs when MongoDB is available.
+
+- Indexes on (username, timestamp) and timestamp cover every filter/sort
+  combination the endpoint issues.
+- Username filters are exact or anchored-prefix matches, which MongoDB can
+  answer from the index (an unanchored case-insensitive $regex cannot).
+- Keyset pagination: each page returns an opaque `nextCursor` encoding the
+  (timestamp, _id) of its last row; the next page seeks past it instead of
+  skipping over every earlier row. Callers paging by number get the same
+  seek: the cursor ending each page served is remembered for a short TTL,
+  so page N starts from the nearest known page before it and only skips
+  the pages between (none when paging forward one page at a time).
+- Totals come from estimated_document_count() when unfiltered and from a
+  short-lived cache of count_documents() otherwise.
+"""
+
+import base64
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo import ASCENDING, DESCENDING
+
+MATCH_MODES = ('prefix', 'exact', 'contains')
+COUNT_CACHE_TTL = 30  # seconds
+PAGE_CURSOR_CACHE = 256  # (filter, limit) combinations whose page cursors are kept
+
+
+def ensure_login_log_indexes(collection):
+    """Create the indexes used by the login log queries (idempotent)."""
+    collection.create_index([('username', ASCENDING), ('timestamp', DESCENDING)],
+                            name='username_timestamp')
+    collection.create_index([('timestamp', DESCENDING)], name='timestamp')
+
+
+def build_username_filter(username, match='prefix'):
+    """Return a MongoDB filter for the username search mode."""
+    if not username:
+        return {}
+    if match == 'exact':
+        return {'username': username}
+    if match == 'contains':
+        # Legacy behaviour; cannot use the index
+        return {'username': {'$regex': re.escape(username), '$options': 'i'}}
+    return {'username': {'$regex': '^' + re.escape(username)}}
+
+
+def username_matches(value, username, match='prefix'):
+    """Python equivalent of build_username_filter for file-backed logs."""
+    if not username:
+        return True
+    value = value or ''
+    if match == 'exact':
+        return value == username
+    if match == 'contains':
+        return username.lower() in value.lower()
+    return value.startswith(username)
+
+
+def encode_cursor(log):
+    """Encode the sort key of the last row on a page as an opaque token."""
+    raw = f"{log['timestamp']}|{log['_id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, _id string) from a cursor token, or None if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, _, object_id = raw.rpartition('|')
+        return (timestamp, object_id) if timestamp and object_id else None
+    except (ValueError, UnicodeError):
+        return None
+
+
+class LoginLogQuery:
+    """Runs login log queries against a MongoDB collection."""
+
+    def __init__(self, collection, count_cache_ttl=COUNT_CACHE_TTL):
+        self.collection = collection
+        self.count_cache_ttl = count_cache_ttl
+        self._count_cache = {}
+        self._page_cursors = OrderedDict()  # (filter, limit) -> {page: cursor to start it}
+        self._lock = threading.Lock()
+
+    def count(self, query):
+        """Return (total, is_estimate) for a filter, cached for a short TTL."""
+        if not query:
+            return self.collection.estimated_document_count(), True
+
+        key = repr(sorted(query.items()))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._count_cache.get(key)
+            if cached and cached[1] > now:
+                return cached[0], True
+
+        total = self.collection.count_documents(query)
+        with self._lock:
+            if len(self._count_cache) > 1000:
+                self._count_cache.clear()
+            self._count_cache[key] = (total, now + self.count_cache_ttl)
+        return total, False
+
+    def _nearest_page(self, pages_key, page):
+        """Return (known page <= page, cursor starting it); (1, None) if none is known."""
+        now = time.monotonic()
+        with self._lock:
+            pages = self._page_cursors.get(pages_key, {})
+            known = max((p for p, (_, expires_at) in pages.items() if p <= page and expires_at > now),
+                        default=1)
+            return known, pages[known][0] if known in pages else None
+
+    def _remember_page(self, pages_key, page, cursor):
+        # New logs shift page boundaries, so remembered cursors expire like counts
+        now = time.monotonic()
+        with self._lock:
+            pages = self._page_cursors.setdefault(pages_key, {})
+            self._page_cursors.move_to_end(pages_key)
+            for expired in [p for p, (_, expires_at) in pages.items() if expires_at <= now]:
+                del pages[expired]
+            pages[page] = (cursor, now + self.count_cache_ttl)
+            while len(self._page_cursors) > PAGE_CURSOR_CACHE:
+                self._page_cursors.popitem(last=False)
+
+    def find(self, username='', match='prefix', limit=50, page=1, cursor=None):
+        """
+        Return a page of logs, newest first.
+
+        When `cursor` is given it takes precedence over `page`.
+        Returns a dict with logs, total, totalIsEstimate and nextCursor.
+        """
+        from bson import ObjectId
+        from bson.errors import InvalidId
+
+        query = build_username_filter(username, match)
+        total, is_estimate = self.count(query)
+
+        page_query = dict(query)
+        pages_key = (repr(sorted(query.items())), limit)
+        by_page = not cursor
+        skip = 0
+        if by_page and page > 1:
+            known, cursor = self._nearest_page(pages_key, page)
+            skip = (page - known) * limit
+        seek = decode_cursor(cursor) if cursor else None
+        if seek:
+            timestamp, object_id = seek
+            try:
+                oid = ObjectId(object_id)
+                page_query['$or'] = [
+                    {'timestamp': {'$lt': timestamp}},
+                    {'timestamp': timestamp, '_id': {'$lt': oid}}
+                ]
+            except InvalidId:
+                page_query['timestamp'] = {'$lt': timestamp}
+
+        results = (self.collection.find(page_query)
+                   .sort([('timestamp', DESCENDING), ('_id', DESCENDING)])
+                   .limit(limit))
+        if skip:
+            results = results.skip(skip)
+
+        logs = list(results)
+        next_cursor = encode_cursor(logs[-1]) if len(logs) == limit else None
+        if next_cursor and by_page:
+            self._remember_page(pages_key, page + 1, next_cursor)
+        for log in logs:
+            log['_id'] = str(log['_id'])
+
+        return {
+            'logs': logs,
+            'total': total,
+            'totalIsEstimate': is_estimate,
+            'nextCursor': next_cursor
+        }
+
+
+def iter_login_logs(collection, username='', match='prefix', batch_size=1000):
+    """Stream matching logs oldest first from MongoDB without materializing them."""
+    return (collection.find(build_username_filter(username, match), {'_id': 0})
+            .sort('timestamp', ASCENDING)
+            .batch_size(batch_size))
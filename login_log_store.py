@@ -0,0 +1,347 @@
+"""
+Login Log Store - Append-only JSONL storage for the file fallback
+=================================================================
+
+Used by unified_app.py when MongoDB is unavailable. Every login attempt is
+written as a single JSON line to the active segment, so recording an attempt
+costs one small append instead of re-reading and rewriting the whole log.
+
+Layout inside the log directory:
+    login_logs.jsonl                 <- active segment (appended to)
+    login_logs-<timestamp_ns>.jsonl  <- rotated segments (read-only)
+    login_logs.lock                  <- cross-process lock file
+
+Appends and rotation happen under an exclusive file lock so the gunicorn
+workers can share one directory without losing or interleaving entries.
+A daemon thread periodically compacts the directory by dropping the oldest
+rotated segments beyond the retention limit.
+
+LoginLogView keeps a parsed, timestamp-ordered copy of the segments in
+memory with a per-username index. It re-stats the segments on each query
+and only reads bytes appended since the last refresh, so the fallback
+read path no longer re-parses or re-scans the whole log per request.
+"""
+
+import bisect
+import glob
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from login_log_query import decode_cursor, encode_cursor, username_matches
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_BYTES = 1024 * 1024  # 1MB per segment
+DEFAULT_MAX_SEGMENTS = 20
+DEFAULT_COMPACT_INTERVAL = 300  # seconds
+
+
+@contextmanager
+def file_lock(lock_path, thread_lock):
+    """Exclusive lock shared by threads (thread_lock) and processes (flock)."""
+    with thread_lock:
+        os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+        with open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class LoginLogStore:
+    """Append-only, size-rotated JSONL log of login attempts."""
+
+    def __init__(self, directory='logs', prefix='login_logs',
+                 max_segment_bytes=DEFAULT_SEGMENT_BYTES,
+                 max_segments=DEFAULT_MAX_SEGMENTS,
+                 legacy_file=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+        self.active_path = os.path.join(directory, f'{prefix}.jsonl')
+        self.lock_path = os.path.join(directory, f'{prefix}.lock')
+        self._thread_lock = threading.Lock()
+        self._compactor = None
+        self._stop = threading.Event()
+
+        os.makedirs(directory, exist_ok=True)
+        if legacy_file:
+            self._import_legacy(legacy_file)
+
+    # ---------- locking ----------
+
+    def _locked(self):
+        """Hold both the in-process and the cross-process lock."""
+        return file_lock(self.lock_path, self._thread_lock)
+
+    # ---------- writes ----------
+
+    def append(self, entry):
+        """Append a single log entry."""
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        """Append several log entries with a single locked write."""
+        if not entries:
+            return
+        payload = ''.join(
+            json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+            for entry in entries
+        )
+        with self._locked():
+            with open(self.active_path, 'a', encoding='utf-8') as f:
+                f.write(payload)
+                size = f.tell()
+            if size >= self.max_segment_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        """Seal the active segment. Caller must hold the lock."""
+        if not os.path.exists(self.active_path):
+            return
+        sealed = os.path.join(self.directory, f'{self.prefix}-{time.time_ns():020d}.jsonl')
+        os.replace(self.active_path, sealed)
+
+    # ---------- reads ----------
+
+    def segments(self):
+        """Return segment paths ordered oldest first (active segment last)."""
+        rotated = sorted(glob.glob(os.path.join(self.directory, f'{self.prefix}-*.jsonl')))
+        if os.path.exists(self.active_path):
+            rotated.append(self.active_path)
+        return rotated
+
+    def iter_entries(self):
+        """Yield entries oldest first, skipping partial or corrupted lines."""
+        for path in self.segments():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+            except FileNotFoundError:
+                # Segment removed by a concurrent compaction
+                continue
+
+    def iter_matching(self, username='', match='prefix'):
+        """Yield entries oldest first whose username matches the filter."""
+        for entry in self.iter_entries():
+            if username_matches(entry.get('username'), username, match):
+                yield entry
+
+    def read_all(self):
+        """Return every retained entry, oldest first."""
+        return list(self.iter_entries())
+
+    # ---------- maintenance ----------
+
+    def compact(self):
+        """Drop the oldest rotated segments beyond the retention limit."""
+        with self._locked():
+            rotated = sorted(glob.glob(os.path.join(self.directory, f'{self.prefix}-*.jsonl')))
+            excess = len(rotated) - self.max_segments
+            for path in rotated[:max(excess, 0)]:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not remove log segment {path}: {e}")
+
+    def start_compactor(self, interval=DEFAULT_COMPACT_INTERVAL):
+        """Run compact() periodically on a daemon thread (idempotent)."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error(f"Login log compaction failed: {e}")
+
+        self._compactor = threading.Thread(target=run, name='login-log-compactor', daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        self._stop.set()
+
+    def _import_legacy(self, legacy_file):
+        """Convert an old login_logs.json array into the oldest segment, once."""
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read legacy log file {legacy_file}: {e}")
+            return
+        with self._locked():
+            if not os.path.exists(legacy_file):
+                # Another worker already migrated it
+                return
+            sealed = os.path.join(self.directory, f'{self.prefix}-{0:020d}.jsonl')
+            with open(sealed, 'a', encoding='utf-8') as f:
+                for entry in legacy if isinstance(legacy, list) else []:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            os.replace(legacy_file, legacy_file + '.migrated')
+        logger.info(f"📂 Migrated {legacy_file} into {self.directory}")
+
+
+class LoginLogView:
+    """In-memory, incrementally refreshed index over a LoginLogStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._reset()
+
+    def _reset(self):
+        # Rows are (timestamp, id, seq, entry) tuples kept in ascending order,
+        # the same (timestamp, _id) order as the MongoDB query, so cursors
+        # work across both. seq keeps entry dicts from ever being compared.
+        self._rows = []
+        self._by_username = {}
+        self._usernames = []  # sorted distinct usernames for prefix search
+        self._offsets = {}    # file identity -> bytes already parsed
+        self._signature = None
+
+    @staticmethod
+    def _identity(path, st):
+        return (st.st_dev, st.st_ino) if st.st_ino else path
+
+    def _stat_segments(self):
+        stats = []
+        for path in self.store.segments():
+            try:
+                stats.append((path, os.stat(path)))
+            except FileNotFoundError:
+                continue
+        return stats
+
+    def refresh(self):
+        """Parse any bytes appended since the last refresh."""
+        with self._lock:
+            stats = self._stat_segments()
+            signature = tuple((path, st.st_mtime_ns, st.st_size) for path, st in stats)
+            if signature == self._signature:
+                return
+
+            identities = {self._identity(path, st) for path, st in stats}
+            if not set(self._offsets) <= identities:
+                # A segment was compacted away: rebuild from scratch
+                self._reset()
+
+            for path, st in stats:
+                key = self._identity(path, st)
+                offset = self._offsets.get(key, 0)
+                if st.st_size > offset:
+                    self._offsets[key] = self._read_from(path, offset)
+                else:
+                    self._offsets.setdefault(key, offset)
+            self._signature = signature
+
+    def _read_from(self, path, offset):
+        """Index complete lines after `offset`; return the new offset."""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        # Partially written line; pick it up next refresh
+                        break
+                    offset += len(raw)
+                    try:
+                        self._insert(json.loads(raw), raw)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return offset
+
+    @staticmethod
+    def _row_id(entry, raw):
+        """The entry's _id; rows written before ids existed get a hash of their line."""
+        if entry.get('_id'):
+            return str(entry['_id'])
+        return 'h' + hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+    def _insert(self, entry, raw):
+        row = (entry.get('timestamp') or '', self._row_id(entry, raw), next(self._seq), entry)
+        if not self._rows or row >= self._rows[-1]:
+            self._rows.append(row)
+        else:
+            bisect.insort(self._rows, row)
+
+        username = entry.get('username') or ''
+        rows = self._by_username.get(username)
+        if rows is None:
+            rows = self._by_username[username] = []
+            bisect.insort(self._usernames, username)
+        if not rows or row >= rows[-1]:
+            rows.append(row)
+        else:
+            bisect.insort(rows, row)
+
+    def _matching_rows(self, username, match):
+        """Return the ascending rows that satisfy the username filter."""
+        if not username:
+            return self._rows
+        if match == 'exact':
+            return self._by_username.get(username, [])
+        if match == 'contains':
+            names = [name for name in self._usernames if username_matches(name, username, match)]
+        else:
+            start = bisect.bisect_left(self._usernames, username)
+            names = list(itertools.takewhile(lambda name: name.startswith(username),
+                                             itertools.islice(self._usernames, start, None)))
+        if len(names) == 1:
+            return self._by_username[names[0]]
+        return list(heapq.merge(*(self._by_username[name] for name in names)))
+
+    def query(self, username='', match='prefix', limit=50, page=1, cursor=None):
+        """Return a newest-first page shaped like LoginLogQuery.find()."""
+        self.refresh()
+        with self._lock:
+            rows = self._matching_rows(username, match)
+            total = len(rows)
+
+            # Newest-first position p maps to ascending index total - 1 - p
+            seek = decode_cursor(cursor) if cursor else None
+            if seek:
+                end = bisect.bisect_left(rows, seek)
+            else:
+                end = total - (page - 1) * limit
+            start = max(end - limit, 0)
+            page_rows = rows[start:max(end, 0)][::-1]
+
+        logs = [row[3] for row in page_rows]
+        next_cursor = None
+        if start > 0 and logs:
+            next_cursor = encode_cursor({'timestamp': page_rows[-1][0], '_id': page_rows[-1][1]})
+        return {
+            'logs': logs,
+            'total': total,
+            'totalIsEstimate': False,
+            'nextCursor': next_cursor
+        }
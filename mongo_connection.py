@@ -0,0 +1,470 @@
+"""
+Mongo Connection - Fork-safe, lazily connected MongoDB client per process
+=========================================================================
+
+unified_app.py used to create one MongoClient at import time and ping it.
+Under gunicorn that client could be inherited by forked workers (PyMongo
+clients are not fork-safe), and if MongoDB was down at boot the app stayed
+on file fallback until restarted.
+
+MongoConnection instead:
+- creates the MongoClient on first use in each process (and drops an
+  inherited one after fork), with pool size and timeouts from the
+  environment;
+- while disconnected, raises MongoUnavailable immediately and retries in a
+  background thread, backing off exponentially with jitter (so a down
+  database costs one fast exception per call, not a server selection
+  timeout on a request thread);
+- hands out LazyCollection proxies, so stores can be constructed at import
+  time and keep working across reconnects. Indexes requested through a
+  proxy are re-created on every new connection;
+- counts pool events (connections created/closed, checkouts in flight,
+  checkout failures) for /api/system/health.
+
+Every call made through a LazyCollection is reported to one CircuitBreaker
+per process; calls returning a cursor are reported as the cursor is
+consumed, since that is when their network I/O happens. After repeated connection failures (or as soon as the driver
+sees no reachable server) the circuit opens: `usable()` turns False and
+stores write to their local files without trying MongoDB at all. Those
+local writes are also queued with `defer_write()`. When the half-open ping
+succeeds, the queue is replayed to MongoDB in order.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, PyMongoError
+from pymongo.monitoring import ConnectionPoolListener, TopologyListener
+
+from circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class MongoUnavailable(ConnectionFailure):
+    """MongoDB is down and the next reconnect attempt is not due yet."""
+
+
+class _PoolStats(ConnectionPoolListener):
+    """Connection pool counters for one client."""
+
+    def __init__(self):
+        self.counts = {'created': 0, 'closed': 0, 'checked_out': 0, 'checkout_failed': 0, 'pool_cleared': 0}
+        self._lock = threading.Lock()
+
+    def _bump(self, key, delta=1):
+        with self._lock:
+            self.counts[key] += delta
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._bump('pool_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._bump('created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._bump('closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._bump('checkout_failed')
+
+    def connection_checked_out(self, event):
+        self._bump('checked_out')
+
+    def connection_checked_in(self, event):
+        self._bump('checked_out', -1)
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts['open'] = counts['created'] - counts['closed']
+        return counts
+
+
+class _TopologyWatch(TopologyListener):
+    """Trips the circuit as soon as the driver loses every readable server."""
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        if (event.previous_description.has_readable_server()
+                and not event.new_description.has_readable_server()):
+            self.breaker.trip()
+
+    def closed(self, event):
+        pass
+
+
+def _guarded(breaker, call, args, kwargs):
+    """Run a driver call, counting connection failures against the breaker."""
+    try:
+        return call(*args, **kwargs)
+    except MongoUnavailable:
+        raise
+    except ConnectionFailure:
+        breaker.record_failure()
+        raise
+
+
+def _is_cursor(result):
+    return hasattr(type(result), '__next__')
+
+
+class _BreakerCursor:
+    """
+    Cursor proxy: find()/aggregate() results are lazy, so success or failure
+    is recorded when documents are fetched, not when the cursor is built.
+    """
+
+    def __init__(self, cursor, breaker):
+        self._cursor = cursor
+        self._breaker = breaker
+
+    def __getattr__(self, attr):
+        value = getattr(self._cursor, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            result = _guarded(self._breaker, value, args, kwargs)
+            # sort()/skip()/limit() return the (or a new) cursor to chain on
+            if result is self._cursor:
+                return self
+            return _BreakerCursor(result, self._breaker) if _is_cursor(result) else result
+        return call
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            document = _guarded(self._breaker, next, (self._cursor,), {})
+        except StopIteration:
+            self._breaker.record_success()
+            raise
+        self._breaker.record_success()
+        return document
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class LazyCollection:
+    """Stand-in for a pymongo Collection that resolves through the manager on use."""
+
+    def __init__(self, manager, name):
+        self._manager = manager
+        self._name = name
+
+    @property
+    def available(self):
+        return self._manager.available()
+
+    def create_index(self, keys, **kwargs):
+        self._manager.register_index(self._name, keys, kwargs)
+        return self._manager.collection(self._name).create_index(keys, **kwargs)
+
+    def defer(self, method, *args, **kwargs):
+        """Queue a write to replay on this collection once MongoDB is back."""
+        self._manager.defer(self._name, method, args, kwargs)
+
+    def __getattr__(self, attr):
+        value = getattr(self._manager.collection(self._name), attr)
+        if not callable(value):
+            return value
+        breaker = self._manager.breaker
+
+        def call(*args, **kwargs):
+            result = _guarded(breaker, value, args, kwargs)
+            if _is_cursor(result):
+                return _BreakerCursor(result, breaker)
+            breaker.record_success()
+            return result
+        return call
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r})"
+
+
+class LazyDatabase:
+    """`db.users` style access returning LazyCollection proxies."""
+
+    def __init__(self, manager):
+        self._manager = manager
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections.setdefault(name, LazyCollection(self._manager, name))
+        return collection
+
+    def __getitem__(self, name):
+        return self.__getattr__(name)
+
+
+def usable(collection):
+    """True if `collection` is set and its circuit (for LazyCollection) is closed."""
+    if isinstance(collection, LazyCollection):
+        return collection.available
+    return collection is not None
+
+
+def defer_write(collection, method, *args, **kwargs):
+    """Queue a write that fell back to a local store for replay to MongoDB."""
+    if isinstance(collection, LazyCollection):
+        collection.defer(method, *args, **kwargs)
+
+
+class MongoConnection:
+    """Per-process MongoClient with reconnect backoff and pool statistics."""
+
+    def __init__(self, uri, db_name, max_pool_size=20, min_pool_size=0,
+                 server_selection_timeout_ms=2000, connect_timeout_ms=2000,
+                 socket_timeout_ms=10000, wait_queue_timeout_ms=2000,
+                 max_idle_time_ms=60000, backoff_initial=1, backoff_max=30,
+                 failure_threshold=5, reset_timeout=30, replay_buffer_size=10000):
+        self.uri = uri
+        self.db_name = db_name
+        self.client_options = {
+            'maxPoolSize': max_pool_size,
+            'minPoolSize': min_pool_size,
+            'serverSelectionTimeoutMS': server_selection_timeout_ms,
+            'connectTimeoutMS': connect_timeout_ms,
+            'socketTimeoutMS': socket_timeout_ms,
+            'waitQueueTimeoutMS': wait_queue_timeout_ms,
+            'maxIdleTimeMS': max_idle_time_ms,
+            'retryWrites': True,
+            'appname': 'employee-mgmt',
+        }
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.replay_buffer_size = replay_buffer_size
+        self._indexes = []
+        self._lock = threading.Lock()
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Forget any client inherited from the parent process."""
+        self._pid = os.getpid()
+        self._client = None
+        self._db = None
+        self._collections = {}
+        self._pool_stats = None
+        self._failures = 0
+        self._next_attempt = 0
+        self._connecting = False
+        self._last_error = None
+        self._connected_at = None
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker('MongoDB', self._probe, self.failure_threshold, self.reset_timeout)
+        self.breaker.on_close(self._replay)
+        self._pending = deque()
+        self._replay_lock = threading.Lock()
+        self.replay_stats = {'queued': 0, 'replayed': 0, 'dropped': 0}
+
+    # ---------- connection ----------
+
+    def _connect(self):
+        """Create and ping a client. Caller holds _lock."""
+        pool_stats = _PoolStats()
+        client = MongoClient(self.uri, event_listeners=[pool_stats, _TopologyWatch(self.breaker)],
+                             **self.client_options)
+        try:
+            client.admin.command('ping')
+        except Exception:
+            client.close()
+            raise
+        self._client = client
+        self._db = client[self.db_name]
+        self._collections = {}
+        self._pool_stats = pool_stats
+        self._failures = 0
+        self._last_error = None
+        self._connected_at = time.time()
+        logger.info(f"✅ Connected to MongoDB (pid {os.getpid()})")
+
+        for name, keys, kwargs in list(self._indexes):
+            try:
+                self._db[name].create_index(keys, **kwargs)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create index on {name}: {e}")
+
+    def _attempt(self):
+        """One connection attempt; on failure schedule the next with backoff."""
+        with self._lock:
+            if self._db is not None:
+                return True
+            try:
+                self._connect()
+            except Exception as e:
+                self._failures += 1
+                delay = min(self.backoff_max, self.backoff_initial * 2 ** (self._failures - 1))
+                self._next_attempt = time.monotonic() + delay * random.uniform(0.8, 1.2)
+                self._last_error = str(e).split(' (configured')[0]
+                logger.warning(f"⚠️ MongoDB connection failed (attempt {self._failures}, "
+                               f"retry in {delay:.1f}s): {self._last_error}")
+                return False
+            finally:
+                self._connecting = False
+        self.breaker.reset()
+        if self._pending:
+            threading.Thread(target=self._replay, name='mongo-replay', daemon=True).start()
+        return True
+
+    def database(self):
+        """
+        Return this process's Database or raise MongoUnavailable.
+
+        While disconnected, callers never wait on the network: when a retry
+        is due it runs on a background thread and this call fails fast.
+        """
+        if self._pid != os.getpid():
+            self._reset()
+        db = self._db
+        if db is not None:
+            return db
+        if time.monotonic() >= self._next_attempt and not self._connecting:
+            self._connecting = True
+            threading.Thread(target=self._attempt, name='mongo-reconnect', daemon=True).start()
+        raise MongoUnavailable(f"MongoDB unavailable: {self._last_error or 'connecting'}")
+
+    def collection(self, name):
+        collection = self._collections.get(name)
+        if collection is None or self._pid != os.getpid():
+            collection = self.database()[name]
+            self._collections[name] = collection
+        if not self.breaker.allow():
+            raise MongoUnavailable(f"MongoDB circuit {self.breaker.state}")
+        return collection
+
+    def available(self):
+        """True if calls should go to MongoDB now (connected and circuit closed)."""
+        try:
+            self.database()
+        except MongoUnavailable:
+            return False
+        return self.breaker.allow()
+
+    # ---------- circuit breaker and write replay ----------
+
+    def _probe(self):
+        """Half-open check: ping the current client, or reconnect."""
+        if self._db is None:
+            if not self._attempt():
+                raise MongoUnavailable(f"MongoDB unavailable: {self._last_error}")
+            return
+        self._client.admin.command('ping')
+
+    def defer(self, name, method, args, kwargs):
+        with self._replay_lock:
+            if len(self._pending) >= self.replay_buffer_size:
+                self._pending.popleft()
+                self.replay_stats['dropped'] += 1
+            self._pending.append((name, method, args, kwargs))
+            self.replay_stats['queued'] += 1
+
+    def _replay(self):
+        """Apply queued writes in order; stop (and keep the rest) on a connection error."""
+        with self._replay_lock:
+            replayed = 0
+            while self._pending:
+                name, method, args, kwargs = self._pending[0]
+                try:
+                    getattr(self._db[name], method)(*args, **kwargs)
+                except ConnectionFailure as e:
+                    logger.warning(f"⚠️ Replay to MongoDB interrupted: {e}")
+                    self.breaker.record_failure()
+                    break
+                except PyMongoError as e:
+                    # e.g. duplicate key: the write already reached MongoDB
+                    logger.warning(f"⚠️ Dropping replayed {method} on {name}: {e}")
+                    self.replay_stats['dropped'] += 1
+                except Exception as e:
+                    logger.error(f"Replay of {method} on {name} failed: {e}")
+                    self.replay_stats['dropped'] += 1
+                else:
+                    replayed += 1
+                self._pending.popleft()
+            self.replay_stats['replayed'] += replayed
+        if replayed:
+            logger.info(f"✅ Replayed {replayed} buffered write(s) to MongoDB")
+
+    def register_index(self, name, keys, kwargs):
+        """Remember an index so it is created again on every new connection."""
+        spec = (name, keys, kwargs)
+        with self._lock:
+            if spec not in self._indexes:
+                self._indexes.append(spec)
+
+    def try_connect(self):
+        """Attempt a connection synchronously (at startup); returns True when connected."""
+        if self._pid != os.getpid():
+            self._reset()
+        return self._attempt()
+
+    @property
+    def connected(self):
+        return self._db is not None and self._pid == os.getpid()
+
+    def lazy_database(self):
+        return LazyDatabase(self)
+
+    def info(self):
+        """Connection and pool statistics for /api/system/health."""
+        info = {
+            'pid': os.getpid(),
+            'connected': self.connected,
+            'failures': self._failures,
+            'max_pool_size': self.client_options['maxPoolSize'],
+        }
+        info['circuit'] = self.breaker.info()
+        info['replay'] = dict(self.replay_stats, pending=len(self._pending))
+        if self.connected:
+            info['connected_at'] = self._connected_at
+            info['pool'] = self._pool_stats.snapshot()
+        else:
+            info['last_error'] = self._last_error
+            info['retry_in'] = round(max(self._next_attempt - time.monotonic(), 0), 1)
+        return info
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._db = None
+            self._collections = {}
@@ -0,0 +1,259 @@
+"""
+Rate Limiter - Sliding-window counters for login throttling
+===========================================================
+
+/api/auth/login passes these limiters before doing any password or audit
+work, so a credential-stuffing burst is turned away with a 429 at the door.
+Each attempt is counted and judged in one step (`acquire`).
+
+Each limiter uses the sliding-window-counter approximation: counts are kept
+per fixed window and the current rate is
+
+    previous_count * (1 - elapsed_fraction) + current_count
+
+which needs two counters per key instead of one timestamp per attempt.
+
+Counters live in a pluggable backend:
+    MemoryRateLimitBackend - per-process dict (tests, single worker)
+    FileRateLimitBackend   - one append-only file per key and window,
+                             shared by local workers; O(1) per hit
+    MongoRateLimitBackend  - `rate_limits` collection with a TTL index,
+                             shared by every worker and host; uses a local
+                             fallback backend while MongoDB's circuit is open
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+
+from mongo_connection import usable
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryRateLimitBackend:
+    """In-process counters; not shared between gunicorn workers."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def counts(self, key, windows):
+        with self._lock:
+            return [self._counts.get((key, w), (0, 0))[0] for w in windows]
+
+    def incr(self, key, window, expires_at):
+        with self._lock:
+            count = self._counts.get((key, window), (0, 0))[0] + 1
+            self._counts[(key, window)] = (count, expires_at)
+            if len(self._counts) > 10000:
+                now = time.time()
+                self._counts = {k: v for k, v in self._counts.items() if v[1] > now}
+            return count
+
+    def clear(self, key):
+        with self._lock:
+            for k in [k for k in self._counts if k[0] == key]:
+                del self._counts[k]
+
+
+class FileRateLimitBackend:
+    """
+    Counters shared by workers on one host without rewriting any file.
+
+    Each (key, window) is a file `<directory>/<key hash>/<window>` that
+    gets one byte appended per hit. O_APPEND writes are atomic between
+    processes, so the count is simply the file size and no lock is needed.
+    Each hit stamps the file's mtime with its expiry; expired files are
+    swept at most once per `sweep_interval` seconds.
+    """
+
+    def __init__(self, directory='logs/rate_limits', sweep_interval=60):
+        self.directory = directory
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _key_dir(self, key):
+        return os.path.join(self.directory, hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest())
+
+    def counts(self, key, windows):
+        key_dir = self._key_dir(key)
+        counts = []
+        for window in windows:
+            try:
+                counts.append(os.stat(os.path.join(key_dir, str(window))).st_size)
+            except FileNotFoundError:
+                counts.append(0)
+        return counts
+
+    def incr(self, key, window, expires_at):
+        key_dir = self._key_dir(key)
+        path = os.path.join(key_dir, str(window))
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        except FileNotFoundError:
+            os.makedirs(key_dir, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, b'.')
+            # The offset after our own append, unlike the file size, is not
+            # moved by concurrent appends: each hit sees a distinct count
+            count = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        os.utime(path, (expires_at, expires_at))
+        now = time.time()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        return count
+
+    def clear(self, key):
+        shutil.rmtree(self._key_dir(key), ignore_errors=True)
+
+    def _sweep(self, now):
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        for key_dir in os.scandir(self.directory):
+            if not key_dir.is_dir():
+                continue
+            for counter in os.scandir(key_dir.path):
+                try:
+                    if counter.stat().st_mtime < now:
+                        os.remove(counter.path)
+                except FileNotFoundError:
+                    pass
+            try:
+                os.rmdir(key_dir.path)  # only succeeds once empty
+            except OSError:
+                pass
+
+
+class MongoRateLimitBackend:
+    """Counters in a MongoDB collection, expired by a TTL index."""
+
+    def __init__(self, collection, fallback=None):
+        self.collection = collection
+        self.fallback = fallback
+        try:
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            collection.create_index('key')
+        except Exception as e:
+            logger.warning(f"⚠️ Could not create rate limit indexes: {e}")
+
+    def _call(self, method, *args):
+        """Run `method` against MongoDB, or the fallback backend when it is down."""
+        if self.fallback is None:
+            return getattr(self, '_mongo_' + method)(*args)
+        if usable(self.collection):
+            try:
+                return getattr(self, '_mongo_' + method)(*args)
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB rate limit {method} failed: {e}. Using fallback.")
+        return getattr(self.fallback, method)(*args)
+
+    def counts(self, key, windows):
+        return self._call('counts', key, windows)
+
+    def incr(self, key, window, expires_at):
+        return self._call('incr', key, window, expires_at)
+
+    def clear(self, key):
+        return self._call('clear', key)
+
+    def _mongo_counts(self, key, windows):
+        ids = [f'{key}|{w}' for w in windows]
+        found = {doc['_id']: doc['count'] for doc in self.collection.find({'_id': {'$in': ids}})}
+        return [found.get(i, 0) for i in ids]
+
+    def _mongo_incr(self, key, window, expires_at):
+        from pymongo import ReturnDocument
+
+        doc = self.collection.find_one_and_update(
+            {'_id': f'{key}|{window}'},
+            {'$inc': {'count': 1},
+             '$setOnInsert': {'key': key,
+                              'expires_at': datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc['count']
+
+    def _mongo_clear(self, key):
+        self.collection.delete_many({'key': key})
+
+
+class SlidingWindowLimiter:
+    """Allows at most `limit` hits per `window` seconds for each key."""
+
+    def __init__(self, backend, limit, window, prefix=''):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self.prefix = prefix
+
+    def _windows(self, now):
+        current = int(now // self.window)
+        return current - 1, current, (now % self.window) / self.window
+
+    def _rate(self, key, now):
+        previous, current, elapsed = self._windows(now)
+        prev_count, curr_count = self.backend.counts(self.prefix + key, [previous, current])
+        return prev_count * (1 - elapsed) + curr_count
+
+    def retry_after(self, key, now=None):
+        """Return seconds to wait if `key` is over the limit, else 0."""
+        now = now or time.time()
+        try:
+            if self._rate(key, now) < self.limit:
+                return 0
+        except Exception as e:
+            # Fail open: throttling must never take logins down
+            logger.warning(f"⚠️ Rate limit check failed: {e}")
+            return 0
+        return max(int(self.window - now % self.window), 1)
+
+    def acquire(self, key, now=None):
+        """
+        Record one hit for `key` and return seconds to wait if it went over
+        the limit, else 0.
+
+        The decision uses the count returned by the backend's atomic
+        increment, so concurrent callers each see a distinct count and at
+        most `limit` get through (retry_after() then hit() would let a
+        simultaneous burst pass together). Rejected hits count too.
+        """
+        now = now or time.time()
+        previous, current, elapsed = self._windows(now)
+        try:
+            count = self.backend.incr(self.prefix + key, current, (current + 2) * self.window)
+            prev_count = self.backend.counts(self.prefix + key, [previous])[0]
+        except Exception as e:
+            # Fail open: throttling must never take logins down
+            logger.warning(f"⚠️ Rate limit update failed: {e}")
+            return 0
+        if prev_count * (1 - elapsed) + count <= self.limit:
+            return 0
+        return max(int(self.window - now % self.window), 1)
+
+    def hit(self, key, now=None):
+        """Record one hit for `key`."""
+        now = now or time.time()
+        _, current, _ = self._windows(now)
+        try:
+            self.backend.incr(self.prefix + key, current, (current + 2) * self.window)
+        except Exception as e:
+            logger.warning(f"⚠️ Rate limit update failed: {e}")
+
+    def reset(self, key):
+        try:
+            self.backend.clear(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"⚠️ Rate limit reset failed: {e}")
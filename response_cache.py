@@ -0,0 +1,182 @@
+"""
+Response Cache - Cached JSON responses with strong ETags
+========================================================
+
+The dashboard polls /api/analytics/summary, /api/system/settings,
+/api/transfers and /api/employees, and each poll re-runs the same query
+and JSON encode. `ResponseCache.cached` wraps such a view:
+
+- Entries are keyed on endpoint + sorted query args + the caller's role
+  (+ the value of an optional `vary()` callable, for live fields such as
+  the database status), and hold the encoded body, its strong ETag
+  (BLAKE2b of the body) and an expiry time.
+- A request whose If-None-Match matches the current ETag gets an empty
+  304. Otherwise a hit returns the stored bytes without calling the view.
+- Each entry is tagged ('employees', 'transfers', ...). `invalidate(tag)`
+  bumps the tag's generation, and entries built under an older generation
+  are treated as misses. With `shared_dir` set, a generation is the mtime
+  of a marker file, so an invalidation in one gunicorn worker reaches the
+  others on their next lookup (one stat per tag).
+
+Only 200 responses are cached.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in (tag.strip() for tag in header.split(','))
+
+
+class ResponseCache:
+    """Bounded LRU of encoded responses with TTL and tag invalidation."""
+
+    def __init__(self, maxsize=512, default_ttl=30, shared_dir=None):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.shared_dir = shared_dir
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+
+    # ---------- generations ----------
+
+    def _marker(self, tag):
+        return os.path.join(self.shared_dir, tag)
+
+    def _generation(self, tag):
+        local = self._generations.get(tag, 0)
+        if not self.shared_dir:
+            return local
+        try:
+            return local, os.stat(self._marker(tag)).st_mtime_ns
+        except FileNotFoundError:
+            return local, 0
+
+    def invalidate(self, *tags):
+        """Drop every entry tagged with any of `tags`, in all workers."""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            self.stats['invalidations'] += 1
+        if self.shared_dir:
+            for tag in tags:
+                try:
+                    with open(self._marker(tag), 'a'):
+                        os.utime(self._marker(tag))
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not touch cache marker for {tag}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # ---------- entries ----------
+
+    def _lookup(self, key, generations):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= now or entry['generations'] != generations:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _respond(entry, status=200):
+        headers = {
+            'ETag': entry['etag'],
+            'Cache-Control': 'private, no-cache',
+            'Vary': 'Authorization'
+        }
+        if status == 304:
+            return Response(status=304, headers=headers)
+        return Response(entry['body'], status=200, mimetype=entry['mimetype'], headers=headers)
+
+    def cached(self, *tags, ttl=None, vary=None, per_user=None):
+        """
+        Decorate a view that takes (current_user, ...) and sits under token_required.
+
+        `vary`, if given, is called on every request and its (hashable) result
+        is part of the key, so a payload that embeds it is never served stale.
+        Entries are shared by callers with the same role; `per_user`, if
+        given, is called with current_user and its (hashable) result is part
+        of the key too, for views that filter by more than the role.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(current_user, *args, **kwargs):
+                role = (current_user or {}).get('role', '')
+                key = (request.endpoint, tuple(sorted(request.args.items(multi=True))), role,
+                       tuple(sorted(kwargs.items())), vary() if vary is not None else None,
+                       per_user(current_user or {}) if per_user is not None else None)
+                generations = tuple(self._generation(tag) for tag in tags)
+                if_none_match = request.headers.get('If-None-Match')
+
+                entry = self._lookup(key, generations)
+                if entry is not None:
+                    if _etag_matches(if_none_match, entry['etag']):
+                        self.stats['not_modified'] += 1
+                        return self._respond(entry, 304)
+                    self.stats['hits'] += 1
+                    return self._respond(entry)
+
+                self.stats['misses'] += 1
+                result = view(current_user, *args, **kwargs)
+                response = result[0] if isinstance(result, tuple) else result
+                status = result[1] if isinstance(result, tuple) and len(result) > 1 else response.status_code
+                if status != 200 or not isinstance(response, Response):
+                    return result
+
+                body = response.get_data()
+                entry = {
+                    'body': body,
+                    'etag': make_etag(body),
+                    'mimetype': response.mimetype,
+                    'generations': generations,
+                    'expires_at': time.monotonic() + ttl
+                }
+                self._store(key, entry)
+                if _etag_matches(if_none_match, entry['etag']):
+                    self.stats['not_modified'] += 1
+                    return self._respond(entry, 304)
+                return self._respond(entry)
+            return wrapper
+        return decorator
+
+    def info(self):
+        with self._lock:
+            return dict(self.stats, size=len(self._entries), maxsize=self.maxsize)
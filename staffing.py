@@ -0,0 +1,360 @@
+"""
+Staffing Coverage - Materialized school x department coverage matrix
+====================================================================
+
+Backs /api/staffing/*. Two NumPy int32 matrices share one layout, with
+rows for schools and columns for departments:
+
+- `filled`: active employees posted to each (school, department)
+- `sanctioned`: approved posts for each (school, department)
+
+Both are built once from the employee directory and the sanctioned posts
+table. After that, `filled` is adjusted in place on every employee
+create/update (EmployeeDirectory.on_change) and therefore on every
+completed transfer, which re-posts the employee. Queries never touch
+the employee table:
+
+- zone/district aggregates are a grouped sum of matrix rows, using the
+  school -> zone index vector (np.add.at), O(schools x departments)
+- vacancy hotspots are an argpartition over (sanctioned - filled)
+
+Each gunicorn worker keeps its own matrix. It is rebuilt in the background
+when older than `max_age` seconds, so writes made by other workers show up
+within that window. Changes this worker makes while a rebuild runs are
+logged and replayed onto the new matrix before it is swapped in.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from login_log_store import file_lock
+from mongo_connection import usable, defer_write
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = {'active'}
+UNASSIGNED = 'Unassigned'
+
+
+def _is_active(record):
+    return bool(record) and (record.get('status') or 'Active').lower() in ACTIVE_STATUSES
+
+
+class SanctionedPosts:
+    """Approved post counts per (school, department), in MongoDB or a JSON file."""
+
+    def __init__(self, collection=None, path='data/sanctioned_posts.json'):
+        self.collection = collection
+        self.path = path
+        self._file_lock = threading.Lock()
+        if collection is not None:
+            try:
+                collection.create_index([('school', 1), ('department', 1)], unique=True)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create sanctioned posts index: {e}")
+
+    def _load_file(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def all(self):
+        """Return a list of {school, department, posts}."""
+        if usable(self.collection):
+            try:
+                return list(self.collection.find({}, {'_id': 0}))
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB sanctioned posts read failed: {e}. Falling back to file.")
+        return self._load_file()
+
+    def set(self, school, department, posts):
+        row = {'school': school, 'department': department, 'posts': int(posts)}
+        if usable(self.collection):
+            try:
+                self.collection.update_one({'school': school, 'department': department},
+                                           {'$set': row}, upsert=True)
+                return row
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB sanctioned posts write failed: {e}. Falling back to file.")
+        defer_write(self.collection, 'update_one', {'school': school, 'department': department},
+                    {'$set': dict(row)}, upsert=True)
+        with file_lock(self.path + '.lock', self._file_lock):
+            rows = [r for r in self._load_file()
+                    if (r['school'], r['department']) != (school, department)]
+            rows.append(row)
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, indent=2)
+            os.replace(tmp_path, self.path)
+        return row
+
+    def seed(self, rows):
+        """Insert rows whose (school, department) has no entry yet."""
+        existing = {(r['school'], r['department']) for r in self.all()}
+        for row in rows:
+            if (row['school'], row['department']) not in existing:
+                self.set(row['school'], row['department'], row['posts'])
+
+
+class CoverageMatrix:
+    """School x department filled/sanctioned counts with zone and district lookups."""
+
+    def __init__(self, employees=(), sanctioned=()):
+        self.schools = {}      # name -> row
+        self.departments = {}  # name -> column
+        self.school_zone = []  # row -> zone
+        self.school_district = []  # row -> district
+        self.filled = np.zeros((8, 8), dtype=np.int32)
+        self.sanctioned = np.zeros((8, 8), dtype=np.int32)
+        for record in employees:
+            self.apply(None, record)
+        for row in sanctioned:
+            self.set_sanctioned(row['school'], row['department'], row['posts'])
+
+    # ---------- layout ----------
+
+    def _grow(self, rows, cols):
+        if rows <= self.filled.shape[0] and cols <= self.filled.shape[1]:
+            return
+        shape = (max(rows, self.filled.shape[0] * 2), max(cols, self.filled.shape[1] * 2))
+        for name in ('filled', 'sanctioned'):
+            old = getattr(self, name)
+            grown = np.zeros(shape, dtype=np.int32)
+            grown[:old.shape[0], :old.shape[1]] = old
+            setattr(self, name, grown)
+
+    def _school_row(self, school, zone=None, district=None):
+        school = school or UNASSIGNED
+        row = self.schools.get(school)
+        if row is None:
+            row = self.schools[school] = len(self.schools)
+            self.school_zone.append(zone or UNASSIGNED)
+            self.school_district.append(district or UNASSIGNED)
+            self._grow(len(self.schools), len(self.departments))
+        else:
+            # Keep the latest known placement of the school
+            if zone:
+                self.school_zone[row] = zone
+            if district:
+                self.school_district[row] = district
+        return row
+
+    def _department_col(self, department):
+        department = department or UNASSIGNED
+        col = self.departments.get(department)
+        if col is None:
+            col = self.departments[department] = len(self.departments)
+            self._grow(len(self.schools), len(self.departments))
+        return col
+
+    def _cell(self, record):
+        row = self._school_row(record.get('school'), record.get('zone'), record.get('district'))
+        return row, self._department_col(record.get('department'))
+
+    # ---------- updates ----------
+
+    def apply(self, old, new):
+        """Move one employee from its old posting to its new one."""
+        # Resolve the cell first: it may grow (replace) the arrays
+        if _is_active(old):
+            cell = self._cell(old)
+            self.filled[cell] -= 1
+        if _is_active(new):
+            cell = self._cell(new)
+            self.filled[cell] += 1
+
+    def set_sanctioned(self, school, department, posts):
+        row, col = self._school_row(school), self._department_col(department)
+        self.sanctioned[row, col] = int(posts)
+
+    # ---------- queries ----------
+
+    def _views(self):
+        n_rows, n_cols = len(self.schools), len(self.departments)
+        return self.filled[:n_rows, :n_cols], self.sanctioned[:n_rows, :n_cols]
+
+    def aggregate(self, level='zone', zone=None):
+        """
+        Return per-group totals for level 'zone', 'district' or 'school',
+        counting only the schools of `zone` if given.
+
+        Each group has filled, sanctioned, vacancies (unfilled sanctioned
+        posts), surplus and coverage, plus a per-department breakdown.
+        """
+        filled, sanctioned = self._views()
+        rows = np.arange(len(self.schools))
+        if zone:
+            rows = np.array([row for row, z in enumerate(self.school_zone) if z == zone], dtype=np.intp)
+            filled, sanctioned = filled[rows], sanctioned[rows]
+        if level == 'school':
+            schools = list(self.schools)
+            names = [schools[row] for row in rows]
+            group_of_row = np.arange(len(names))
+        else:
+            labels = [(self.school_zone if level == 'zone' else self.school_district)[row] for row in rows]
+            names = sorted(set(labels))
+            index = {name: i for i, name in enumerate(names)}
+            group_of_row = np.array([index[label] for label in labels], dtype=np.intp)
+
+        group_filled = np.zeros((len(names), filled.shape[1]), dtype=np.int64)
+        group_sanctioned = np.zeros_like(group_filled)
+        np.add.at(group_filled, group_of_row, filled)
+        np.add.at(group_sanctioned, group_of_row, sanctioned)
+        group_vacant = np.clip(group_sanctioned - group_filled, 0, None)
+
+        departments = list(self.departments)
+        groups = []
+        for i, name in enumerate(names):
+            total_sanctioned = int(group_sanctioned[i].sum())
+            total_vacant = int(group_vacant[i].sum())
+            groups.append({
+                'name': name,
+                'filled': int(group_filled[i].sum()),
+                'sanctioned': total_sanctioned,
+                'vacancies': total_vacant,
+                'surplus': int(np.clip(group_filled[i] - group_sanctioned[i], 0, None).sum()),
+                'coverage': round(1 - total_vacant / total_sanctioned, 3) if total_sanctioned else None,
+                'departments': {
+                    departments[j]: {'filled': int(group_filled[i, j]),
+                                     'sanctioned': int(group_sanctioned[i, j])}
+                    for j in np.flatnonzero(group_filled[i] | group_sanctioned[i])
+                }
+            })
+        return groups
+
+    def hotspots(self, limit=10, zone=None):
+        """Return the (school, department) cells with the most unfilled posts."""
+        filled, sanctioned = self._views()
+        vacant = np.clip(sanctioned.astype(np.int64) - filled, 0, None)
+        if zone:
+            in_zone = np.array([z == zone for z in self.school_zone], dtype=bool)
+            vacant = vacant * in_zone[:, None]
+        flat = vacant.ravel()
+        candidates = np.flatnonzero(flat)
+        if candidates.size > limit:
+            candidates = candidates[np.argpartition(-flat[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-flat[candidates], kind='stable')]
+
+        schools = list(self.schools)
+        departments = list(self.departments)
+        n_cols = vacant.shape[1]
+        spots = []
+        for cell in candidates:
+            row, col = divmod(int(cell), n_cols)
+            posts = int(sanctioned[row, col])
+            spots.append({
+                'school': schools[row],
+                'zone': self.school_zone[row],
+                'district': self.school_district[row],
+                'department': departments[col],
+                'filled': int(filled[row, col]),
+                'sanctioned': posts,
+                'vacancies': int(flat[cell]),
+                'coverage': round(int(filled[row, col]) / posts, 3)
+            })
+        return spots
+
+
+class StaffingCoverage:
+    """Keeps a CoverageMatrix in sync with the employee directory."""
+
+    def __init__(self, directory, sanctioned_posts, max_age=300):
+        self.directory = directory
+        self.sanctioned_posts = sanctioned_posts
+        self.max_age = max_age
+        self._matrix = None
+        self._built_at = 0
+        self._rebuilding = False
+        self._changes = None  # deltas seen while a background rebuild runs
+        self._lock = threading.Lock()
+        directory.on_change(self.employee_changed)
+
+    def _build(self):
+        started = time.perf_counter()
+        records = self.directory.all_records()
+        matrix = CoverageMatrix(records, self.sanctioned_posts.all())
+        logger.info(f"Built staffing matrix {len(matrix.schools)}x{len(matrix.departments)} "
+                    f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return matrix, records
+
+    def _rebuild(self):
+        try:
+            with self._lock:
+                self._changes = []
+            matrix, records = self._build()
+            with self._lock:
+                # Replay deltas that raced the build. The scan may or may not
+                # have seen each one, so move the employee from whatever the
+                # scan read rather than from `old`, which would count it twice.
+                scanned = {record.get('id'): record for record in records}
+                for change in self._changes:
+                    if change[0] == 'employee':
+                        _, old, new = change
+                        employee_id = (new or old).get('id')
+                        matrix.apply(scanned.get(employee_id), new)
+                        scanned[employee_id] = new
+                    else:
+                        matrix.set_sanctioned(*change[1:])
+                self._matrix = matrix
+                self._built_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Failed to rebuild staffing matrix: {e}")
+        finally:
+            with self._lock:
+                self._changes = None
+            self._rebuilding = False
+
+    def matrix(self):
+        """Return the current matrix, refreshing it in the background when stale."""
+        if self._matrix is None:
+            with self._lock:
+                if self._matrix is None:
+                    self._matrix, _ = self._build()
+                    self._built_at = time.monotonic()
+            return self._matrix
+        if time.monotonic() - self._built_at > self.max_age and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild, name='staffing-matrix', daemon=True).start()
+        return self._matrix
+
+    def employee_changed(self, old, new):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.apply(old, new)
+            if self._changes is not None:
+                self._changes.append(('employee', old, new))
+
+    def set_sanctioned(self, school, department, posts):
+        row = self.sanctioned_posts.set(school, department, posts)
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.set_sanctioned(school, department, posts)
+            if self._changes is not None:
+                self._changes.append(('sanctioned', school, department, posts))
+        return row
+
+    def school_counts(self):
+        """Number of known schools, zones and districts."""
+        matrix = self.matrix()
+        with self._lock:
+            known = lambda labels: len(set(labels) - {UNASSIGNED})
+            return {'total': known(matrix.schools), 'zones': known(matrix.school_zone),
+                    'districts': known(matrix.school_district)}
+
+    def aggregate(self, level='zone', zone=None):
+        matrix = self.matrix()
+        with self._lock:
+            return matrix.aggregate(level, zone)
+
+    def hotspots(self, limit=10, zone=None):
+        matrix = self.matrix()
+        with self._lock:
+            return matrix.hotspots(limit, zone)
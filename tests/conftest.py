@@ -0,0 +1,183 @@
+import functools
+import os
+import sys
+import threading
+import time
+
+import mongomock
+import pytest
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class DownCollection:
+    """A collection whose every call fails like an unreachable server."""
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            raise ConnectionFailure('server unreachable')
+        return call
+
+
+def _find_one_and_update_after(original):
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=False, **kwargs):
+        if not return_document:
+            return original(self, filter, update, projection, sort, upsert, **kwargs)
+        before = original(self, filter, update, {'_id': 1}, sort, upsert, **kwargs)
+        if before is None:
+            return self.find_one(filter, projection) if upsert else None
+        return self.find_one({'_id': before['_id']}, projection)
+    return find_one_and_update
+
+
+@pytest.fixture
+def return_document_after(monkeypatch):
+    """
+    mongomock re-runs `filter` to fetch the ReturnDocument.AFTER document, so a
+    compare-and-set on a field the update changes returns None. MongoDB
+    returns the updated document; emulate that.
+    """
+    collection = mongomock.collection.Collection
+    monkeypatch.setattr(collection, 'find_one_and_update',
+                        _find_one_and_update_after(collection.find_one_and_update))
+
+
+@pytest.fixture
+def mongo_db(request, return_document_after):
+    # mongomock clients share one store per host; a database per test isolates them
+    return mongomock.MongoClient()[request.node.name.replace('[', '_').replace(']', '')]
+
+
+@pytest.fixture
+def atomic_writes(monkeypatch):
+    """
+    mongomock updates documents in place without a lock, so two threads can
+    both win a compare-and-set, or read a half-applied write. MongoDB applies
+    each single-document operation atomically; emulate that for tests that
+    write from threads.
+    """
+    lock = threading.RLock()
+    collection = mongomock.collection.Collection
+    for name in ('find_one', 'insert_one', 'replace_one', 'update_one', 'find_one_and_update', 'delete_one'):
+        method = getattr(collection, name)
+
+        @functools.wraps(method)
+        def locked(self, *args, _method=method, **kwargs):
+            with lock:
+                return _method(self, *args, **kwargs)
+        monkeypatch.setattr(collection, name, locked)
+
+
+@pytest.fixture
+def down_collection():
+    return DownCollection()
+
+
+class FakeServer:
+    """
+    mongomock behind a switch: while `up` is False every call, ping and
+    cursor iteration raises ServerSelectionTimeoutError, like a server
+    that went away.
+    """
+
+    def __init__(self):
+        self.up = True
+        self.store = mongomock.MongoClient('mongodb://fake-%d' % id(self))
+
+    def check(self):
+        if not self.up:
+            raise ServerSelectionTimeoutError('fake server is down')
+
+    def client(self, uri, **kwargs):
+        return _FakeClient(self)
+
+
+class _FakeClient:
+    def __init__(self, server):
+        self.server = server
+        self.admin = _FakeAdmin(server)
+
+    def __getitem__(self, name):
+        return _FakeDatabase(self.server, self.server.store[name])
+
+    def close(self):
+        pass
+
+
+class _FakeAdmin:
+    def __init__(self, server):
+        self.server = server
+
+    def command(self, name):
+        self.server.check()
+        return {'ok': 1}
+
+
+class _FakeDatabase:
+    def __init__(self, server, database):
+        self.server = server
+        self.database = database
+
+    def __getitem__(self, name):
+        return _Guarded(self.server, self.database[name])
+
+
+# Like pymongo, these only build a cursor; I/O happens on iteration
+LAZY_METHODS = {'find', 'sort', 'skip', 'limit', 'batch_size'}
+
+
+class _Guarded:
+    """Checks the server before every call; wraps returned cursors too."""
+
+    def __init__(self, server, target):
+        self._server = server
+        self._target = target
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            if attr not in LAZY_METHODS:
+                self._server.check()
+            result = value(*args, **kwargs)
+            if isinstance(result, mongomock.collection.Cursor):
+                return _Guarded(self._server, result)
+            return result
+        return call
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._server.check()
+        return next(self._target)
+
+
+@pytest.fixture
+def fake_server(monkeypatch, return_document_after):
+    import mongo_connection
+    server = FakeServer()
+    monkeypatch.setattr(mongo_connection, 'MongoClient', server.client)
+    return server
+
+
+@pytest.fixture
+def mongo(fake_server):
+    """A MongoConnection to `fake_server` that retries and probes without delay."""
+    from mongo_connection import MongoConnection
+    connection = MongoConnection('mongodb://fake', 'test', backoff_initial=0, backoff_max=0,
+                                 failure_threshold=2, reset_timeout=0)
+    yield connection
+    connection.close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        time.sleep(0.01)
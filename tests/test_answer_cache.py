@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+
+from answer_cache import AnswerCache, HashingEmbedder, normalize_question
+
+
+def test_embedder_returns_unit_vectors_and_ignores_phrasing():
+    embed = HashingEmbedder(dim=256)
+    vector = embed('What leave types are there?')
+    assert vector.shape == (256,) and abs(np.linalg.norm(vector) - 1) < 1e-5
+    assert float(vector @ embed('which leave types are available')) > 0.99
+    assert float(embed('pending transfers') @ embed('approved transfers')) < 0.85
+    assert not embed('').any()
+
+
+def test_exact_and_semantic_tiers():
+    cache = AnswerCache()
+    cache.put('What leave types are there?', 'Sick, casual and maternity.')
+    exact = cache.get('  what LEAVE types are there ')
+    assert exact['tier'] == 'exact' and exact['answer'] == 'Sick, casual and maternity.'
+    semantic = cache.get('Which leave types are available?')
+    assert semantic['tier'] == 'semantic' and semantic['question'] == normalize_question('What leave types are there?')
+    assert cache.get('How do I request a transfer?') is None
+    assert cache.info()['exact_hits'] == cache.info()['semantic_hits'] == cache.info()['misses'] == 1
+
+
+def test_roles_are_partitioned():
+    cache = AnswerCache()
+    cache.put('How many pending transfers?', 'Twelve.', role='ceo')
+    assert cache.get('How many pending transfers?', role='guest') is None
+    assert cache.get('How many pending transfers?', role='ceo')['answer'] == 'Twelve.'
+    cache.clear('ceo')
+    assert cache.get('How many pending transfers?', role='ceo') is None
+
+
+def test_entries_expire_after_ttl():
+    cache = AnswerCache(ttl=0.01)
+    cache.put('What leave types are there?', 'Sick and casual.')
+    time.sleep(0.02)
+    assert cache.get('What leave types are there?') is None
+    assert cache.get('Which leave types are available?') is None
+    assert cache.info()['expired'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(maxsize=2)
+    cache.put('leave policy', 'a')
+    cache.put('transfer process', 'b')
+    cache.get('leave policy')
+    cache.put('school zones', 'c')
+    assert cache.get('transfer process') is None
+    assert cache.get('leave policy')['answer'] == 'a'
+    assert cache.get('school zones')['answer'] == 'c'
+    assert cache.info()['partitions'] == {'': 2}
+
+
+def test_answers_from_other_data_versions_are_not_served():
+    cache = AnswerCache()
+    cache.put('How many pending transfers?', 'There are 12 pending.', version='v1')
+    assert cache.get('How many pending transfers?', version='v1')['answer'] == 'There are 12 pending.'
+    assert cache.get('How many transfers are pending?', version='v2') is None
+    assert cache.get('How many pending transfers?', version='v2') is None
+    assert cache.get('How many pending transfers?', version='v1') is None
+    assert cache.info()['outdated'] == 1
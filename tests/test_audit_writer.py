@@ -0,0 +1,88 @@
+import threading
+
+from audit_writer import AuditWriter
+from conftest import wait_for
+
+
+def test_entries_are_written_in_batches():
+    batches = []
+    writer = AuditWriter(batches.append, batch_size=3, flush_interval=5)
+    for i in range(7):
+        writer.submit({'n': i})
+    wait_for(lambda: len(batches) == 2)
+    assert [len(batch) for batch in batches] == [3, 3]
+    writer.close()
+    assert [entry['n'] for batch in batches for entry in batch] == list(range(7))
+    assert writer.info()['written'] == 7
+
+
+def test_partial_batch_is_flushed_after_interval():
+    batches = []
+    writer = AuditWriter(batches.append, batch_size=100, flush_interval=0.02)
+    writer.submit({'n': 1})
+    wait_for(lambda: batches == [[{'n': 1}]])
+    writer.close()
+
+
+def test_full_queue_writes_synchronously():
+    release = threading.Event()
+    written = []
+
+    def sink(batch):
+        if batch[0]['n'] == 0:
+            release.wait(2)
+        written.extend(batch)
+
+    writer = AuditWriter(sink, max_queue=1, batch_size=1, flush_interval=0.01, put_timeout=0)
+    writer.submit({'n': 0})
+    wait_for(lambda: writer._queue.empty())  # taken by the flusher, which now blocks
+    writer.submit({'n': 1})
+    writer.submit({'n': 2})  # the queue is full: written by the caller
+    assert written == [{'n': 2}]
+    release.set()
+    writer.close()
+    assert sorted(entry['n'] for entry in written) == [0, 1, 2]
+    assert writer.info()['sync_writes'] == 1
+
+
+def test_failed_batch_goes_to_fallback():
+    deferred = []
+
+    def broken_sink(batch):
+        raise OSError('disk full')
+
+    writer = AuditWriter(broken_sink, fallback=deferred.extend, batch_size=2, flush_interval=5)
+    writer.submit({'n': 1})
+    writer.submit({'n': 2})
+    writer.close()
+    assert deferred == [{'n': 1}, {'n': 2}]
+    assert writer.info()['fallback_writes'] == 2 and writer.info()['failed'] == 0
+
+
+def test_entries_are_held_and_retried_until_the_sink_recovers():
+    state = {'down': True}
+    written = []
+
+    def sink(batch):
+        if state['down']:
+            raise OSError('disk full')
+        written.extend(batch)
+
+    writer = AuditWriter(sink, batch_size=1, flush_interval=0.01)
+    writer.submit({'n': 1})
+    wait_for(lambda: writer.info()['held'] == 1)
+    state['down'] = False
+    writer.submit({'n': 2})
+    wait_for(lambda: len(written) == 2)
+    writer.close()
+    assert written == [{'n': 1}, {'n': 2}]
+    assert writer.info()['held'] == 0 and writer.info()['failed'] == 0
+
+
+def test_held_entries_beyond_max_queue_are_dropped():
+    def broken_sink(batch):
+        raise OSError('disk full')
+
+    writer = AuditWriter(broken_sink, max_queue=2)
+    writer._write([{'n': i} for i in range(5)])
+    assert writer.info()['held'] == 2 and writer.info()['failed'] == 3
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from chat_sessions import ConversationStore, check_guest_session_id, new_guest_session_id
+
+
+@pytest.fixture(params=['mongo', 'file'])
+def store(request, tmp_path, mongo_db, down_collection):
+    collection = mongo_db.chat_sessions if request.param == 'mongo' else down_collection
+    return ConversationStore(collection, directory=str(tmp_path / 'chat_sessions'))
+
+
+def test_history_is_shared_between_worker_stores(tmp_path, mongo_db):
+    first = ConversationStore(mongo_db.chat_sessions, directory=str(tmp_path / 'a'))
+    second = ConversationStore(mongo_db.chat_sessions, directory=str(tmp_path / 'b'))
+    first.append('user:1', 'How many casual leave days?', 'Eight per year.')
+    assert second.history('user:1') == [
+        {'role': 'user', 'content': 'How many casual leave days?'},
+        {'role': 'assistant', 'content': 'Eight per year.'},
+    ]
+
+
+def test_old_turns_are_summarized(store):
+    store.history_tokens = 30
+    store.append('user:1', 'First question about transfers. More detail.', 'Transfers take 15-30 days. Ask HR.')
+    store.append('user:1', 'Second question about leave', 'Eight casual leave days.')
+    history = store.history('user:1')
+    assert history[0]['role'] == 'system'
+    assert 'User asked: First question about transfers.' in history[0]['content']
+    assert history[-1] == {'role': 'assistant', 'content': 'Eight casual leave days.'}
+    assert store.stats['summarized_turns'] == 1
+
+
+def test_reset_and_expiry(store, mongo_db):
+    store.append('user:1', 'hi', 'hello')
+    assert store.reset('user:1')
+    assert store.history('user:1') == []
+
+    store.ttl = 0
+    store.append('user:2', 'hi', 'hello')
+    time.sleep(0.01)
+    assert store.history('user:2') == []
+
+
+def test_file_sessions_are_swept(tmp_path, down_collection):
+    store = ConversationStore(down_collection, directory=str(tmp_path), ttl=60, sweep_interval=0)
+    store.append('user:1', 'hi', 'hello')
+    old = time.time() - 120
+    os.utime(store._path('user:1'), (old, old))
+    store.append('user:2', 'hi', 'hello')
+    assert not os.path.exists(store._path('user:1'))
+    assert os.path.exists(store._path('user:2'))
+
+
+def test_concurrent_appends_keep_every_turn_on_mongo(tmp_path, mongo_db, atomic_writes):
+    stores = [ConversationStore(mongo_db.chat_sessions, directory=str(tmp_path), history_tokens=10 ** 6)
+              for _ in range(4)]
+    threads = [threading.Thread(target=lambda s=s, n=n: [s.append('user:1', f'q{n}-{i}', 'a') for i in range(10)])
+               for n, s in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(stores[0].history('user:1')) == 80
+
+
+def _append_worker(directory, barrier, n):
+    store = ConversationStore(None, directory=directory, history_tokens=10 ** 6)
+    barrier.wait()
+    for i in range(10):
+        store.append('user:1', f'q{n}-{i}', 'a')
+
+
+def test_concurrent_workers_keep_every_turn_on_file(tmp_path):
+    directory = str(tmp_path / 'chat_sessions')
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=_append_worker, args=(directory, barrier, n)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(ConversationStore(None, directory=directory).history('user:1')) == 80
+
+
+def test_guest_session_ids_are_signed():
+    session_id = new_guest_session_id('secret')
+    assert check_guest_session_id('secret', session_id)
+    assert not check_guest_session_id('other', session_id)
+    assert not check_guest_session_id('secret', session_id.split('.')[0] + '.forged')
+    assert not check_guest_session_id('secret', 'admin')
+    assert not check_guest_session_id('secret', None)
@@ -0,0 +1,101 @@
+import importlib
+import json
+import os
+
+import pytest
+
+from llm_client import LLMClientManager, LLMError
+
+QUESTION = 'Write a short poem about zebras'
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """unified_app with MongoDB disabled and every file store in a scratch directory."""
+    directory = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('MONGO_URI', '')
+        patch.setenv('BCRYPT_ROUNDS', '4')
+        patch.setenv('LOGIN_LOG_DIR', str(directory / 'logs'))
+        for name in ('USERS', 'EMPLOYEES', 'TRANSFERS', 'SANCTIONED_POSTS'):
+            patch.setenv(f'{name}_FILE', str(directory / f'{name.lower()}.json'))
+        patch.chdir(directory)
+        yield importlib.import_module('unified_app')
+
+
+@pytest.fixture
+def use_llm(app_module, monkeypatch):
+    def use(llm):
+        monkeypatch.setattr(app_module, 'llm', llm)
+        app_module.answer_cache.clear()
+    return use
+
+
+def _events(chunks):
+    """Parse SSE chunks into (event, data) pairs, checking the framing."""
+    chunks = list(chunks)
+    assert chunks[0] == ': stream\n\n'
+    events = []
+    for chunk in chunks[1:]:
+        assert chunk.endswith('\n\n') and chunk.count('\n\n') == 1
+        fields = dict(line.split(': ', 1) for line in chunk.strip('\n').split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_deltas_are_streamed_as_token_events(app_module, use_llm):
+    use_llm(LLMClientManager(backend='mock', mock_responses=['Stripes on\nthe plain']))
+    events = _events(app_module.stream_chatbot_response(QUESTION, guest_session_id='abc.def'))
+    assert [name for name, _ in events] == ['token', 'token', 'token', 'done']
+    assert ''.join(data['token'] for _, data in events[:-1]) == 'Stripes on\nthe plain'
+    assert events[-1][1] == {'response': 'Stripes on\nthe plain', 'source': 'ai',
+                             'truncated': False, 'sessionId': 'abc.def'}
+
+
+def test_unconfigured_llm_sends_the_rule_based_fallback(app_module, use_llm):
+    use_llm(LLMClientManager(api_key=''))
+    events = _events(app_module.stream_chatbot_response(QUESTION))
+    fallback = app_module.generate_chatbot_response_fallback(QUESTION)
+    assert events == [('token', {'token': fallback}),
+                      ('done', {'response': fallback, 'source': 'fallback', 'truncated': False})]
+
+
+def test_failure_before_the_first_token_falls_back(app_module, use_llm):
+    use_llm(LLMClientManager(backend='mock', mock_responses=[ValueError('model not found')]))
+    events = _events(app_module.stream_chatbot_response(QUESTION))
+    assert events[-1][1]['source'] == 'fallback'
+    assert events[-1][1]['response'] == app_module.generate_chatbot_response_fallback(QUESTION)
+
+
+def test_failure_mid_reply_is_marked_truncated(app_module, use_llm):
+    class Breaks:
+        configured = True
+
+        def stream(self, messages, **params):
+            yield 'Stripes'
+            raise LLMError('connection reset')
+
+    use_llm(Breaks())
+    events = _events(app_module.stream_chatbot_response(QUESTION))
+    assert events == [('token', {'token': 'Stripes'}),
+                      ('done', {'response': 'Stripes', 'source': 'ai', 'truncated': True})]
+    assert app_module.answer_cache.get(QUESTION, 'guest', app_module.data_context.version()) is None
+
+
+def test_repeated_question_is_served_from_the_cache(app_module, use_llm):
+    use_llm(LLMClientManager(backend='mock', mock_responses=['Black and white.']))
+    _events(app_module.stream_chatbot_response(QUESTION))
+    events = _events(app_module.stream_chatbot_response(QUESTION))
+    assert events[-1][1]['source'] == 'cache' and events[0][1] == {'token': 'Black and white.'}
+
+
+def test_endpoint_streams_event_stream(app_module, use_llm):
+    use_llm(LLMClientManager(backend='mock', mock_responses=['Hello!']))
+    client = app_module.app.test_client()
+    response = client.post('/api/chatbot/chat/stream', json={'message': QUESTION})
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    body = response.get_data(as_text=True)
+    done = json.loads(body.rsplit('data: ', 1)[1])
+    assert done['response'] == 'Hello!' and done['sessionId']
+    assert client.post('/api/chatbot/chat/stream', json={'message': ' '}).status_code == 400
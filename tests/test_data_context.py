@@ -0,0 +1,82 @@
+import time
+
+from conftest import wait_for
+from data_context import DataContext, open_data_context, store_sources
+
+
+def test_render_fills_placeholders_and_marks_unknown_values():
+    context = DataContext({'transfers': lambda: {'pending': 1234, 'approved': 5}})
+    assert context.render('{transfers_pending} pending, {transfers_approved} approved') == '1,234 pending, 5 approved'
+    assert context.render('{employees_total} staff') == 'n/a staff'
+
+
+def test_failing_source_keeps_previous_values():
+    calls = {'n': 0}
+
+    def flaky():
+        calls['n'] += 1
+        if calls['n'] > 1:
+            raise RuntimeError('down')
+        return {'total': 7}
+
+    context = DataContext({'employees': flaky}, ttl=0)
+    assert context.values()['employees_total'] == '7'
+    time.sleep(0.01)
+    context.snapshot()  # stale: refreshes in the background
+    wait_for(lambda: context.info()['source_errors'] == 1)
+    assert context.values()['employees_total'] == '7'
+
+
+def test_stale_snapshot_is_served_while_refreshing():
+    counts = {'total': 1}
+    context = DataContext({'employees': lambda: dict(counts)}, ttl=0)
+    assert context.values()['employees_total'] == '1'
+    counts['total'] = 2
+    time.sleep(0.01)
+    assert context.values()['employees_total'] in ('1', '2')
+    wait_for(lambda: context.values()['employees_total'] == '2')
+
+
+def test_open_data_context_reads_without_creating_indexes(tmp_path, fake_server, monkeypatch):
+    monkeypatch.setenv('MONGO_URI', 'mongodb://fake')
+    monkeypatch.setenv('MONGO_DB', 'bots')
+    monkeypatch.setenv('EMPLOYEES_FILE', str(tmp_path / 'employees.json'))
+    monkeypatch.setenv('TRANSFERS_FILE', str(tmp_path / 'transfers.json'))
+    monkeypatch.setenv('LOGIN_LOG_DIR', str(tmp_path / 'logs'))
+    fake_server.store.bots.employees.insert_many([
+        {'id': '1', 'name': 'A', 'status': 'Active', 'school': 'S1', 'zone': 'Z1'},
+        {'id': '2', 'name': 'B', 'status': 'Inactive', 'school': 'S2', 'zone': 'Z1'},
+    ])
+    context = open_data_context()
+    values = context.values()
+    assert values['employees_total'] == '2' and values['employees_active'] == '1'
+    assert values['transfers_pending'] == '0'
+    for name in ('employees', 'transfers', 'login_rollups'):
+        assert list(fake_server.store.bots[name].index_information()) in ([], ['_id_'])
+    assert 'Employees: 2 total, 1 active' in context.prompt_block()
+    assert values['system_database'] == 'database connected'
+
+
+def test_version_changes_with_the_figures_only():
+    counts = {'total': 1}
+    context = DataContext({'employees': lambda: dict(counts)}, ttl=0)
+    first = context.version()
+    time.sleep(0.01)
+    context.snapshot()
+    wait_for(lambda: context.info()['refreshes'] == 2)
+    assert context.version() == first
+    counts['total'] = 2
+    time.sleep(0.01)
+    context.snapshot()
+    wait_for(lambda: context.version() != first)
+
+
+def test_database_status_is_reported_as_it_changes():
+    state = {'status': 'connected'}
+    context = DataContext(store_sources(database_status=lambda: state['status']), ttl=0)
+    assert context.render('Status: {system_database}.') == 'Status: database connected.'
+    state['status'] = 'file_fallback'
+    time.sleep(0.01)
+    context.snapshot()
+    wait_for(lambda: 'local file storage' in context.render('{system_database}'))
+    assert 'Storage: database unavailable' in context.prompt_block()
@@ -0,0 +1,89 @@
+import json
+import threading
+
+from conftest import wait_for
+from employee_store import EmployeeDirectory
+
+RECORDS = [
+    {'id': '1', 'name': 'Anita Sharma', 'school': 'GPS Alpha', 'zone': 'North', 'status': 'Active'},
+    {'id': '2', 'name': 'Mohammed Khan', 'school': 'GPS Beta', 'zone': 'South', 'status': 'Active'},
+    {'id': '3', 'name': 'José Pérez', 'school': 'GPS Alpha', 'zone': 'North', 'status': 'Inactive'},
+]
+
+
+def test_seed_reaches_mongo_when_file_already_has_records(tmp_path, mongo_db):
+    path = tmp_path / 'employees.json'
+    path.write_text(json.dumps(RECORDS))
+
+    directory = EmployeeDirectory(mongo_db.employees, path=str(path))
+    directory.seed(RECORDS)
+
+    assert mongo_db.employees.count_documents({}) == 3
+    employees, total = directory.search()
+    assert total == 3
+    assert [e['name'] for e in employees] == ['Anita Sharma', 'José Pérez', 'Mohammed Khan']
+
+
+def test_mongo_miss_does_not_fall_back_to_file(tmp_path, mongo_db):
+    path = tmp_path / 'employees.json'
+    path.write_text(json.dumps(RECORDS))
+    directory = EmployeeDirectory(mongo_db.employees, path=str(path))
+    assert directory.get('1') is None
+
+
+def test_file_mirrors_mongo_through_an_outage(tmp_path, mongo_db, down_collection):
+    path = tmp_path / 'employees.json'
+    directory = EmployeeDirectory(mongo_db.employees, path=str(path))
+    directory.seed(RECORDS)
+    directory.upsert(dict(RECORDS[0], name='Anita Verma'))
+    wait_for(lambda: not directory._mirror_running)
+    assert sorted(r['name'] for r in json.loads(path.read_text())) == ['Anita Verma', 'José Pérez', 'Mohammed Khan']
+
+    directory.collection = down_collection
+    assert directory.get('2')['name'] == 'Mohammed Khan'
+    assert directory.search('verma')[1] == 1
+    assert directory.counts()['total'] == 3
+
+
+def test_file_fallback_when_mongo_fails(tmp_path, down_collection):
+    path = tmp_path / 'employees.json'
+    directory = EmployeeDirectory(down_collection, path=str(path))
+    directory.seed(RECORDS)
+
+    assert len(json.loads(path.read_text())) == 3
+    assert directory.get('2')['name'] == 'Mohammed Khan'
+    employees, total = directory.search('jose')
+    assert total == 1 and employees[0]['id'] == '3'
+    assert directory.search(filters={'zone': 'North'})[1] == 2
+    counts = directory.counts()
+    assert counts['total'] == 3 and counts['active'] == 2 and counts['schools'] == 2
+
+
+def test_other_process_writes_are_picked_up(tmp_path):
+    path = str(tmp_path / 'employees.json')
+    first = EmployeeDirectory(None, path=path)
+    second = EmployeeDirectory(None, path=path)
+    first.upsert(RECORDS[0])
+    assert second.get('1')['name'] == 'Anita Sharma'
+
+
+def test_concurrent_file_upserts_keep_every_record(tmp_path):
+    path = str(tmp_path / 'employees.json')
+    directories = [EmployeeDirectory(None, path=path) for _ in range(4)]
+    threads = [threading.Thread(target=d.upsert, args=({'id': str(i), 'name': f'Employee {i}'},))
+               for i, d in enumerate(directories * 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(json.loads(open(path).read())) == 20
+
+
+def test_listeners_receive_old_and_new(mongo_db, tmp_path):
+    directory = EmployeeDirectory(mongo_db.employees, path=str(tmp_path / 'e.json'))
+    changes = []
+    directory.on_change(lambda old, new: changes.append((old, new)))
+    directory.upsert(RECORDS[0])
+    directory.upsert(dict(RECORDS[0], zone='East'))
+    assert changes[0][0] is None
+    assert changes[1][0]['zone'] == 'North' and changes[1][1]['zone'] == 'East'
@@ -0,0 +1,78 @@
+import random
+import time
+
+from employee_suggest import SuggestIndex, _max_distance
+
+NAMES = ['Mohammed Khan', 'Mohan Lal', 'Mohammad Ali', 'John Mathew', 'Joan Fernandes',
+         'Anita Sharma', 'Anil Sharma', 'Priya Nair', 'Priyanka Rao', 'Ramesh Kumar']
+
+
+def _prefix_distance(query, key):
+    """Brute force: least optimal-string-alignment distance from query to any prefix of key."""
+    rows = [list(range(len(query) + 1))]
+    best = rows[0][-1]
+    for depth in range(1, len(key) + 1):
+        row = [depth]
+        for col in range(1, len(query) + 1):
+            cost = 0 if query[col - 1] == key[depth - 1] else 1
+            value = min(row[col - 1] + 1, rows[-1][col] + 1, rows[-1][col - 1] + cost)
+            if depth > 1 and col > 1 and query[col - 1] == key[depth - 2] and query[col - 2] == key[depth - 1]:
+                value = min(value, rows[-2][col - 2] + 1)
+            row.append(value)
+        rows.append(row)
+        best = min(best, row[-1])
+    return best
+
+
+def test_transposed_name_reports_its_minimum_distance():
+    index = SuggestIndex([{'id': str(i), 'name': name} for i, name in enumerate(NAMES)])
+    (record, distance, key), = [m for m in index.suggest('moahmmed') if m[0]['name'] == 'Mohammed Khan']
+    assert distance == 1
+
+
+def test_fuzzy_distances_match_brute_force():
+    rng = random.Random(3)
+    index = SuggestIndex([{'id': str(i), 'name': name} for i, name in enumerate(NAMES)])
+    for _ in range(300):
+        name = rng.choice(NAMES).lower()
+        query = list(name[:rng.randint(4, 9)])
+        for _ in range(rng.randint(1, 2)):
+            at = rng.randrange(len(query) - 1)
+            query[at], query[at + 1] = query[at + 1], query[at]
+        query = ''.join(query).strip()
+        budget = _max_distance(query)
+        expected = {n: min(_prefix_distance(query, key) for key in [n.lower(), *n.lower().split()])
+                    for n in NAMES}
+        for record, distance, key in index.suggest(query, limit=len(NAMES)):
+            assert distance == expected[record['name']], (query, record['name'])
+        found = {record['name'] for record, _, _ in index.suggest(query, limit=len(NAMES))}
+        assert {n for n, d in expected.items() if d <= budget} <= found, query
+
+
+def _synthetic_directory(n, seed=7):
+    """n employees with varied made-up names, so keys share few prefixes."""
+    rng = random.Random(seed)
+    syllables = [c + v for c in 'bcdfghjklmnprstvwyz' for v in 'aeiou']
+
+    def word():
+        return ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+    records = []
+    for i in range(n):
+        name = f'{word()} {word()}'
+        records.append({'id': str(i), 'employee_id': f'EMP{i:05d}', 'name': name,
+                        'email': name.replace(' ', '.') + '@school.edu'})
+    return records + [{'id': str(n), 'name': 'Mohammed Khan', 'email': 'mkhan@school.edu'}]
+
+
+def test_fuzzy_suggest_stays_fast_at_30k_employees():
+    index = SuggestIndex(_synthetic_directory(30000))
+    assert index.suggest('mohammde')[0][0]['name'] == 'Mohammed Khan'
+    for query in ['mohammde', 'zzzzzzzz', 'abcdefghij', 'bacedifo', 'kavu', 'lukusoru ct']:
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            index.suggest(query)
+            best = min(best, time.perf_counter() - start)
+        # Was 30-200 ms per query before the deletion-index prefilter
+        assert best < 0.015, (query, best)
@@ -0,0 +1,82 @@
+import pytest
+
+from intent_classifier import ESCALATE, IntentClassifier, chatbot_training_set
+from intent_router import CHATBOT_ROUTER
+
+# Held out from CHATBOT_EXAMPLES: questions with a canned answer, and
+# questions that mention the same topics but need the LLM
+HELD_OUT = [
+    ('search for a teacher by name', 'employee_search'),
+    ('how can I find an employee in another school', 'employee_search'),
+    ('how do I request a transfer to another school', 'transfer'),
+    ('where can I see pending transfers', 'transfer'),
+    ('what kinds of leave can I take', 'leave'),
+    ('how many casual leaves are allowed', 'leave'),
+    ('list of holidays this year', 'leave'),
+    ('how do I get around the dashboard', 'navigation'),
+    ('what can I do on the dashboard', 'navigation'),
+    ('where do I find reports', 'reports'),
+    ('download the analytics report', 'reports'),
+    ('who can access the admin pages', 'security'),
+    ('how is access control done', 'security'),
+    ('are backups taken of the database', 'data'),
+    ('can I export the employee data', 'data'),
+    ('how do I look up an employee id', 'employee_id'),
+    ('is the system up', 'status'),
+    ('check system health', 'status'),
+
+    ('who approved my transfer', ESCALATE),
+    ('I have been sick for 15 days, can I take more leave?', ESCALATE),
+    ('compose a transfer request reason for me', ESCALATE),
+    ('my login is not working', ESCALATE),
+    ('why was my leave application rejected', ESCALATE),
+    ('write a leave application for my sister\'s wedding', ESCALATE),
+    ('can my transfer be cancelled after approval', ESCALATE),
+    ('I cannot log in since yesterday', ESCALATE),
+    ('what should I write in the transfer reason field', ESCALATE),
+    ('my principal refused my leave, what can I do', ESCALATE),
+    ('explain the difference between earned leave and half pay leave rules for my case', ESCALATE),
+    ('someone else is using my account', ESCALATE),
+    ('summarize my employee record', ESCALATE),
+    ('good morning', ESCALATE),
+    ('thanks for the help', ESCALATE),
+    ('draft a reply to the zonal officer about my posting', ESCALATE),
+]
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return IntentClassifier(*chatbot_training_set(CHATBOT_ROUTER))
+
+
+def test_local_answers_are_precise_on_held_out_questions(classifier):
+    answered = [(message, label, classifier.route(message)) for message, label in HELD_OUT]
+    local = [(message, label, intent) for message, label, intent in answered if intent is not None]
+    wrong = [(message, label, intent) for message, label, intent in local if intent != label]
+    assert len(wrong) / len(local) <= 0.05, wrong
+    routable = sum(1 for _, label in HELD_OUT if label != ESCALATE)
+    # Still worth having: most routable questions stay local
+    assert len(local) - len(wrong) >= 0.6 * routable
+
+
+@pytest.mark.parametrize('message', [
+    'who approved my transfer',
+    'I have been sick for 15 days, can I take more leave?',
+    'compose a transfer request reason for me',
+    'my login is not working',
+])
+def test_reported_near_misses_escalate(classifier, message):
+    assert classifier.route(message) is None, classifier.classify(message)
+
+
+def test_faq_answers_are_served_locally():
+    faqs = {'How do I raise an IT ticket?': 'Use the IT helpdesk portal.'}
+    classifier = IntentClassifier(*chatbot_training_set(CHATBOT_ROUTER, faqs))
+    intent = classifier.route('how do I raise an IT ticket')
+    assert classifier.answers[intent] == 'Use the IT helpdesk portal.'
+
+
+def test_unknown_words_escalate(classifier):
+    assert classifier.classify('zzz qqq') == (ESCALATE, 0.0)
+    stats = classifier.info()
+    assert stats['classified'] == stats['local'] + stats['escalated']
@@ -0,0 +1,67 @@
+import random
+import string
+
+import pytest
+
+from benchmarks import SAMPLE_CHAT_MESSAGES, legacy_chatbot_fallback_intent
+from data_context import DataContext
+from intent_router import CHATBOT_ROUTER, WHATSAPP_ROUTER, IntentRouter, Rule, whatsapp_reply
+
+RULES = [
+    Rule('greeting', exact=('hi', 'hello')),
+    Rule('employee_search', keywords=('employee',), all_of=(('search', 'find'),)),
+    Rule('data', keywords=('data', 'database')),
+    Rule('employee_id', keywords=('employee id', 'emp id')),
+    Rule('hi_exact_loses', keywords=('hi',)),
+]
+
+
+@pytest.fixture(params=['chain', 'automaton'])
+def router(request):
+    return IntentRouter(RULES, chain_max_keywords=1000 if request.param == 'chain' else 0)
+
+
+def test_chatbot_router_matches_the_if_chain_it_replaces():
+    assert CHATBOT_ROUTER.automaton is None
+    for message in SAMPLE_CHAT_MESSAGES:
+        assert CHATBOT_ROUTER.route(message) == legacy_chatbot_fallback_intent(message), message
+
+
+@pytest.mark.parametrize('message, intent', [
+    ('Hi', 'greeting'),
+    ('  HELLO ', 'greeting'),
+    ('find employee 42', 'employee_search'),
+    ('employee id lookup', 'employee_id'),
+    ('my employee id for the database', 'data'),
+    ('this is it', 'hi_exact_loses'),
+    ('no match', None),
+    ('', None),
+    (None, None),
+])
+def test_first_matching_rule_wins(router, message, intent):
+    assert router.route(message) == intent
+
+
+def test_chain_and_automaton_agree_on_random_rules():
+    rng = random.Random(7)
+    alphabet = 'abcde'
+    rules = [Rule(f'i{n}', keywords=tuple(''.join(rng.choices(alphabet, k=rng.randint(1, 3))) for _ in range(2)),
+                  all_of=((''.join(rng.choices(alphabet, k=2)),),) if n % 3 == 0 else ())
+             for n in range(20)]
+    chain = IntentRouter(rules, chain_max_keywords=1000)
+    automaton = IntentRouter(rules, chain_max_keywords=0)
+    for _ in range(500):
+        message = ''.join(rng.choices(alphabet + string.whitespace[:1], k=rng.randint(0, 12)))
+        assert chain.route(message) == automaton.route(message), message
+
+
+def test_keywords_cannot_inject_code():
+    router = IntentRouter([Rule('quote', keywords=("'); import os; ('",))])
+    assert router.route("x'); import os; ('y") == 'quote'
+
+
+def test_whatsapp_replies_are_shared_by_both_bots():
+    context = DataContext({'transfers': lambda: {'pending': 3, 'approved': 1, 'rejected': 0}})
+    assert 'Pending Requests: 3' in whatsapp_reply('transfer', context)
+    assert "I didn't understand: *'what?'*" in whatsapp_reply('what?', context)
+    assert WHATSAPP_ROUTER.route('apply leave') == 'leave'
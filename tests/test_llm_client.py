@@ -0,0 +1,90 @@
+import socket
+import threading
+
+import pytest
+
+from llm_client import LLMClientManager, LLMError
+
+MESSAGES = [{'role': 'system', 'content': 'Be brief.'}, {'role': 'user', 'content': 'hello there'}]
+
+
+def _manager(responses, max_retries=2):
+    return LLMClientManager(backend='mock', mock_responses=responses, max_retries=max_retries, backoff_base=0)
+
+
+def test_transient_errors_are_retried():
+    llm = _manager([TimeoutError('read timed out'), ConnectionError('reset'), 'Hi!'])
+    assert llm.complete(MESSAGES, temperature=0.2) == 'Hi!'
+    assert len(llm.backend().calls) == 3 and llm.backend().calls[-1]['temperature'] == 0.2
+    assert (llm.info()['retries'], llm.info()['failures']) == (2, 0)
+
+
+def test_gives_up_after_max_retries():
+    llm = _manager([TimeoutError('read timed out')] * 5, max_retries=1)
+    with pytest.raises(LLMError, match='read timed out'):
+        llm.complete(MESSAGES)
+    assert len(llm.backend().calls) == 2
+    assert (llm.info()['retries'], llm.info()['failures']) == (1, 1)
+
+
+def test_other_errors_are_not_retried():
+    llm = _manager([ValueError('invalid model')])
+    with pytest.raises(LLMError, match='invalid model'):
+        llm.complete(MESSAGES)
+    assert len(llm.backend().calls) == 1 and llm.info()['retries'] == 0
+
+
+def test_mock_echoes_without_canned_responses():
+    assert _manager(None).complete(MESSAGES) == '(mock) You said: hello there'
+
+
+def test_stream_retries_before_the_first_delta():
+    llm = _manager([TimeoutError('connect timed out'), 'one two three'])
+    assert list(llm.stream(MESSAGES)) == ['one', ' two', ' three']
+    assert llm.info()['retries'] == 1 and llm.info()['avg_first_token_ms'] is not None
+
+
+def test_unconfigured_and_unknown_backends_raise_llm_error():
+    assert not LLMClientManager(api_key='your_groq_api_key_here').configured
+    with pytest.raises(LLMError):
+        LLMClientManager(api_key='').complete(MESSAGES)
+    with pytest.raises(LLMError, match='Unknown LLM backend'):
+        LLMClientManager(backend='other').complete(MESSAGES)
+
+
+@pytest.fixture
+def silent_server():
+    """Accepts connections and never answers, so HTTP reads time out."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+    accepted = []
+    stop = threading.Event()
+
+    def accept():
+        server.settimeout(0.05)
+        while not stop.is_set():
+            try:
+                accepted.append(server.accept()[0])
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.getsockname()[1]}', accepted
+    stop.set()
+    thread.join()
+    for connection in accepted:
+        connection.close()
+    server.close()
+
+
+def test_groq_read_timeout_is_retried_then_reported(silent_server):
+    url, accepted = silent_server
+    llm = LLMClientManager(api_key='gsk_test', timeout=0.2, connect_timeout=0.2, max_retries=1,
+                           backoff_base=0, base_url=url)
+    with pytest.raises(LLMError):
+        llm.complete(MESSAGES)
+    assert len(accepted) == 2
+    assert (llm.info()['retries'], llm.info()['failures']) == (1, 1)
+    llm.close()
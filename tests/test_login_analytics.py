@@ -0,0 +1,106 @@
+import datetime
+import json
+import os
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from login_analytics import HyperLogLog, LoginRollups, batch_id
+
+NOW = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+
+def _entries(n, start=0, success=True, browser='Chrome'):
+    return [{'_id': f'log-{i}', 'timestamp': NOW.isoformat(), 'username': f'user{i % 40}',
+             'success': success, 'device_type': 'desktop', 'browser': browser, 'os': 'Windows'}
+            for i in range(start, start + n)]
+
+
+@pytest.fixture(params=['mongo', 'file'])
+def rollups(request, tmp_path, mongo_db, down_collection):
+    collection = mongo_db.login_rollups if request.param == 'mongo' else down_collection
+    return LoginRollups(collection, path=str(tmp_path / 'login_rollups.json'))
+
+
+def test_counts_and_breakdowns(rollups):
+    rollups.record_many(_entries(30))
+    rollups.record_many(_entries(5, start=30, success=False, browser='Firefox'))
+    summary = rollups.summary(NOW)
+    assert summary['total_logins_today'] == summary['logins_this_hour'] == 35
+    assert (summary['successful_logins_today'], summary['failed_attempts_today']) == (30, 5)
+    assert summary['unique_users_today'] == 35
+    assert summary['browsers_today'] == {'Chrome': 30, 'Firefox': 5}
+    assert rollups.bucket('minute', NOW)['total'] == 35
+
+
+def test_replayed_batch_is_counted_once(rollups):
+    batch = _entries(10)
+    rollups.record_many(batch)
+    rollups.record_many([dict(entry) for entry in batch])
+    assert rollups.bucket('day', NOW)['total'] == 10
+
+
+def test_ambiguous_mongo_failure_replay_does_not_double_count(tmp_path, mongo_db):
+    rollups = LoginRollups(mongo_db.login_rollups, path=str(tmp_path / 'login_rollups.json'))
+    batch = _entries(10)
+    # Only the day bucket was written before the connection dropped
+    ops = rollups._mongo_ops(batch_id(batch), rollups._deltas(batch))
+    mongo_db.login_rollups.bulk_write(ops[2:], ordered=False)
+    rollups.record_many(batch)
+    assert [rollups.bucket(g, NOW)['total'] for g in ('minute', 'hour', 'day')] == [10, 10, 10]
+
+
+def test_other_write_errors_still_raise(tmp_path, mongo_db, monkeypatch):
+    rollups = LoginRollups(mongo_db.login_rollups, path=str(tmp_path / 'login_rollups.json'))
+
+    def failing(ops, ordered):
+        raise BulkWriteError({'writeErrors': [{'code': 121, 'errmsg': 'validation'}]})
+
+    monkeypatch.setattr(mongo_db.login_rollups, 'bulk_write', failing)
+    with pytest.raises(BulkWriteError):
+        rollups._write_mongo([])
+
+
+def test_hyperloglog_estimate_is_close():
+    hll = HyperLogLog()
+    for i in range(20000):
+        hll.add(f'user{i}')
+        hll.add(f'user{i}')
+    assert abs(hll.count() - 20000) / 20000 < 0.05
+    small = HyperLogLog()
+    for i in range(50):
+        small.add(i)
+    assert small.count() == 50
+    merged = HyperLogLog(small.registers)
+    merged.merge(hll.registers)
+    assert merged.count() >= hll.count()
+
+
+def test_file_fallback_appends_and_compacts(tmp_path, down_collection):
+    path = str(tmp_path / 'login_rollups.json')
+    rollups = LoginRollups(down_collection, path=path, compact_bytes=10 ** 6)
+    rollups.record_many(_entries(3))
+    rollups.record_many(_entries(2, start=3))
+    assert not os.path.exists(path)
+    with open(path + '.journal', encoding='utf-8') as f:
+        assert len(f.readlines()) == 2
+
+    reader = LoginRollups(down_collection, path=path)
+    assert reader.bucket('day', NOW)['total'] == 5
+    rollups.compact_bytes = 1
+    rollups.record_many(_entries(4, start=5))
+    assert os.path.getsize(path + '.journal') == 0
+    assert reader.bucket('day', NOW)['total'] == rollups.bucket('day', NOW)['total'] == 9
+    rollups.record_many(_entries(4, start=5))  # already in the snapshot
+    assert reader.bucket('day', NOW)['total'] == 9
+
+
+def test_file_written_before_the_journal_is_read(tmp_path, down_collection):
+    path = str(tmp_path / 'login_rollups.json')
+    key = f"day:{NOW.strftime('%Y-%m-%d')}"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({key: {'total': 7, 'success': 7, 'failure': 0, 'device': {}, 'browser': {}, 'os': {},
+                         'hll': {}, 'expires_at': (NOW + datetime.timedelta(days=1)).isoformat()}}, f)
+    rollups = LoginRollups(down_collection, path=path)
+    rollups.record_many(_entries(1))
+    assert rollups.bucket('day', NOW)['total'] == 8
@@ -0,0 +1,37 @@
+import csv
+import gzip
+import io
+import json
+
+from login_log_export import export_chunks
+
+ROWS = [
+    {'timestamp': '2024-05-01T10:00:00', 'username': '=HYPERLINK("http://x","y")', 'success': False,
+     'client_ip': '10.0.0.1', 'user_agent': '@SUM(1+1)*cmd|', 'note': '-2+3'},
+    {'timestamp': '2024-05-01T10:00:01', 'username': 'anita', 'success': True,
+     'client_ip': '10.0.0.2', 'user_agent': 'Mozilla/5.0', 'note': ''},
+]
+
+
+def _csv_rows(data):
+    return list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+
+
+def test_csv_cells_cannot_start_a_formula():
+    rows = _csv_rows(b''.join(export_chunks(ROWS, 'csv')))
+    assert rows[0]['username'] == '\'=HYPERLINK("http://x","y")'
+    assert rows[0]['user_agent'] == "'@SUM(1+1)*cmd|"
+    assert rows[0]['note'] == "'-2+3"
+    assert rows[1]['username'] == 'anita'
+    assert rows[1]['success'] == 'True'
+
+
+def test_ndjson_keeps_values_verbatim():
+    lines = b''.join(export_chunks(ROWS, 'ndjson')).decode('utf-8').splitlines()
+    assert json.loads(lines[0])['username'] == ROWS[0]['username']
+
+
+def test_gzip_stream_matches_plain_stream():
+    many = ROWS * 600
+    compressed = b''.join(export_chunks(iter(many), 'csv', compress=True))
+    assert gzip.decompress(compressed) == b''.join(export_chunks(iter(many), 'csv'))
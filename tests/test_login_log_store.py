@@ -0,0 +1,124 @@
+import json
+import multiprocessing
+
+import pytest
+from bson import ObjectId
+
+from login_log_query import LoginLogQuery
+from login_log_store import LoginLogStore, LoginLogView
+
+
+def _entries(n, timestamp='2024-05-01T10:00:00', username='alice'):
+    return [{'_id': str(ObjectId()), 'timestamp': timestamp, 'username': username, 'success': True}
+            for _ in range(n)]
+
+
+def _pages(find, limit, **kwargs):
+    """Follow nextCursor to the end; return every page's logs."""
+    pages, cursor = [], None
+    while True:
+        result = find(limit=limit, cursor=cursor, **kwargs)
+        pages.append(result['logs'])
+        cursor = result['nextCursor']
+        if not cursor:
+            return pages
+
+
+def test_cursor_pages_through_equal_timestamps(tmp_path):
+    store = LoginLogStore(str(tmp_path))
+    store.append_many(_entries(7) + _entries(3, timestamp='2024-05-01T09:00:00'))
+    view = LoginLogView(store)
+    pages = _pages(view.query, limit=3)
+    ids = [log['_id'] for page in pages for log in page]
+    assert len(ids) == len(set(ids)) == 10
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+
+
+def test_legacy_rows_without_id_page_by_line_hash(tmp_path):
+    store = LoginLogStore(str(tmp_path))
+    store.append_many([{'timestamp': '2024-05-01T10:00:00', 'username': f'user{i}'} for i in range(5)])
+    pages = _pages(LoginLogView(store).query, limit=2)
+    assert sorted(log['username'] for page in pages for log in page) == [f'user{i}' for i in range(5)]
+
+
+def test_file_and_mongo_agree_on_order_and_cursors(tmp_path, mongo_db):
+    entries = _entries(4) + _entries(4, timestamp='2024-05-02T10:00:00', username='bob')
+    store = LoginLogStore(str(tmp_path))
+    store.append_many(entries)
+    mongo_db.login_logs.insert_many([dict(e, _id=ObjectId(e['_id'])) for e in entries])
+    view, query = LoginLogView(store), LoginLogQuery(mongo_db.login_logs)
+
+    from_file = view.query(limit=3)
+    from_mongo = query.find(limit=3)
+    assert [log['_id'] for log in from_file['logs']] == [log['_id'] for log in from_mongo['logs']]
+    # A cursor issued by one backend continues on the other (MongoDB failover)
+    assert ([log['_id'] for log in view.query(limit=3, cursor=from_mongo['nextCursor'])['logs']] ==
+            [log['_id'] for log in query.find(limit=3, cursor=from_file['nextCursor'])['logs']])
+
+
+def test_page_numbers_seek_from_remembered_cursors(mongo_db, monkeypatch):
+    mongo_db.login_logs.insert_many([dict(e, _id=ObjectId(e['_id'])) for e in _entries(10)])
+    query = LoginLogQuery(mongo_db.login_logs)
+    by_cursor = [[log['_id'] for log in page] for page in _pages(query.find, limit=3)]
+
+    skips = []
+    cursor_type = type(mongo_db.login_logs.find())
+    original_skip = cursor_type.skip
+    monkeypatch.setattr(cursor_type, 'skip', lambda self, n: skips.append(n) or original_skip(self, n))
+
+    fresh = LoginLogQuery(mongo_db.login_logs)
+    by_page = [[log['_id'] for log in fresh.find(limit=3, page=page)['logs']] for page in range(1, 5)]
+    assert by_page == by_cursor
+    assert skips == []
+    # Jumping ahead skips only the pages after the last one served
+    assert [log['_id'] for log in LoginLogQuery(mongo_db.login_logs).find(limit=3, page=3)['logs']] == by_cursor[2]
+    assert skips == [6]
+
+
+def test_view_picks_up_appends_and_filters(tmp_path):
+    store = LoginLogStore(str(tmp_path), max_segment_bytes=300)
+    view = LoginLogView(store)
+    store.append_many(_entries(3, username='alice'))
+    assert view.query()['total'] == 3
+    store.append_many(_entries(2, username='alina') + _entries(2, username='bob'))
+    assert len(store.segments()) > 1
+    assert view.query(username='ali')['total'] == 5
+    assert view.query(username='alice', match='exact')['total'] == 3
+    assert view.query(username='OB', match='contains')['total'] == 2
+
+
+def _append_worker(directory, barrier, n):
+    store = LoginLogStore(directory, max_segment_bytes=2000)
+    barrier.wait()
+    for i in range(50):
+        store.append({'_id': f'{n}-{i}', 'timestamp': '2024-05-01T10:00:00', 'username': f'w{n}'})
+
+
+def test_concurrent_workers_lose_no_entries(tmp_path):
+    directory = str(tmp_path)
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=_append_worker, args=(directory, barrier, n)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    entries = LoginLogStore(directory).read_all()
+    assert sorted(e['_id'] for e in entries) == sorted(f'{n}-{i}' for n in range(4) for i in range(50))
+
+
+def test_partial_lines_are_skipped_until_complete(tmp_path):
+    store = LoginLogStore(str(tmp_path))
+    view = LoginLogView(store)
+    store.append(_entries(1)[0])
+    with open(store.active_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(_entries(1)[0])[:20])
+    assert view.query()['total'] == 1
+
+
+@pytest.mark.parametrize('match', ['prefix', 'exact', 'contains'])
+def test_iter_matching_is_oldest_first(tmp_path, match):
+    store = LoginLogStore(str(tmp_path))
+    store.append_many(_entries(2, timestamp='2024-05-01') + _entries(2, timestamp='2024-05-02'))
+    timestamps = [e['timestamp'] for e in store.iter_matching('alice', match)]
+    assert timestamps == sorted(timestamps) and len(timestamps) == 4
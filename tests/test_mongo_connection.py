@@ -0,0 +1,109 @@
+import pytest
+from bson import ObjectId
+from pymongo.errors import ConnectionFailure
+
+from circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from conftest import wait_for
+from mongo_connection import usable
+
+
+def test_circuit_opens_after_consecutive_failures_and_probe_closes_it():
+    healthy = {'up': False}
+    closed = []
+
+    def probe():
+        if not healthy['up']:
+            raise ConnectionFailure('still down')
+
+    breaker = CircuitBreaker('test', probe, failure_threshold=3, reset_timeout=0)
+    breaker.on_close(lambda: closed.append(True))
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert not breaker.allow()  # starts a probe, which fails
+    wait_for(lambda: breaker.state == OPEN and breaker.stats['probes'] == 1)
+    healthy['up'] = True
+    wait_for(lambda: breaker.allow() or breaker.state == CLOSED)
+    assert breaker.state == CLOSED and closed == [True]
+
+
+def test_building_a_cursor_does_not_count_as_success(fake_server, mongo):
+    assert mongo.try_connect()
+    logs = mongo.lazy_database().login_logs
+    logs.insert_one({'n': 1})
+    mongo.breaker.record_failure()
+    cursor = logs.find({}).sort('n').limit(5)
+    assert mongo.breaker.info()['consecutive_failures'] == 1
+    assert [doc['n'] for doc in cursor] == [1]
+    assert mongo.breaker.info()['consecutive_failures'] == 0
+
+
+def test_cursor_iteration_failures_open_the_circuit(fake_server, mongo):
+    assert mongo.try_connect()
+    logs = mongo.lazy_database().login_logs
+    logs.insert_one({'n': 1})
+    fake_server.up = False
+    for _ in range(2):
+        cursor = logs.find({})  # lazy: nothing sent yet
+        with pytest.raises(ConnectionFailure):
+            list(cursor)
+    assert mongo.breaker.state == OPEN
+    assert not usable(logs)
+
+
+def test_deferred_writes_replay_in_order_when_the_circuit_closes(fake_server, mongo):
+    assert mongo.try_connect()
+    db = mongo.lazy_database()
+    fake_server.up = False
+    for _ in range(2):
+        with pytest.raises(ConnectionFailure):
+            db.employees.insert_one({'id': 'x'})
+    assert not usable(db.employees)
+
+    db.employees.defer('replace_one', {'id': '1'}, {'id': '1', 'name': 'first'}, upsert=True)
+    db.employees.defer('replace_one', {'id': '1'}, {'id': '1', 'name': 'second'}, upsert=True)
+    fake_server.up = True
+    wait_for(lambda: usable(db.employees) and mongo.info()['replay']['pending'] == 0)
+    assert fake_server.store.test.employees.find_one({'id': '1'})['name'] == 'second'
+    assert mongo.replay_stats['replayed'] == 2
+
+
+def test_replay_after_partial_insert_many_does_not_duplicate(fake_server, mongo):
+    assert mongo.try_connect()
+    db = mongo.lazy_database()
+    entries = [{'_id': ObjectId(), 'username': f'user{i}'} for i in range(5)]
+    fake_server.store.test.login_logs.insert_many(entries[:3])  # landed before the failure
+
+    db.login_logs.defer('insert_many', [dict(entry) for entry in entries], ordered=False)
+    mongo._replay()
+    assert fake_server.store.test.login_logs.count_documents({}) == 5
+    assert mongo.info()['replay']['pending'] == 0
+
+
+def test_replay_stops_at_connection_error_and_keeps_the_rest(fake_server, mongo):
+    assert mongo.try_connect()
+    db = mongo.lazy_database()
+    db.employees.defer('insert_one', {'id': '1'})
+    db.employees.defer('insert_one', {'id': '2'})
+    fake_server.up = False
+    mongo._replay()
+    assert mongo.info()['replay']['pending'] == 2
+    fake_server.up = True
+    mongo._replay()
+    assert fake_server.store.test.employees.count_documents({}) == 2
+
+
+def test_unreachable_at_boot_fails_fast_and_reconnects(fake_server, mongo):
+    fake_server.up = False
+    assert not mongo.try_connect()
+    db = mongo.lazy_database()
+    assert not usable(db.users)
+    fake_server.up = True
+    wait_for(lambda: usable(db.users))
+    assert mongo.connected
@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rate_limiter import (FileRateLimitBackend, MemoryRateLimitBackend, MongoRateLimitBackend,
+                          SlidingWindowLimiter)
+
+# Start of a future minute, so counters are not already expired
+NOW = (int(time.time()) // 60 + 2) * 60.0
+
+
+@pytest.fixture(params=['memory', 'file', 'mongo', 'mongo-down'])
+def backend(request, tmp_path, mongo_db, down_collection):
+    if request.param == 'memory':
+        return MemoryRateLimitBackend()
+    if request.param == 'file':
+        return FileRateLimitBackend(str(tmp_path / 'rate_limits'))
+    collection = mongo_db.rate_limits if request.param == 'mongo' else down_collection
+    return MongoRateLimitBackend(collection, fallback=FileRateLimitBackend(str(tmp_path / 'rate_limits')))
+
+
+def test_limiter_blocks_after_limit_and_resets(backend):
+    limiter = SlidingWindowLimiter(backend, limit=3, window=60, prefix='login:')
+    now = NOW
+    for _ in range(3):
+        assert limiter.retry_after('alice', now) == 0
+        limiter.hit('alice', now)
+    assert limiter.retry_after('alice', now) == 60
+    assert limiter.retry_after('bob', now) == 0
+    limiter.reset('alice')
+    assert limiter.retry_after('alice', now) == 0
+
+
+def test_acquire_decides_from_the_incremented_count(backend):
+    limiter = SlidingWindowLimiter(backend, limit=3, window=60)
+    assert [limiter.acquire('alice', NOW) for _ in range(5)] == [0, 0, 0, 60, 60]
+    limiter.reset('alice')
+    assert limiter.acquire('alice', NOW) == 0
+
+
+def test_concurrent_acquires_let_only_limit_through(tmp_path):
+    limiter = SlidingWindowLimiter(FileRateLimitBackend(str(tmp_path)), limit=5, window=60)
+    barrier = threading.Barrier(16)
+
+    def attempt():
+        barrier.wait()
+        return limiter.acquire('alice', NOW)
+
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(lambda _: attempt(), range(16)))
+    assert results.count(0) == 5
+
+
+def test_previous_window_decays(backend):
+    limiter = SlidingWindowLimiter(backend, limit=4, window=60)
+    for _ in range(4):
+        limiter.hit('alice', NOW)
+    # Half way through the next window the 4 old hits weigh 2
+    assert limiter.retry_after('alice', NOW + 90) == 0
+    limiter.hit('alice', NOW + 90)
+    limiter.hit('alice', NOW + 90)
+    assert limiter.retry_after('alice', NOW + 90) == 30
+
+
+def test_mongo_down_uses_fallback(tmp_path, down_collection):
+    fallback = MemoryRateLimitBackend()
+    backend = MongoRateLimitBackend(down_collection, fallback=fallback)
+    assert backend.incr('alice', 100, 6120) == 1
+    assert fallback.counts('alice', [100]) == [1]
+
+
+def test_file_backend_count_is_file_size(tmp_path):
+    backend = FileRateLimitBackend(str(tmp_path))
+    assert backend.counts('alice', [1, 2]) == [0, 0]
+    assert [backend.incr('alice', 2, 9e9) for _ in range(3)] == [1, 2, 3]
+    assert backend.counts('alice', [1, 2]) == [0, 3]
+    backend.clear('alice')
+    assert backend.counts('alice', [2]) == [0]
+
+
+def test_file_backend_sweeps_expired_counters(tmp_path):
+    backend = FileRateLimitBackend(str(tmp_path), sweep_interval=0)
+    backend.incr('old', 1, 10)
+    backend.incr('live', 2, 9e9)
+    assert backend.counts('old', [1]) == [0]
+    assert backend.counts('live', [2]) == [1]
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def _hit_worker(directory, barrier, hits):
+    backend = FileRateLimitBackend(directory)
+    barrier.wait()
+    for _ in range(hits):
+        backend.incr('10.0.0.1', 7, 9e9)
+
+
+def test_concurrent_workers_count_every_hit(tmp_path):
+    directory = str(tmp_path / 'rate_limits')
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=_hit_worker, args=(directory, barrier, 250)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert FileRateLimitBackend(directory).counts('10.0.0.1', [7]) == [1000]
@@ -0,0 +1,41 @@
+from flask import Flask, jsonify
+
+from response_cache import ResponseCache
+
+
+def _app(cache, state):
+    app = Flask(__name__)
+
+    @app.route('/settings')
+    def settings():
+        return view({'role': 'ceo'})
+
+    @cache.cached('settings', ttl=300, vary=lambda: state['status'])
+    def view(current_user):
+        state['calls'] += 1
+        return jsonify({'database': {'status': state['status']}})
+
+    return app.test_client()
+
+
+def test_vary_value_is_never_served_stale():
+    state = {'status': 'connected', 'calls': 0}
+    client = _app(ResponseCache(), state)
+    assert client.get('/settings').get_json()['database']['status'] == 'connected'
+    assert client.get('/settings').get_json()['database']['status'] == 'connected'
+    assert state['calls'] == 1
+
+    state['status'] = 'file_fallback'
+    assert client.get('/settings').get_json()['database']['status'] == 'file_fallback'
+    assert state['calls'] == 2
+
+
+def test_etag_revalidation_and_invalidation():
+    state = {'status': 'connected', 'calls': 0}
+    cache = ResponseCache()
+    client = _app(cache, state)
+    etag = client.get('/settings').headers['ETag']
+    assert client.get('/settings', headers={'If-None-Match': etag}).status_code == 304
+    cache.invalidate('settings')
+    assert client.get('/settings', headers={'If-None-Match': etag}).status_code == 304
+    assert state['calls'] == 2
@@ -0,0 +1,99 @@
+from staffing import StaffingCoverage
+
+
+class FakeDirectory:
+    """Employee records in a dict; `during_scan` runs inside all_records()."""
+
+    def __init__(self, records):
+        self.records = {r['id']: r for r in records}
+        self.listeners = []
+        self.during_scan = None
+
+    def on_change(self, listener):
+        self.listeners.append(listener)
+
+    def upsert(self, record):
+        old = self.records.get(record['id'])
+        self.records[record['id']] = record
+        for listener in self.listeners:
+            listener(old, record)
+
+    def all_records(self):
+        if self.during_scan:
+            self.during_scan()
+        return list(self.records.values())
+
+
+class FakePosts:
+    """Sanctioned posts; `during_scan` runs after both scans, before the swap."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.during_scan = None
+
+    def set(self, school, department, posts):
+        self.rows = [r for r in self.rows if (r['school'], r['department']) != (school, department)]
+        self.rows.append({'school': school, 'department': department, 'posts': posts})
+        return self.rows[-1]
+
+    def all(self):
+        rows = list(self.rows)
+        if self.during_scan:
+            self.during_scan()
+        return rows
+
+
+def _employee(employee_id, school, status='Active'):
+    return {'id': employee_id, 'school': school, 'zone': 'North', 'department': 'Maths', 'status': status}
+
+
+def _filled(coverage):
+    return {g['name']: g['filled'] for g in coverage.aggregate('school')}
+
+
+def _coverage():
+    directory = FakeDirectory([_employee('1', 'GPS Alpha'), _employee('2', 'GPS Alpha')])
+    posts = FakePosts([{'school': 'GPS Alpha', 'department': 'Maths', 'posts': 3}])
+    coverage = StaffingCoverage(directory, posts)
+    assert _filled(coverage) == {'GPS Alpha': 2}
+    return directory, posts, coverage
+
+
+def test_change_after_the_scan_is_replayed():
+    directory, posts, coverage = _coverage()
+    posts.during_scan = lambda: directory.upsert(_employee('1', 'GPS Beta'))
+    coverage._rebuild()
+    assert _filled(coverage) == {'GPS Alpha': 1, 'GPS Beta': 1}
+
+
+def test_change_seen_by_the_scan_is_not_counted_twice():
+    directory, posts, coverage = _coverage()
+    directory.during_scan = lambda: directory.upsert(_employee('3', 'GPS Beta'))
+    coverage._rebuild()
+    directory.during_scan = None
+    assert _filled(coverage) == {'GPS Alpha': 2, 'GPS Beta': 1}
+
+
+def test_sanctioned_change_during_build_is_replayed():
+    directory, posts, coverage = _coverage()
+    posts.during_scan = lambda: (setattr(posts, 'during_scan', None),
+                                 coverage.set_sanctioned('GPS Alpha', 'Maths', 5))
+    coverage._rebuild()
+    assert coverage.aggregate('school')[0]['sanctioned'] == 5
+
+
+def test_changes_are_not_logged_outside_a_rebuild():
+    directory, posts, coverage = _coverage()
+    directory.upsert(_employee('2', 'GPS Alpha', status='Retired'))
+    assert _filled(coverage) == {'GPS Alpha': 1}
+    assert coverage._changes is None
+
+
+def test_aggregate_can_be_limited_to_one_zone():
+    directory = FakeDirectory([_employee('1', 'GPS Alpha'), dict(_employee('2', 'GPS Beta'), zone='South'),
+                               dict(_employee('3', 'GPS Gamma'), zone='South', district='D2')])
+    coverage = StaffingCoverage(directory, FakePosts([]))
+    assert [g['name'] for g in coverage.aggregate('zone', 'South')] == ['South']
+    assert [g['name'] for g in coverage.aggregate('school', 'South')] == ['GPS Beta', 'GPS Gamma']
+    assert sum(g['filled'] for g in coverage.aggregate('district', 'South')) == 2
+    assert coverage.aggregate('school', 'East') == []
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from token_cache import RevocationList, TokenCache, token_key
+
+
+def test_cache_honours_exp_and_ttl():
+    cache = TokenCache(ttl=300)
+    cache.put('live', {'userId': '1', 'exp': time.time() + 60})
+    cache.put('expired', {'userId': '2', 'exp': time.time() - 1})
+    assert cache.get('live')['userId'] == '1'
+    assert cache.get('expired') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_returns_copies_and_evicts_least_recent():
+    cache = TokenCache(maxsize=2)
+    cache.put('a', {'role': 'staff'})
+    cache.put('b', {'role': 'staff'})
+    cache.get('a')['role'] = 'ceo'
+    cache.put('c', {'role': 'staff'})
+    assert cache.get('a') == {'role': 'staff'}
+    assert cache.get('b') is None
+
+
+def test_concurrent_puts_stay_bounded():
+    cache = TokenCache(maxsize=50)
+    threads = [threading.Thread(target=lambda n=n: [cache.put(f'{n}-{i}', {'i': i}) for i in range(200)])
+               for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache._entries) == 50
+
+
+def test_revocation_reaches_other_workers_through_mongo(tmp_path, mongo_db):
+    first = RevocationList(mongo_db.revoked_tokens, path=str(tmp_path / 'a.json'), refresh_interval=0)
+    second = RevocationList(mongo_db.revoked_tokens, path=str(tmp_path / 'b.json'), refresh_interval=0)
+    key = token_key('header.payload.signature')
+    assert not second.is_revoked(key)
+    first.revoke(key, time.time() + 60)
+    assert second.is_revoked(key)
+
+
+def test_revocation_falls_back_to_shared_file(tmp_path, down_collection):
+    path = str(tmp_path / 'revoked.json')
+    first = RevocationList(down_collection, path=path, refresh_interval=0)
+    second = RevocationList(down_collection, path=path, refresh_interval=0)
+    first.revoke('live', time.time() + 60)
+    first.revoke('expired', time.time() - 1)
+    assert second.is_revoked('live')
+    assert not second.is_revoked('expired')
+
+
+def test_refresh_reads_only_recent_revocations(tmp_path, mongo_db):
+    queries = []
+
+    class Spy:
+        def __getattr__(self, name):
+            return getattr(mongo_db.revoked_tokens, name)
+
+        def find(self, query, *args):
+            queries.append(query)
+            return mongo_db.revoked_tokens.find(query, *args)
+
+    revocations = RevocationList(Spy(), path=str(tmp_path / 'revoked.json'), refresh_interval=0)
+    RevocationList(mongo_db.revoked_tokens, path=str(tmp_path / 'other.json')).revoke('first', time.time() + 60)
+    assert revocations.is_revoked('first')
+    RevocationList(mongo_db.revoked_tokens, path=str(tmp_path / 'other.json')).revoke('second', time.time() + 60)
+    assert revocations.is_revoked('second') and revocations.is_revoked('first')
+    assert queries[0] == {} and set(queries[-1]) == {'revoked_at'}
+    # A token past its exp is not revoked any more, even before the TTL monitor removes it
+    RevocationList(mongo_db.revoked_tokens, path=str(tmp_path / 'other.json')).revoke('expired', time.time() - 1)
+    assert not revocations.is_revoked('expired')
@@ -0,0 +1,167 @@
+import json
+import multiprocessing
+import threading
+
+import pytest
+
+from conftest import wait_for
+from transfer_store import TransferError, TransferStore, scope_for
+
+SEEDS = [
+    {'id': 'seed-1', 'employee_id': '1', 'to_school': 'West', 'to_zone': 'Zone B',
+     'status': 'Pending', 'request_date': '2025-10-20'},
+    {'id': 'seed-2', 'employee_id': '2', 'to_school': 'North', 'to_zone': 'Zone A',
+     'status': 'Approved', 'request_date': '2025-10-18'},
+]
+CEO = {'username': 'admin', 'role': 'CEO'}
+ZEO_B = {'username': 'zeo1', 'role': 'zeo', 'zone': 'Zone B'}
+STAFF_1 = {'username': 'john.doe', 'role': 'staff', 'employeeId': '1'}
+ADMIN_WEST = {'username': 'school1', 'role': 'admin', 'school': 'West'}
+
+
+def _seed_worker(path, barrier):
+    store = TransferStore(None, path=path)
+    barrier.wait()
+    store.seed(SEEDS)
+
+
+def test_concurrent_worker_seeding_on_file_does_not_duplicate(tmp_path):
+    path = str(tmp_path / 'transfers.json')
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=_seed_worker, args=(path, barrier)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(r['id'] for r in json.loads(open(path).read())) == ['seed-1', 'seed-2']
+
+
+def test_concurrent_seeding_on_mongo_does_not_duplicate(tmp_path, mongo_db):
+    stores = [TransferStore(mongo_db.transfers, path=str(tmp_path / 't.json')) for _ in range(4)]
+    threads = [threading.Thread(target=store.seed, args=(SEEDS,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert mongo_db.transfers.count_documents({}) == 2
+    wait_for(lambda: not any(store._mirror_running for store in stores))
+    assert sorted(r['id'] for r in json.loads((tmp_path / 't.json').read_text())) == ['seed-1', 'seed-2']
+
+
+def test_outage_after_a_healthy_write_acts_on_the_mirror(tmp_path, mongo_db, down_collection):
+    store = TransferStore(mongo_db.transfers, path=str(tmp_path / 't.json'))
+    store.seed(SEEDS)
+    created = store.create({'employee_id': '3', 'to_school': 'West', 'to_zone': 'Zone B'}, CEO)
+    wait_for(lambda: not store._mirror_running)
+
+    store.collection = down_collection
+    assert store.transition(created['id'], 'approve', ZEO_B)['status'] == 'Approved'
+    assert store.transition('seed-1', 'reject', ZEO_B)['status'] == 'Rejected'
+    assert store.page(zone='Zone B')['total'] == 2
+
+
+def test_file_seed_is_replayed_to_mongo(tmp_path, monkeypatch):
+    import transfer_store
+    deferred = []
+    monkeypatch.setattr(transfer_store, 'defer_write', lambda *args, **kwargs: deferred.append(args))
+    TransferStore(None, path=str(tmp_path / 't.json')).seed(SEEDS)
+    assert [(method, query) for _, method, query, _ in deferred] == [
+        ('update_one', {'id': 'seed-1'}), ('update_one', {'id': 'seed-2'})]
+
+
+@pytest.fixture(params=['mongo', 'file'])
+def store(request, tmp_path, mongo_db, down_collection):
+    collection = mongo_db.transfers if request.param == 'mongo' else down_collection
+    store = TransferStore(collection, path=str(tmp_path / 'transfers.json'))
+    store.seed(SEEDS)
+    return store
+
+
+def test_zeo_reviews_only_their_zone(store):
+    with pytest.raises(TransferError) as refused:
+        store.transition('seed-2', 'reject', ZEO_B)
+    assert refused.value.status == 403
+    assert store.transition('seed-1', 'approve', ZEO_B)['status'] == 'Approved'
+    with pytest.raises(TransferError) as refused:
+        store.transition('seed-1', 'approve', {'username': 'zeo2', 'role': 'zeo'})
+    assert refused.value.status == 403
+
+
+def test_reads_are_scoped_to_the_caller(store):
+    def visible(user):
+        return sorted(t['id'] for t in store.page(scope=scope_for(user))['transfers'])
+
+    assert visible(CEO) == ['seed-1', 'seed-2']
+    assert visible(ZEO_B) == visible(ADMIN_WEST) == visible(STAFF_1) == ['seed-1']
+    assert store.page(zone='Zone A', scope=scope_for(ZEO_B))['transfers'] == []
+    assert store.get('seed-2', scope_for(STAFF_1)) is None
+    assert store.get('seed-1', scope_for(STAFF_1))['id'] == 'seed-1'
+    assert store.status_counts(scope_for(STAFF_1)) == {'Pending': 1, 'Approved': 0, 'Rejected': 0, 'Completed': 0}
+    assert store.zone_queues(scope=scope_for(ADMIN_WEST)) == {'Zone B': 1}
+    for user in ({'username': 'staff1', 'role': 'staff'}, {'username': 'x', 'role': 'auditor'}):
+        with pytest.raises(TransferError) as refused:
+            scope_for(user)
+        assert refused.value.status == 403
+
+
+def test_school_admin_completes_only_their_school(store):
+    with pytest.raises(TransferError) as refused:
+        store.transition('seed-2', 'complete', ADMIN_WEST)
+    assert refused.value.status == 403
+    store.transition('seed-1', 'approve', ZEO_B)
+    assert store.transition('seed-1', 'complete', ADMIN_WEST)['status'] == 'Completed'
+
+
+def test_transitions_are_compare_and_set(store):
+    store.transition('seed-1', 'approve', CEO)
+    with pytest.raises(TransferError) as refused:
+        store.transition('seed-1', 'reject', CEO)
+    assert refused.value.status == 409
+    assert store.transition('seed-1', 'complete', CEO)['status'] == 'Completed'
+    with pytest.raises(TransferError) as missing:
+        store.transition('nope', 'approve', CEO)
+    assert missing.value.status == 404
+
+
+def test_staff_file_only_their_own_transfer(store):
+    request = {'employee_id': '2', 'to_school': 'East', 'to_zone': 'Zone C'}
+    with pytest.raises(TransferError) as refused:
+        store.create(request, STAFF_1)
+    assert refused.value.status == 403
+    with pytest.raises(TransferError):
+        store.create(request, {'username': 'staff1', 'role': 'staff'})
+    created = store.create(dict(request, employee_id='1'), STAFF_1)
+    assert store.get(created['id'])['requested_by'] == 'john.doe'
+    assert store.create(request, CEO)['employee_id'] == '2'
+
+
+def test_create_takes_employee_fields_from_the_directory(store):
+    employee = {'id': '1', 'name': 'John Doe', 'school': 'Central', 'zone': 'Zone A', 'department': 'Maths'}
+    destinations = {'Zone B': {'West'}}
+    forged = {'employee_id': '1', 'to_school': 'West', 'to_zone': 'Zone B', 'reason': 'Family',
+              'employee_name': '<img src=x onerror=alert(1)>', 'from_school': 'Evil', 'request_date': '2000-01-01'}
+    created = store.create(forged, STAFF_1, employee=employee, destinations=destinations)
+    assert (created['employee_name'], created['from_school'], created['from_zone']) == ('John Doe', 'Central', 'Zone A')
+    assert created['request_date'] > '2025'
+    for bad in ({'to_zone': 'Zone Z'}, {'to_school': '<b>x</b>'}, {'reason': 'x' * 1001}):
+        with pytest.raises(TransferError) as refused:
+            store.create(dict(forged, **bad), STAFF_1, employee=employee, destinations=destinations)
+        assert refused.value.status == 400
+
+
+def test_pages_by_cursor_newest_first(tmp_path, mongo_db, down_collection):
+    for collection in (mongo_db.transfers, down_collection):
+        store = TransferStore(collection, path=str(tmp_path / f'{id(collection)}.json'))
+        store.seed(SEEDS[:1] + [{'id': f'day-{day}', 'employee_id': '9', 'to_school': 'S', 'to_zone': 'Zone C',
+                                 'status': 'Pending', 'request_date': f'2025-09-{day}'} for day in range(10, 20)])
+        seen, cursor = [], None
+        while True:
+            page = store.page(zone='Zone C', limit=3, cursor=cursor)
+            seen += [t['request_date'] for t in page['transfers']]
+            cursor = page['nextCursor']
+            if not cursor:
+                break
+        assert seen == [f'2025-09-{day}' for day in range(19, 9, -1)]
+        assert store.status_counts()['Pending'] == 11
+        assert store.zone_queues() == {'Zone B': 1, 'Zone C': 10}
@@ -0,0 +1,43 @@
+import pytest
+
+from benchmarks import SAMPLE_USER_AGENTS, legacy_parse_user_agent
+from user_agent import cache_info, classify_many, classify_user_agent, reclassify_collection
+
+CHROME_WINDOWS, EDGE_WINDOWS, SAFARI_MAC, SAFARI_IPHONE, CHROME_ANDROID, FIREFOX_LINUX = SAMPLE_USER_AGENTS
+IPAD = 'Mozilla/5.0 (iPad; CPU OS 17_1 like Mac OS X) AppleWebKit/605.1.15 Version/17.1 Safari/604.1'
+OPERA = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36 OPR/105.0.0.0'
+
+
+@pytest.mark.parametrize('user_agent', [CHROME_WINDOWS, SAFARI_MAC, FIREFOX_LINUX, 'curl/8.4.0', '', None])
+def test_matches_the_legacy_parser(user_agent):
+    assert classify_user_agent(user_agent) == legacy_parse_user_agent(user_agent)
+
+
+@pytest.mark.parametrize('user_agent, field, legacy, fixed', [
+    (EDGE_WINDOWS, 'browser', 'Chrome', 'Edge'),  # "Edg/" never matched "edge"
+    (OPERA, 'browser', 'Chrome', 'Opera'),
+    (SAFARI_IPHONE, 'os', 'macOS', 'iOS'),  # "like Mac OS X" was read as macOS
+    (IPAD, 'os', 'macOS', 'iOS'),
+    (CHROME_ANDROID, 'os', 'Linux', 'Android'),  # "Linux; Android" was read as Linux
+])
+def test_differs_from_the_legacy_parser_only_where_it_was_wrong(user_agent, field, legacy, fixed):
+    old, new = legacy_parse_user_agent(user_agent), classify_user_agent(user_agent)
+    assert (old[field], new[field]) == (legacy, fixed)
+    assert {k: v for k, v in old.items() if k != field} == {k: v for k, v in new.items() if k != field}
+
+
+def test_results_are_memoized_copies():
+    hits = cache_info().hits
+    first = classify_user_agent(CHROME_WINDOWS)
+    first['browser'] = 'changed'
+    assert classify_user_agent(CHROME_WINDOWS)['browser'] == 'Chrome'
+    assert cache_info().hits > hits
+
+
+def test_reclassify_collection_updates_each_distinct_agent(mongo_db):
+    mongo_db.login_logs.insert_many([{'user_agent': EDGE_WINDOWS, 'browser': 'Chrome'} for _ in range(3)] +
+                                    [{'user_agent': CHROME_ANDROID, 'os': 'Linux'}])
+    assert reclassify_collection(mongo_db.login_logs) == 4
+    assert {doc['browser'] for doc in mongo_db.login_logs.find({'user_agent': EDGE_WINDOWS})} == {'Edge'}
+    assert mongo_db.login_logs.find_one({'user_agent': CHROME_ANDROID})['os'] == 'Android'
+    assert set(classify_many([IPAD, IPAD, OPERA])) == {IPAD, OPERA}
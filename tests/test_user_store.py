@@ -0,0 +1,73 @@
+import threading
+
+import bcrypt
+
+from conftest import wait_for
+from user_store import UserStore, hash_password
+
+ACCOUNTS = {
+    'admin': {'password': 'admin123', 'role': 'CEO', 'id': '1'},
+    'staff1': {'password': 'staff123', 'role': 'staff', 'id': '7'},
+}
+
+
+def test_authenticate_against_mongo(tmp_path, mongo_db):
+    store = UserStore(mongo_db.users, path=str(tmp_path / 'users.json'), bcrypt_rounds=4)
+    store.seed(ACCOUNTS)
+    assert store.authenticate('admin', 'admin123')['role'] == 'CEO'
+    assert store.authenticate('admin', 'wrong') is None
+    assert store.authenticate('nobody', 'admin123') is None
+    assert not (tmp_path / 'users.json').exists()
+
+
+def test_seed_keeps_existing_passwords(tmp_path, mongo_db):
+    store = UserStore(mongo_db.users, path=str(tmp_path / 'users.json'), bcrypt_rounds=4)
+    store.seed(ACCOUNTS)
+    store.seed({'admin': {'password': 'changed', 'role': 'CEO', 'id': '1'}})
+    assert store.authenticate('admin', 'admin123')
+
+
+def test_file_fallback(tmp_path, down_collection):
+    store = UserStore(down_collection, path=str(tmp_path / 'users.json'), bcrypt_rounds=4)
+    store.seed(ACCOUNTS)
+    assert store.authenticate('staff1', 'staff123')['id'] == '7'
+
+
+def test_accounts_seeded_while_mongo_is_down_reach_mongo(tmp_path, fake_server, mongo):
+    fake_server.up = False
+    assert not mongo.try_connect()
+    db = mongo.lazy_database()
+    store = UserStore(db.users, path=str(tmp_path / 'users.json'), bcrypt_rounds=4, cache_ttl=0)
+    store.seed(ACCOUNTS)
+    assert store.authenticate('admin', 'admin123')
+
+    fake_server.up = True
+    assert mongo.try_connect()
+    wait_for(lambda: mongo.info()['replay']['pending'] == 0)
+    assert fake_server.store.test.users.count_documents({}) == 2
+    assert store.authenticate('admin', 'admin123')
+
+
+def test_rehash_only_raises_the_cost(tmp_path, mongo_db):
+    mongo_db.users.insert_one({'username': 'weak', 'role': 'staff', 'id': '8',
+                               'password_hash': hash_password('pw', 4)})
+    mongo_db.users.insert_one({'username': 'strong', 'role': 'staff', 'id': '9',
+                               'password_hash': hash_password('pw', 6)})
+    store = UserStore(mongo_db.users, path=str(tmp_path / 'users.json'), bcrypt_rounds=5)
+    assert store.authenticate('weak', 'pw') and store.authenticate('strong', 'pw')
+    assert mongo_db.users.find_one({'username': 'weak'})['password_hash'].startswith('$2b$05$')
+    assert mongo_db.users.find_one({'username': 'strong'})['password_hash'].startswith('$2b$06$')
+
+
+def test_concurrent_authentication(tmp_path, mongo_db):
+    store = UserStore(mongo_db.users, path=str(tmp_path / 'users.json'), bcrypt_rounds=4)
+    store.seed(ACCOUNTS)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(bool(store.authenticate('admin', 'admin123'))))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [True] * 8
+    assert bcrypt.checkpw(b'admin123', mongo_db.users.find_one({'username': 'admin'})['password_hash'].encode())
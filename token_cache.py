@@ -0,0 +1,172 @@
+"""
+Token Cache - Verified JWT payload cache and revocation list
+============================================================
+
+require_auth() in unified_app.py verifies the bearer token on every call.
+Dashboards poll several endpoints per second with the same token, so the
+payload of a successfully verified token is cached, keyed by a SHA-256 of
+the token, until the earlier of its `exp` claim or the cache TTL. A cache
+hit skips the HMAC check and JSON decoding entirely.
+
+Revoked tokens (logout) are recorded by hash in the MongoDB
+`revoked_tokens` collection (TTL-expired at the token's `exp`) or a JSON
+file, and each worker refreshes its in-memory copy every few seconds, so a
+revocation reaches all gunicorn workers within `refresh_interval`. Each
+document carries the server's `revoked_at` time, so after the first full
+read a refresh only fetches the revocations since the newest one seen
+(less a small overlap for writes that commit out of order).
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from login_log_store import file_lock
+from mongo_connection import usable, defer_write
+
+logger = logging.getLogger(__name__)
+
+
+def token_key(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class TokenCache:
+    """Bounded LRU of token hash -> verified payload, honoring `exp`."""
+
+    def __init__(self, maxsize=4096, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return a copy of the cached payload, or None if absent or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, key, payload):
+        expires_at = time.time() + self.ttl
+        if payload.get('exp'):
+            expires_at = min(expires_at, float(payload['exp']))
+        with self._lock:
+            self._entries[key] = (dict(payload), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+def _epoch(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+class RevocationList:
+    """Revoked token hashes shared through MongoDB or a JSON file."""
+
+    OVERLAP = datetime.timedelta(seconds=5)
+
+    def __init__(self, collection=None, path='logs/revoked_tokens.json', refresh_interval=5):
+        self.collection = collection
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._revoked = {}  # token hash -> expiry (epoch seconds)
+        self._seen_until = None  # newest revoked_at read from MongoDB
+        self._next_refresh = 0
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        if collection is not None:
+            try:
+                collection.create_index('expires_at', expireAfterSeconds=0)
+                collection.create_index('revoked_at')
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create revoked token index: {e}")
+
+    def _load_file(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _refresh(self):
+        now = time.time()
+        if now < self._next_refresh:
+            return
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            self._next_refresh = now + self.refresh_interval
+            revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+            if usable(self.collection):
+                try:
+                    self._revoked = self._read_mongo(revoked)
+                    return
+                except Exception as e:
+                    logger.warning(f"⚠️ MongoDB revoked token refresh failed: {e}. Falling back to file.")
+            try:
+                from_file = {k: exp for k, exp in self._load_file().items() if exp > now}
+            except Exception as e:
+                logger.warning(f"⚠️ Could not refresh revoked tokens: {e}")
+                return
+            # While MongoDB is down, the revocations last read from it still hold
+            self._revoked = from_file if self.collection is None else dict(revoked, **from_file)
+
+    def _read_mongo(self, revoked):
+        """`revoked` plus the documents revoked since the last read (all of them at first)."""
+        query = {} if self._seen_until is None else {'revoked_at': {'$gte': self._seen_until - self.OVERLAP}}
+        seen_until = self._seen_until
+        for doc in self.collection.find(query, {'expires_at': 1, 'revoked_at': 1}):
+            revoked[doc['_id']] = _epoch(doc['expires_at'])
+            if doc.get('revoked_at') and (seen_until is None or doc['revoked_at'] > seen_until):
+                seen_until = doc['revoked_at']
+        # Until a revoked_at is seen, keep reading everything rather than trust this host's clock
+        self._seen_until = seen_until
+        return revoked
+
+    def is_revoked(self, key):
+        self._refresh()
+        return self._revoked.get(key, 0) > time.time()
+
+    def revoke(self, key, exp):
+        """Revoke a token hash until `exp` (epoch seconds)."""
+        with self._lock:
+            self._revoked[key] = exp
+        update = {'$set': {'expires_at': datetime.datetime.fromtimestamp(exp, datetime.timezone.utc)},
+                  '$currentDate': {'revoked_at': True}}
+        if usable(self.collection):
+            try:
+                self.collection.update_one({'_id': key}, update, upsert=True)
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB revocation write failed: {e}. Falling back to file.")
+        defer_write(self.collection, 'update_one', {'_id': key}, update, upsert=True)
+        with file_lock(self.path + '.lock', self._file_lock):
+            now = time.time()
+            revoked = {k: v for k, v in self._load_file().items() if v > now}
+            revoked[key] = exp
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(revoked, f)
+            os.replace(tmp_path, self.path)
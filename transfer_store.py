@@ -0,0 +1,598 @@
+"""
+Transfer Store - Transfer request workflow with indexed queues
+==============================================================
+
+Backs /api/transfers. A transfer request moves through a small state
+machine:
+
+    Pending --approve--> Approved --complete--> Completed
+       |
+       +----reject----> Rejected
+
+Every transition is recorded in the request's `history` and applied with a
+compare-and-set on the current status, so two reviewers acting on the same
+request cannot both win.
+
+Reads and actions are scoped to the caller (`scope_for`): staff see and
+request only their own transfers (the `employeeId` in their token), a ZEO
+sees and reviews requests into their own `zone`, and a school admin sees
+and completes requests into their own `school`. The CEO sees everything.
+
+Storage and indexing:
+- MongoDB `transfers` collection with a compound index on
+  (status, to_zone, request_date, id), which serves the per-zone review
+  queues, plus (status, ...), (to_zone, ...) and (request_date, id)
+  variants for the wider views. Pages are read newest first by keyset
+  cursor, so page N costs the same as page 1 regardless of how many
+  historical requests exist.
+  A (to_school, ...) index serves school admins and (employee_id, ...)
+  serves staff.
+- The file mirrors MongoDB, so approve/reject/complete keep working through
+  an outage: after every MongoDB write, and at most every
+  `mirror_interval` seconds on reads, a daemon thread copies the collection
+  into it (records only in the file, written during an outage and not yet
+  replayed, are kept).
+- Without MongoDB, records live in data/transfers.json and are loaded into
+  in-memory queues: one sorted list of (request_date, id) per status and
+  per (status, field, value) for each QUEUE_FIELDS field. A page is a
+  bisect plus a slice.
+"""
+
+import base64
+import bisect
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from login_log_store import file_lock
+from mongo_connection import usable, defer_write
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('Pending', 'Approved', 'Rejected', 'Completed')
+
+# action -> (required current status, resulting status)
+TRANSITIONS = {
+    'approve': ('Pending', 'Approved'),
+    'reject': ('Pending', 'Rejected'),
+    'complete': ('Approved', 'Completed'),
+}
+
+# Roles (lowercase) allowed to perform each action
+ACTION_ROLES = {
+    'create': {'ceo', 'zeo', 'admin', 'staff'},
+    'approve': {'ceo', 'zeo'},
+    'reject': {'ceo', 'zeo'},
+    'complete': {'ceo', 'admin'},
+}
+
+# Roles (lowercase) allowed to list and read requests
+VIEW_ROLES = {'ceo', 'zeo', 'admin', 'staff'}
+
+# Roles limited to some requests: role -> (token claim, transfer field it must equal)
+SCOPED_ROLES = {
+    'zeo': ('zone', 'to_zone'),
+    'admin': ('school', 'to_school'),
+    'staff': ('employeeId', 'employee_id'),
+}
+
+# Fields with their own in-memory queues
+QUEUE_FIELDS = ('to_zone', 'to_school', 'employee_id')
+
+PRIORITIES = ('Low', 'Normal', 'High', 'Urgent')
+
+MAX_REASON_LENGTH = 1000
+
+
+class TransferError(Exception):
+    """A transfer operation was refused; `status` is the HTTP status to return."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_cursor(transfer):
+    raw = f"{transfer['request_date']}|{transfer['id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return (request_date, id) from a cursor token, or None if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        request_date, _, transfer_id = raw.rpartition('|')
+        return (request_date, transfer_id) if request_date and transfer_id else None
+    except (ValueError, UnicodeError):
+        return None
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def scope_for(user, action='view'):
+    """
+    Return the {field: value} filter limiting what `user` may see or act on
+    ({} for unscoped roles). Raises TransferError(403) for roles that may
+    not view transfers and for scoped accounts missing their claim.
+    """
+    role = (user.get('role') or '').lower()
+    if role not in VIEW_ROLES:
+        raise TransferError('Not allowed to view transfers', 403)
+    if role not in SCOPED_ROLES:
+        return {}
+    claim, field = SCOPED_ROLES[role]
+    if not user.get(claim):
+        raise TransferError(f'No {claim} assigned; cannot {action} transfers', 403)
+    return {field: str(user[claim])}
+
+
+def _in_scope(record, scope):
+    return all(str(record.get(field) or '') == value for field, value in scope.items())
+
+
+def _canonical_status(status):
+    for known in STATUSES:
+        if known.lower() == (status or '').lower():
+            return known
+    return None
+
+
+class _MemoryQueues:
+    """Transfer records with a sorted (request_date, id) list per status and (status, field, value)."""
+
+    def __init__(self):
+        self.records = {}
+        self.queues = {}
+
+    @staticmethod
+    def _queue_keys(record):
+        keys = [(record['status'], None, None), (None, None, None)]
+        for field in QUEUE_FIELDS:
+            keys += [(record['status'], field, record.get(field)), (None, field, record.get(field))]
+        return keys
+
+    def put(self, record):
+        self.remove(record['id'])
+        self.records[record['id']] = record
+        entry = (record['request_date'], record['id'])
+        for key in self._queue_keys(record):
+            bisect.insort(self.queues.setdefault(key, []), entry)
+
+    def load(self, records):
+        """Bulk-load records, sorting each queue once."""
+        for record in records:
+            self.records[record['id']] = record
+            entry = (record['request_date'], record['id'])
+            for key in self._queue_keys(record):
+                self.queues.setdefault(key, []).append(entry)
+        for queue in self.queues.values():
+            queue.sort()
+
+    def remove(self, transfer_id):
+        old = self.records.pop(transfer_id, None)
+        if old is None:
+            return
+        entry = (old['request_date'], old['id'])
+        for key in self._queue_keys(old):
+            queue = self.queues.get(key, [])
+            i = bisect.bisect_left(queue, entry)
+            if i < len(queue) and queue[i] == entry:
+                del queue[i]
+
+    def queue(self, status, filters):
+        """
+        Sorted (request_date, id) entries in `status` (None: any) matching
+        every filter. The first filter picks the queue; any others are
+        checked per entry.
+        """
+        if not filters:
+            return self.queues.get((status, None, None), [])
+        (field, value), *rest = filters.items()
+        queue = self.queues.get((status, field, value), [])
+        if rest:
+            queue = [entry for entry in queue
+                     if all(self.records[entry[1]].get(f) == v for f, v in rest)]
+        return queue
+
+    def page(self, status, filters, limit, seek):
+        """Return (records newest first, total) for one page of a queue."""
+        queue = self.queue(status, filters)
+        end = bisect.bisect_left(queue, seek) if seek else len(queue)
+        entries = queue[max(end - limit, 0):end]
+        return [self.records[transfer_id] for _, transfer_id in reversed(entries)], len(queue)
+
+    def zone_counts(self, status, filters):
+        if not filters:
+            return {value: len(queue) for (s, field, value), queue in self.queues.items()
+                    if s == status and field == 'to_zone' and value is not None and queue}
+        counts = {}
+        for _, transfer_id in self.queue(status, filters):
+            zone = self.records[transfer_id].get('to_zone')
+            if zone:
+                counts[zone] = counts.get(zone, 0) + 1
+        return counts
+
+
+class TransferStore:
+    """Transfer requests in MongoDB with an embedded in-memory fallback."""
+
+    def __init__(self, collection=None, path='data/transfers.json', create_indexes=True,
+                 mirror_interval=300):
+        self.collection = collection
+        self.path = path
+        self.mirror_interval = mirror_interval
+        self._memory = _MemoryQueues()
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._listeners = []
+        self._mirror_lock = threading.Lock()
+        self._mirror_running = False
+        self._mirror_pending = False
+        self._next_mirror = 0
+
+        self._loaded_mtime = None
+        self._sync_file()
+
+        if collection is not None and create_indexes:
+            try:
+                collection.create_index('id', unique=True)
+                collection.create_index([('status', 1), ('to_zone', 1), ('request_date', -1), ('id', -1)],
+                                        name='status_zone_date')
+                collection.create_index([('status', 1), ('request_date', -1), ('id', -1)],
+                                        name='status_date')
+                collection.create_index([('to_zone', 1), ('request_date', -1), ('id', -1)],
+                                        name='zone_date')
+                collection.create_index([('to_school', 1), ('request_date', -1), ('id', -1)],
+                                        name='school_date')
+                collection.create_index([('request_date', -1), ('id', -1)], name='request_date')
+                collection.create_index([('employee_id', 1), ('request_date', -1)], name='employee_date')
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create transfer indexes: {e}")
+
+    def on_change(self, listener):
+        """Register listener(old, new) called after every create/transition."""
+        self._listeners.append(listener)
+
+    def _notify(self, old, new):
+        for listener in self._listeners:
+            try:
+                listener(old, new)
+            except Exception as e:
+                logger.error(f"Transfer listener failed: {e}")
+
+    # ---------- storage ----------
+
+    def _load_file(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _sync_file(self):
+        """Reload the in-memory queues if another worker rewrote the file. Caller holds _lock or is __init__."""
+        mtime = self._file_mtime()
+        if mtime == self._loaded_mtime:
+            return
+        memory = _MemoryQueues()
+        memory.load(self._load_file())
+        self._memory = memory
+        self._loaded_mtime = mtime
+
+    def _save_file(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self._memory.records.values()), f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._loaded_mtime = self._file_mtime()
+
+    def mirror(self):
+        """Copy every MongoDB record into the file; raises if MongoDB fails."""
+        self._next_mirror = time.monotonic() + self.mirror_interval
+        records = list(self.collection.find({}, {'_id': 0}))
+        with file_lock(self.path + '.lock', self._file_lock):
+            with self._lock:
+                self._sync_file()
+                for record in records:
+                    self._memory.put(record)
+                self._save_file()
+        # Replayed once MongoDB is back; $setOnInsert keeps requests that exist there
+        for record in records:
+            defer_write(self.collection, 'update_one', {'id': record['id']}, {'$setOnInsert': record}, upsert=True)
+
+    def _schedule_mirror(self):
+        """Run mirror() on a daemon thread, or once more after the running pass."""
+        if not usable(self.collection):
+            return
+        with self._mirror_lock:
+            if self._mirror_running:
+                self._mirror_pending = True
+                return
+            self._mirror_running = True
+        threading.Thread(target=self._run_mirror, name='transfer-mirror', daemon=True).start()
+
+    def _run_mirror(self):
+        while True:
+            try:
+                self.mirror()
+            except Exception as e:
+                logger.warning(f"⚠️ Transfer file mirror failed: {e}")
+            with self._mirror_lock:
+                if not self._mirror_pending:
+                    self._mirror_running = False
+                    return
+                self._mirror_pending = False
+
+    def _mirror_if_due(self):
+        if time.monotonic() >= self._next_mirror:
+            self._schedule_mirror()
+
+    # ---------- workflow ----------
+
+    def create(self, data, user, employee=None, destinations=None):
+        """
+        Create a Pending transfer request; returns the stored record.
+
+        The employee's name, school, zone and department are copied from
+        `employee` (their directory record), never from `data`. When
+        `destinations` ({zone: set of schools}) is given, to_zone and
+        to_school must name one of its schools. request_date is set here.
+        """
+        role = (user.get('role') or '').lower()
+        if role not in ACTION_ROLES['create']:
+            raise TransferError('Not allowed to create transfer requests', 403)
+        for field in ('employee_id', 'to_school', 'to_zone'):
+            if not data.get(field):
+                raise TransferError(f'{field} is required')
+        if role == 'staff' and str(data['employee_id']) != str(user.get('employeeId') or ''):
+            raise TransferError('Staff can only request their own transfer', 403)
+        to_zone, to_school = str(data['to_zone']), str(data['to_school'])
+        if destinations is not None:
+            if to_zone not in destinations:
+                raise TransferError(f'Unknown zone: {to_zone}')
+            if to_school not in destinations[to_zone]:
+                raise TransferError(f'Unknown school in {to_zone}: {to_school}')
+        priority = str(data.get('priority') or 'Normal').title()
+        if priority not in PRIORITIES:
+            raise TransferError(f"priority must be one of {', '.join(PRIORITIES)}")
+        reason = str(data.get('reason') or '')
+        if len(reason) > MAX_REASON_LENGTH:
+            raise TransferError(f'reason must be at most {MAX_REASON_LENGTH} characters')
+
+        employee = employee or {}
+        now = _now()
+        record = {
+            'id': uuid.uuid4().hex,
+            'employee_id': str(data['employee_id']),
+            'employee_name': employee.get('name', ''),
+            'from_school': employee.get('school', ''),
+            'to_school': to_school,
+            'from_zone': employee.get('zone', ''),
+            'to_zone': to_zone,
+            'department': employee.get('department', ''),
+            'reason': reason,
+            'priority': priority,
+            'status': 'Pending',
+            'request_date': now,
+            'updated_at': now,
+            'requested_by': user.get('username'),
+            'history': [{'action': 'create', 'status': 'Pending', 'by': user.get('username'), 'at': now}]
+        }
+
+        if usable(self.collection):
+            try:
+                self.collection.insert_one(dict(record))
+                self._schedule_mirror()
+                self._notify(None, record)
+                return record
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB transfer write failed: {e}. Falling back to file.")
+        defer_write(self.collection, 'insert_one', dict(record))
+        with file_lock(self.path + '.lock', self._file_lock):
+            with self._lock:
+                self._sync_file()
+                self._memory.put(record)
+                self._save_file()
+        self._notify(None, record)
+        return record
+
+    def transition(self, transfer_id, action, user, comment=''):
+        """Apply approve/reject/complete to a request; returns the updated record."""
+        if action not in TRANSITIONS:
+            raise TransferError(f'Unknown action: {action}', 404)
+        if (user.get('role') or '').lower() not in ACTION_ROLES[action]:
+            raise TransferError(f'Not allowed to {action} transfers', 403)
+        from_status, to_status = TRANSITIONS[action]
+        scope = scope_for(user, action)
+        now = _now()
+        event = {'action': action, 'status': to_status, 'by': user.get('username'), 'at': now}
+        if comment:
+            event['comment'] = comment
+
+        if usable(self.collection):
+            try:
+                from pymongo import ReturnDocument
+                query = dict(scope, id=transfer_id, status=from_status)
+                updated = self.collection.find_one_and_update(
+                    query,
+                    {'$set': {'status': to_status, 'updated_at': now}, '$push': {'history': event}},
+                    projection={'_id': 0},
+                    return_document=ReturnDocument.AFTER
+                )
+                if updated is None:
+                    self._refuse(self._find(transfer_id), action, from_status, scope)
+                self._schedule_mirror()
+                self._notify(dict(updated, status=from_status), updated)
+                return updated
+            except TransferError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB transfer update failed: {e}. Falling back to file.")
+
+        with file_lock(self.path + '.lock', self._file_lock):
+            with self._lock:
+                self._sync_file()
+                old = self._memory.records.get(transfer_id)
+                if old is None or old['status'] != from_status or not _in_scope(old, scope):
+                    self._refuse(old, action, from_status, scope)
+                updated = dict(old, status=to_status, updated_at=now, history=old['history'] + [event])
+                self._memory.put(updated)
+                self._save_file()
+        defer_write(self.collection, 'replace_one', {'id': transfer_id}, dict(updated), upsert=True)
+        self._notify(old, updated)
+        return updated
+
+    @staticmethod
+    def _refuse(current, action, from_status, scope=None):
+        if current is None:
+            raise TransferError('Transfer request not found', 404)
+        for field, value in (scope or {}).items():
+            if str(current.get(field) or '') != value:
+                raise TransferError(f'Not allowed to {action} transfers into {current.get(field)}', 403)
+        raise TransferError(
+            f"Cannot {action} a request that is {current['status']} (must be {from_status})", 409)
+
+    # ---------- reads ----------
+
+    def _find(self, transfer_id):
+        self._mirror_if_due()
+        if usable(self.collection):
+            try:
+                return self.collection.find_one({'id': transfer_id}, {'_id': 0})
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB transfer read failed: {e}. Falling back to file.")
+        with self._lock:
+            self._sync_file()
+            return self._memory.records.get(transfer_id)
+
+    def get(self, transfer_id, scope=None):
+        """Return one request, or None if it does not exist or is outside `scope`."""
+        transfer = self._find(transfer_id)
+        return transfer if transfer is not None and _in_scope(transfer, scope or {}) else None
+
+    def page(self, status='', zone='', limit=50, cursor=None, scope=None):
+        """
+        Return a page of requests within `scope` (see scope_for), newest first.
+
+        Returns a dict with transfers, total and nextCursor. Unknown status
+        values raise TransferError.
+        """
+        canonical = None
+        if status:
+            canonical = _canonical_status(status)
+            if canonical is None:
+                raise TransferError(f"status must be one of {', '.join(STATUSES)}")
+        filters = dict(scope or {})
+        if zone and filters.setdefault('to_zone', zone) != zone:
+            return {'transfers': [], 'total': 0, 'nextCursor': None}  # outside the caller's zone
+        seek = decode_cursor(cursor) if cursor else None
+        self._mirror_if_due()
+
+        transfers = total = None
+        if usable(self.collection):
+            try:
+                transfers, total = self._page_mongo(canonical, filters, limit, seek)
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB transfer query failed: {e}. Falling back to file.")
+        if transfers is None:
+            with self._lock:
+                self._sync_file()
+                transfers, total = self._memory.page(canonical, filters, limit, seek)
+
+        return {
+            'transfers': transfers,
+            'total': total,
+            'nextCursor': encode_cursor(transfers[-1]) if len(transfers) == limit else None
+        }
+
+    def _page_mongo(self, status, filters, limit, seek):
+        query = dict(filters)
+        if status:
+            query['status'] = status
+        total = (self.collection.count_documents(query) if query
+                 else self.collection.estimated_document_count())
+        if seek:
+            request_date, transfer_id = seek
+            query['$or'] = [
+                {'request_date': {'$lt': request_date}},
+                {'request_date': request_date, 'id': {'$lt': transfer_id}}
+            ]
+        cursor = (self.collection.find(query, {'_id': 0})
+                  .sort([('request_date', -1), ('id', -1)])
+                  .limit(limit))
+        return list(cursor), total
+
+    def zone_queues(self, status='Pending', scope=None):
+        """Return {zone: count} of requests in `status` within `scope`, per destination zone."""
+        status = _canonical_status(status) or 'Pending'
+        scope = scope or {}
+        if usable(self.collection):
+            try:
+                rows = self.collection.aggregate([
+                    {'$match': dict(scope, status=status)},
+                    {'$group': {'_id': '$to_zone', 'count': {'$sum': 1}}}
+                ])
+                return {row['_id']: row['count'] for row in rows if row['_id']}
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB transfer aggregation failed: {e}. Falling back to file.")
+        with self._lock:
+            self._sync_file()
+            return self._memory.zone_counts(status, scope)
+
+    def status_counts(self, scope=None):
+        """Return {status: count} across all requests within `scope`."""
+        scope = scope or {}
+        if usable(self.collection):
+            try:
+                rows = self.collection.aggregate([{'$match': scope},
+                                                  {'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+                counts = {row['_id']: row['count'] for row in rows}
+                return {status: counts.get(status, 0) for status in STATUSES}
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB transfer aggregation failed: {e}. Falling back to file.")
+        with self._lock:
+            self._sync_file()
+            return {status: len(self._memory.queue(status, scope)) for status in STATUSES}
+
+    def seed(self, records):
+        """
+        Insert sample requests when the store is empty. Each record needs a
+        fixed `id`: workers seeding at the same time upsert the same
+        documents instead of adding copies.
+        """
+        records = [dict(record, updated_at=record.get('updated_at', record['request_date']),
+                        history=record.get('history', [])) for record in records]
+        if usable(self.collection):
+            try:
+                if self.collection.count_documents({}, limit=1):
+                    return
+                for record in records:
+                    self.collection.update_one({'id': record['id']}, {'$setOnInsert': record}, upsert=True)
+                self._schedule_mirror()
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB transfer seed failed: {e}. Falling back to file.")
+        with file_lock(self.path + '.lock', self._file_lock):
+            with self._lock:
+                self._sync_file()
+                if self._memory.records:
+                    return
+                for record in records:
+                    self._memory.put(record)
+                self._save_file()
+        # Replayed once MongoDB is back; $setOnInsert keeps requests that exist there
+        for record in records:
+            defer_write(self.collection, 'update_one', {'id': record['id']}, {'$setOnInsert': record}, upsert=True)
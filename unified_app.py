@@ -1,17 +1,43 @@
 # Unified Employee Management System
 # This single Flask app combines the backend API, chatbot, and serves the frontend
 
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, request, jsonify, render_template, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import json
 import datetime
+import itertools
+import time
 from functools import wraps
 import jwt
-from pymongo import MongoClient
 import logging
 from jinja2 import TemplateNotFound
 from dotenv import load_dotenv
+from bson import ObjectId
+from login_log_store import LoginLogStore, LoginLogView
+from audit_writer import AuditWriter
+from login_log_query import LoginLogQuery, ensure_login_log_indexes, iter_login_logs, MATCH_MODES
+from login_log_export import EXPORT_FORMATS, export_chunks
+from login_analytics import LoginRollups
+from user_agent import classify_user_agent
+from user_store import UserStore
+from employee_store import EmployeeDirectory
+from employee_suggest import EmployeeSuggester
+from transfer_store import TransferStore, TransferError, SCOPED_ROLES, scope_for
+from staffing import SanctionedPosts, StaffingCoverage
+from response_cache import ResponseCache
+from mongo_connection import MongoConnection, usable, defer_write
+from llm_client import LLMClientManager, LLMError
+from answer_cache import AnswerCache
+from chat_sessions import ConversationStore, check_guest_session_id, new_guest_session_id
+from intent_router import CHATBOT_ROUTER
+from data_context import DataContext, store_sources, employee_summary
+from intent_classifier import IntentClassifier, chatbot_training_set, load_faqs
+from token_cache import TokenCache, RevocationList, token_key
+from rate_limiter import (SlidingWindowLimiter, MemoryRateLimitBackend,
+                          FileRateLimitBackend, MongoRateLimitBackend)
+import atexit
 
 # Load environment variables - try multiple locations with explicit debug
 env_loaded = False
@@ -31,17 +57,13 @@ for env_path in env_paths:
 if not env_loaded:
     print("⚠️ WARNING: No .env file found. Using system environment variables only.")
 
-# Verify Groq key is loaded
+# Verify Groq key is loaded (never print the key itself)
 groq_key = os.getenv('GROQ_API_KEY')
 if groq_key and groq_key != 'your_groq_api_key_here':
-    print(f"✅ GROQ_API_KEY detected: {groq_key[:10]}...{groq_key[-4:]}")
+    print("✅ GROQ_API_KEY detected")
 else:
     print("❌ GROQ_API_KEY not loaded or invalid!")
 
-# TEMPORARY DEBUG: Hardcode key to test
-os.environ['GROQ_API_KEY'] = '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'
-print(f"🔑 GROQ_API_KEY manually set for testing")
-
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -57,6 +79,13 @@ print(f"📂 Static folder set to: {static_dir}")
 app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
 CORS(app)
 
+# Reverse proxies in front of the app (Render/Railway/nginx: 1, set by the
+# Procfile and Dockerfile). Their X-Forwarded-For entries become
+# request.remote_addr; 0 trusts none.
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT, x_proto=TRUSTED_PROXY_COUNT)
+
 # Configuration
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -140,78 +169,269 @@ ROLE_METADATA = {
     }
 }
 
-# MongoDB connection
+# MongoDB connection: one lazily created client per (forked) worker process,
+# reconnecting with backoff. Set MONGO_URI to an empty string to disable.
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/employee_mgmt')
-try:
-    # Set a short timeout (2s) so we don't wait too long if DB is down
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-    # Force a connection check
-    client.admin.command('ping')
-    db = client.employee_mgmt
-    logger.info("✅ Connected to MongoDB")
-except Exception as e:
-    logger.warning(f"⚠️ MongoDB connection failed: {e}")
-    logger.info("📂 Using file-based storage fallback")
-    db = None
+mongo = MongoConnection(
+    MONGO_URI, os.getenv('MONGO_DB', 'employee_mgmt'),
+    max_pool_size=int(os.getenv('MONGO_MAX_POOL_SIZE', 20)),
+    server_selection_timeout_ms=int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 2000)),
+    connect_timeout_ms=int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 2000)),
+    socket_timeout_ms=int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 10000)),
+    wait_queue_timeout_ms=int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000)),
+    backoff_max=float(os.getenv('MONGO_RECONNECT_BACKOFF_MAX', 30)),
+    failure_threshold=int(os.getenv('MONGO_BREAKER_FAILURES', 5)),
+    reset_timeout=float(os.getenv('MONGO_BREAKER_RESET_TIMEOUT', 30)),
+    replay_buffer_size=int(os.getenv('MONGO_REPLAY_BUFFER_SIZE', 10000))
+) if MONGO_URI else None
+db = mongo.lazy_database() if mongo is not None else None
+
+if mongo is not None and not mongo.try_connect():
+    logger.info("📂 Using file-based storage fallback until MongoDB is reachable")
+if db is not None:
+    try:
+        ensure_login_log_indexes(db.login_logs)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not create login log indexes: {e}")
+
+login_log_query = LoginLogQuery(db.login_logs) if db is not None else None
 
 # Create upload directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs('static/uploads', exist_ok=True)
 
+# File-based login log storage (used when MongoDB is unavailable)
+LOGIN_LOG_DIR = os.getenv('LOGIN_LOG_DIR', 'logs')
+login_log_store = LoginLogStore(
+    directory=LOGIN_LOG_DIR,
+    max_segment_bytes=int(os.getenv('LOGIN_LOG_SEGMENT_BYTES', 1024 * 1024)),
+    max_segments=int(os.getenv('LOGIN_LOG_MAX_SEGMENTS', 20)),
+    legacy_file='login_logs.json'
+)
+login_log_store.start_compactor()
+login_log_view = LoginLogView(login_log_store)
+
+# Incremental login analytics (per-minute/hour/day rollups)
+login_rollups = LoginRollups(
+    db.login_rollups if db is not None else None,
+    path=os.path.join(LOGIN_LOG_DIR, 'login_rollups.json')
+)
+
+
+def write_login_log_batch(entries):
+    """Persist a batch of login log entries and fold them into the rollups"""
+    # Ids are fixed before the first attempt, so a replay after a partial or
+    # ambiguous insert_many skips the rows that did land (duplicate key)
+    for entry in entries:
+        entry.setdefault('_id', ObjectId())
+    saved_to_db = False
+    if usable(db.login_logs if db is not None else None):
+        try:
+            db.login_logs.insert_many(entries, ordered=False)
+            saved_to_db = True
+        except Exception as e:
+            logger.warning(f"⚠️ MongoDB batch write failed: {e}. Falling back to file.")
+    if not saved_to_db:
+        login_log_store.append_many(entries)
+        if db is not None:
+            # Replayed to MongoDB once its circuit closes again
+            defer_write(db.login_logs, 'insert_many', [dict(entry) for entry in entries], ordered=False)
+    
+    try:
+        login_rollups.record_many(entries)
+    except Exception as e:
+        logger.error(f"Failed to update login rollups: {e}")
+
+
+def defer_login_log_batch(entries):
+    """A batch neither MongoDB nor the log files took: queue it for MongoDB."""
+    if db is None:
+        raise RuntimeError('MongoDB is disabled')
+    defer_write(db.login_logs, 'insert_many', [dict(entry) for entry in entries], ordered=False)
+    try:
+        login_rollups.record_many(entries)
+    except Exception as e:
+        logger.error(f"Failed to update login rollups: {e}")
+
+
+# Login audit entries are written off the request path in batches; failed
+# batches are deferred, or held and retried
+audit_writer = AuditWriter(
+    write_login_log_batch,
+    fallback=defer_login_log_batch,
+    max_queue=int(os.getenv('AUDIT_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('AUDIT_BATCH_SIZE', 100)),
+    flush_interval=float(os.getenv('AUDIT_FLUSH_INTERVAL', 1.0))
+)
+atexit.register(audit_writer.close)
+
+# Demo accounts advertised on the login pages; seeded into the user store
+# (hashed) when missing. Staff are linked to their employee record, the
+# ZEO to the zone whose incoming transfers they review and the school admin
+# to the school whose incoming transfers they complete.
+DEMO_USERS = {
+    'admin': {'password': 'admin123', 'role': 'CEO', 'id': '1'},
+    'john.doe': {'password': 'password123', 'role': 'staff', 'id': '2', 'employee_id': '1'},
+    'jane.smith': {'password': 'password456', 'role': 'staff', 'id': '3', 'employee_id': '2'},
+    'bob.wilson': {'password': 'password789', 'role': 'staff', 'id': '4', 'employee_id': '3'},
+    'zeo1': {'password': 'zeo123', 'role': 'zeo', 'id': '5', 'zone': 'Zone B'},
+    'school1': {'password': 'school123', 'role': 'admin', 'id': '6', 'school': 'West Elementary'},
+    'staff1': {'password': 'staff123', 'role': 'staff', 'id': '7'}
+}
+
+# Login accounts (MongoDB users collection, data/users.json fallback)
+user_store = UserStore(
+    db.users if db is not None else None,
+    path=os.getenv('USERS_FILE', os.path.join('data', 'users.json')),
+    bcrypt_rounds=int(os.getenv('BCRYPT_ROUNDS', 12)),
+    cache_ttl=int(os.getenv('USER_CACHE_TTL', 30))
+)
+try:
+    user_store.seed(DEMO_USERS)
+except Exception as e:
+    logger.error(f"Failed to seed demo users: {e}")
+
+# Sample staff records seeded into an empty employee directory
+SEED_EMPLOYEES = [
+    {'id': '1', 'name': 'John Doe', 'email': 'john.doe@school.edu', 'position': 'Teacher', 'department': 'Mathematics', 'school': 'Central High School', 'zone': 'Zone A', 'status': 'Active', 'joining_date': '2020-08-15', 'phone': '+1-555-0101'},
+    {'id': '2', 'name': 'Jane Smith', 'email': 'jane.smith@school.edu', 'position': 'Principal', 'department': 'Administration', 'school': 'West Elementary', 'zone': 'Zone B', 'status': 'Active', 'joining_date': '2018-06-20', 'phone': '+1-555-0102'},
+    {'id': '3', 'name': 'Bob Wilson', 'email': 'bob.wilson@school.edu', 'position': 'Teacher', 'department': 'Science', 'school': 'East Middle School', 'zone': 'Zone C', 'status': 'Active', 'joining_date': '2019-09-10', 'phone': '+1-555-0103'}
+]
+
+# Employee directory (MongoDB employees collection, embedded index fallback)
+employee_directory = EmployeeDirectory(
+    db.employees if db is not None else None,
+    path=os.getenv('EMPLOYEES_FILE', os.path.join('data', 'employee_directory.json'))
+)
+try:
+    employee_directory.seed(SEED_EMPLOYEES)
+except Exception as e:
+    logger.error(f"Failed to seed employee directory: {e}")
+
+# As-you-type employee lookup, rebuilt from the directory when stale
+employee_suggester = EmployeeSuggester(
+    employee_directory,
+    max_age=int(os.getenv('EMPLOYEE_SUGGEST_MAX_AGE', 60))
+)
+
+# Sample transfer requests seeded into an empty transfer store. Fixed ids
+# let every worker seed concurrently without duplicating them.
+SEED_TRANSFERS = [
+    {'id': 'seed-1', 'employee_name': 'John Doe', 'employee_id': '1', 'from_school': 'Central High School', 'to_school': 'West Elementary', 'from_zone': 'Zone A', 'to_zone': 'Zone B', 'reason': 'Personal reasons', 'status': 'Pending', 'request_date': '2025-10-20', 'priority': 'Normal'},
+    {'id': 'seed-2', 'employee_name': 'Jane Smith', 'employee_id': '2', 'from_school': 'East Middle School', 'to_school': 'North High School', 'from_zone': 'Zone C', 'to_zone': 'Zone A', 'reason': 'Promotion', 'status': 'Approved', 'request_date': '2025-10-18', 'priority': 'High'}
+]
+
+# Transfer workflow (MongoDB transfers collection, data/transfers.json fallback)
+transfer_store = TransferStore(
+    db.transfers if db is not None else None,
+    path=os.getenv('TRANSFERS_FILE', os.path.join('data', 'transfers.json'))
+)
+try:
+    transfer_store.seed(SEED_TRANSFERS)
+except Exception as e:
+    logger.error(f"Failed to seed transfer requests: {e}")
+
+# Approved posts seeded for the sample schools
+SEED_SANCTIONED_POSTS = [
+    {'school': 'Central High School', 'department': 'Mathematics', 'posts': 3},
+    {'school': 'Central High School', 'department': 'Science', 'posts': 2},
+    {'school': 'West Elementary', 'department': 'Administration', 'posts': 1},
+    {'school': 'East Middle School', 'department': 'Science', 'posts': 2}
+]
+
+# School x department staffing coverage, kept current by employee writes
+sanctioned_posts = SanctionedPosts(
+    db.sanctioned_posts if db is not None else None,
+    path=os.getenv('SANCTIONED_POSTS_FILE', os.path.join('data', 'sanctioned_posts.json'))
+)
+try:
+    sanctioned_posts.seed(SEED_SANCTIONED_POSTS)
+except Exception as e:
+    logger.error(f"Failed to seed sanctioned posts: {e}")
+staffing_coverage = StaffingCoverage(
+    employee_directory, sanctioned_posts,
+    max_age=int(os.getenv('STAFFING_MATRIX_MAX_AGE', 300))
+)
+
+
+def repost_transferred_employee(old, new):
+    """Move an employee to the destination school once their transfer completes."""
+    if new['status'] != 'Completed' or (old and old['status'] == 'Completed'):
+        return
+    employee = employee_directory.get(new['employee_id'])
+    if employee is None:
+        logger.warning(f"Completed transfer {new['id']} for unknown employee {new['employee_id']}")
+        return
+    employee.update(school=new['to_school'], zone=new['to_zone'])
+    employee_directory.upsert(employee)
+
+
+# Encoded responses of the polled dashboard endpoints, invalidated on writes
+response_cache = ResponseCache(
+    maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', 512)),
+    default_ttl=int(os.getenv('RESPONSE_CACHE_TTL', 30)),
+    shared_dir=os.path.join(LOGIN_LOG_DIR, 'cache')
+)
+
+transfer_store.on_change(repost_transferred_employee)
+transfer_store.on_change(lambda old, new: response_cache.invalidate('transfers'))
+employee_directory.on_change(lambda old, new: employee_suggester.invalidate())
+employee_directory.on_change(lambda old, new: response_cache.invalidate('employees'))
+
+# Login throttling (checked before any password or audit work)
+MAX_LOGIN_ATTEMPTS = int(os.getenv('MAX_LOGIN_ATTEMPTS', 5))
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'mongo' if db is not None else 'file')
+if RATE_LIMIT_BACKEND == 'mongo' and db is not None:
+    rate_limit_backend = MongoRateLimitBackend(
+        db.rate_limits,
+        fallback=FileRateLimitBackend(os.path.join(LOGIN_LOG_DIR, 'rate_limits'))
+    )
+elif RATE_LIMIT_BACKEND == 'memory':
+    rate_limit_backend = MemoryRateLimitBackend()
+else:
+    rate_limit_backend = FileRateLimitBackend(os.path.join(LOGIN_LOG_DIR, 'rate_limits'))
+
+# Failed attempts per username, all attempts per client IP
+username_limiter = SlidingWindowLimiter(
+    rate_limit_backend, MAX_LOGIN_ATTEMPTS,
+    int(os.getenv('LOGIN_ATTEMPT_WINDOW', 900)), prefix='user:'
+)
+ip_limiter = SlidingWindowLimiter(
+    rate_limit_backend, int(os.getenv('LOGIN_IP_MAX_ATTEMPTS', 30)),
+    int(os.getenv('LOGIN_IP_WINDOW', 300)), prefix='ip:'
+)
+
+# Verified JWT payloads and revoked tokens (see require_auth)
+token_cache = TokenCache(
+    maxsize=int(os.getenv('TOKEN_CACHE_SIZE', 4096)),
+    ttl=int(os.getenv('TOKEN_CACHE_TTL', 300))
+)
+token_revocations = RevocationList(
+    db.revoked_tokens if db is not None else None,
+    path=os.path.join(LOGIN_LOG_DIR, 'revoked_tokens.json')
+)
+
 # ==================== UTILITY FUNCTIONS ====================
 
+# Set once the X-Forwarded-For-without-trusted-proxy error has been logged
+_untrusted_proxy_warned = False
+
 def get_client_ip():
-    """Get client IP address from request"""
-    return request.headers.get('X-Forwarded-For', 
-           request.headers.get('X-Real-IP', 
-           request.remote_addr or 'unknown')).split(',')[0].strip()
+    """
+    Get client IP address from request. X-Forwarded-For is only honoured
+    through ProxyFix for TRUSTED_PROXY_COUNT hops, so clients cannot pick
+    their own address (and dodge the IP login limiter) with a header.
+    """
+    global _untrusted_proxy_warned
+    if not TRUSTED_PROXY_COUNT and not _untrusted_proxy_warned and request.headers.get('X-Forwarded-For'):
+        _untrusted_proxy_warned = True
+        logger.error("❌ X-Forwarded-For received but TRUSTED_PROXY_COUNT=0: every client behind the "
+                     "proxy shares its IP for login throttling and login logs. Set TRUSTED_PROXY_COUNT.")
+    return request.remote_addr or 'unknown'
 
 def parse_user_agent(user_agent_string):
-    """Parse user agent to extract device info"""
-    if not user_agent_string:
-        return {'device_type': 'unknown', 'browser': 'unknown', 'os': 'unknown'}
-    
-    ua = user_agent_string.lower()
-    
-    # Detect device type
-    if 'mobile' in ua or 'android' in ua or 'iphone' in ua:
-        device_type = 'mobile'
-    elif 'tablet' in ua or 'ipad' in ua:
-        device_type = 'tablet'
-    else:
-        device_type = 'desktop'
-    
-    # Detect browser
-    if 'chrome' in ua and 'edge' not in ua:
-        browser = 'Chrome'
-    elif 'firefox' in ua:
-        browser = 'Firefox'
-    elif 'safari' in ua and 'chrome' not in ua:
-        browser = 'Safari'
-    elif 'edge' in ua:
-        browser = 'Edge'
-    else:
-        browser = 'Unknown'
-    
-    # Detect OS
-    if 'windows' in ua:
-        os_name = 'Windows'
-    elif 'mac' in ua:
-        os_name = 'macOS'
-    elif 'linux' in ua:
-        os_name = 'Linux'
-    elif 'android' in ua:
-        os_name = 'Android'
-    elif 'ios' in ua:
-        os_name = 'iOS'
-    else:
-        os_name = 'Unknown'
-    
-    return {
-        'device_type': device_type,
-        'browser': browser,
-        'os': os_name
-    }
+    """Parse user agent to extract device info (memoized, see user_agent.py)"""
+    return classify_user_agent(user_agent_string)
 
 def require_auth(f):
     """Authentication decorator"""
@@ -222,9 +442,9 @@ def require_auth(f):
             return jsonify({'error': 'No token provided'}), 401
         
         try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            payload = verify_token(token)
+            if payload is None:
+                return jsonify({'error': 'Token revoked'}), 401
             # Pass current_user as a parameter to the decorated function
             return f(payload, *args, **kwargs)
         except jwt.ExpiredSignatureError:
@@ -233,6 +453,30 @@ def require_auth(f):
             return jsonify({'error': 'Invalid token'}), 401
     return decorated
 
+def verify_token(token):
+    """Return the payload of a bearer token, None if revoked; raises jwt errors."""
+    if token.startswith('Bearer '):
+        token = token[7:]
+    key = token_key(token)
+    if token_revocations.is_revoked(key):
+        return None
+    # Fast path: token already verified and not yet expired
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        token_cache.put(key, payload)
+    return payload
+
+def optional_current_user():
+    """Payload of the request's bearer token, or None for anonymous callers."""
+    token = request.headers.get('Authorization')
+    if not token:
+        return None
+    try:
+        return verify_token(token)
+    except jwt.InvalidTokenError:
+        return None
+
 # Alias for consistency
 token_required = require_auth
 
@@ -249,20 +493,18 @@ def login():
         if not username or not password:
             return jsonify({'error': 'Username and password required'}), 400
         
-        # Get user from database (for now, mock user data)
-        # In production, replace this with actual database query
-        mock_users = {
-            'admin': {'password': 'admin123', 'role': 'CEO', 'id': '1'},
-            'john.doe': {'password': 'password123', 'role': 'staff', 'id': '2'},
-            'jane.smith': {'password': 'password456', 'role': 'staff', 'id': '3'},
-            'bob.wilson': {'password': 'password789', 'role': 'staff', 'id': '4'},
-            'zeo1': {'password': 'zeo123', 'role': 'zeo', 'id': '5'},
-            'school1': {'password': 'school123', 'role': 'admin', 'id': '6'},
-            'staff1': {'password': 'staff123', 'role': 'staff', 'id': '7'}
-        }
+        # Throttle before any hashing or logging work. Every attempt counts
+        # against the username; a successful login clears it below.
+        client_ip = get_client_ip()
+        retry_after = ip_limiter.acquire(client_ip) or username_limiter.acquire(username)
+        if retry_after:
+            response = jsonify({'error': 'Too many login attempts. Please try again later.',
+                                'retryAfter': retry_after})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
         
-        user = mock_users.get(username)
-        if not user or user['password'] != password:
+        user = user_store.authenticate(username, password)
+        if not user:
             # Log failed login
             log_login_attempt(username, False, 'Invalid credentials')
             return jsonify({'error': 'Invalid credentials'}), 401
@@ -274,9 +516,17 @@ def login():
             'role': user['role'],
             'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
         }
+        # Transfer scope: the ZEO's zone, a school admin's school, a staff member's own record
+        if user.get('zone'):
+            payload['zone'] = user['zone']
+        if user.get('school'):
+            payload['school'] = user['school']
+        if user.get('employee_id'):
+            payload['employeeId'] = user['employee_id']
         token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
         
         # Log successful login
+        username_limiter.reset(username)
         log_login_attempt(username, True, 'Login successful')
         
         return jsonify({
@@ -291,6 +541,18 @@ def login():
         logger.error(f"Login error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/auth/logout', methods=['POST'])
+@require_auth
+def logout(current_user):
+    """Revoke the caller's token"""
+    token = request.headers.get('Authorization', '')
+    if token.startswith('Bearer '):
+        token = token[7:]
+    key = token_key(token)
+    token_cache.discard(key)
+    token_revocations.revoke(key, current_user.get('exp') or time.time() + 86400)
+    return jsonify({'message': 'Logged out'}), 200
+
 def log_login_attempt(username, success, note=''):
     """Log login attempt to database/file"""
     try:
@@ -310,36 +572,9 @@ def log_login_attempt(username, success, note=''):
             'note': note
         }
         
-        # Save to MongoDB if available, otherwise save to file
-        saved_to_db = False
-        if db is not None:
-            try:
-                db.login_logs.insert_one(log_entry)
-                saved_to_db = True
-            except Exception as e:
-                logger.warning(f"⚠️ MongoDB write failed: {e}. Falling back to file.")
-                saved_to_db = False
+        # Queue for background write (MongoDB if available, otherwise file)
+        audit_writer.submit(log_entry)
         
-        if not saved_to_db:
-            # Fallback to file storage
-            logs_file = 'login_logs.json'
-            logs = []
-            if os.path.exists(logs_file):
-                try:
-                    with open(logs_file, 'r') as f:
-                        logs = json.load(f)
-                except:
-                    logs = []
-            
-            logs.append(log_entry)
-            
-            # Keep only last 1000 entries
-            if len(logs) > 1000:
-                logs = logs[-1000:]
-            
-            with open(logs_file, 'w') as f:
-                json.dump(logs, f, indent=2)
-                
         logger.info(f"Login attempt logged: {username} - {success}")
         
     except Exception as e:
@@ -350,63 +585,97 @@ def log_login_attempt(username, success, note=''):
 @app.route('/api/login-logs/logs')
 @require_auth
 def get_login_logs(current_user):
-    """Get login logs with filtering"""
+    """
+    Get login logs with filtering.
+
+    Query params: page, limit, username, match (prefix|exact|contains),
+    cursor (nextCursor from a previous page; takes precedence over page).
+    """
     try:
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 50))
+        page = max(int(request.args.get('page', 1)), 1)
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
         username = request.args.get('username', '')
+        match = request.args.get('match', 'prefix')
+        if match not in MATCH_MODES:
+            return jsonify({'error': f"match must be one of {', '.join(MATCH_MODES)}"}), 400
+        cursor = request.args.get('cursor')
         
-        use_db = False
-        if db is not None:
+        result = None
+        if login_log_query is not None and usable(db.login_logs):
             try:
-                # Query from MongoDB
-                query = {}
-                if username:
-                    query['username'] = {'$regex': username, '$options': 'i'}
-                
-                total = db.login_logs.count_documents(query)
-                logs = list(db.login_logs.find(query)
-                           .sort('timestamp', -1)
-                           .skip((page - 1) * limit)
-                           .limit(limit))
-                
-                # Convert ObjectId to string for JSON serialization
-                for log in logs:
-                    log['_id'] = str(log['_id'])
-                use_db = True
+                result = login_log_query.find(username, match, limit=limit, page=page, cursor=cursor)
             except Exception as e:
                 logger.warning(f"⚠️ MongoDB read failed: {e}. Falling back to file.")
-                use_db = False
+                result = None
         
-        if not use_db:
-            # Fallback to file storage
-            logs_file = 'login_logs.json'
-            if os.path.exists(logs_file):
-                with open(logs_file, 'r') as f:
-                    all_logs = json.load(f)
-            else:
-                all_logs = []
-            
-            # Filter logs
-            if username:
-                all_logs = [log for log in all_logs if username.lower() in log.get('username', '').lower()]
-            
-            total = len(all_logs)
-            start_idx = (page - 1) * limit
-            end_idx = start_idx + limit
-            logs = all_logs[start_idx:end_idx]
+        if result is None:
+            # Fallback to the in-memory index over the log files
+            result = login_log_view.query(username, match, limit=limit, page=page, cursor=cursor)
         
+        total = result['total']
         return jsonify({
-            'logs': logs,
+            'logs': result['logs'],
             'total': total,
+            'totalIsEstimate': result['totalIsEstimate'],
+            'nextCursor': result['nextCursor'],
             'page': page,
             'totalPages': (total + limit - 1) // limit
         })
         
+    except ValueError:
+        return jsonify({'error': 'page and limit must be integers'}), 400
     except Exception as e:
         logger.error(f"Error fetching login logs: {e}")
         return jsonify({'error': 'Failed to fetch logs'}), 500
 
+LOGIN_LOG_EXPORT_ROLES = {'ceo', 'admin', 'auditor'}
+
+@app.route('/api/login-logs/export')
+@require_auth
+def export_login_logs(current_user):
+    """
+    Stream login logs as CSV or NDJSON, oldest first (CEO, admins and auditors).
+
+    Query params: format (csv|ndjson), username, match (prefix|exact|contains),
+    gzip (true to compress the stream with Content-Encoding: gzip).
+    """
+    if (current_user.get('role') or '').lower() not in LOGIN_LOG_EXPORT_ROLES:
+        return jsonify({'error': 'Not allowed to export login logs'}), 403
+    
+    fmt = request.args.get('format', 'csv').lower()
+    username = request.args.get('username', '')
+    match = request.args.get('match', 'prefix')
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    if match not in MATCH_MODES:
+        return jsonify({'error': f"match must be one of {', '.join(MATCH_MODES)}"}), 400
+    
+    if db is not None and usable(db.login_logs):
+        try:
+            cursor = iter_login_logs(db.login_logs, username, match)
+            # Fetch the first batch now so connection errors fall back to file
+            first = next(cursor, None)
+            rows = itertools.chain([first], cursor) if first is not None else iter(())
+        except Exception as e:
+            logger.warning(f"⚠️ MongoDB export failed: {e}. Falling back to file.")
+            rows = login_log_store.iter_matching(username, match)
+    else:
+        rows = login_log_store.iter_matching(username, match)
+    
+    filename = f"login_logs_{datetime.datetime.now(datetime.timezone.utc):%Y%m%d_%H%M%S}.{fmt}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    
+    return Response(
+        stream_with_context(export_chunks(rows, fmt, compress)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers=headers
+    )
+
 # ==================== CHATBOT ROUTES ====================
 
 @app.route('/api/chatbot/chat', methods=['POST'])
@@ -420,38 +689,19 @@ def chatbot_chat():
             return jsonify({'error': 'No message provided'}), 400
         
         # Call AI-powered chatbot response generator
-        response = generate_chatbot_response_with_ai(message)
+        role, session, guest_session_id = chatbot_caller(data)
+        response = generate_chatbot_response_with_ai(message, role, session)
         
+        if guest_session_id:
+            return jsonify({'response': response, 'sessionId': guest_session_id})
         return jsonify({'response': response})
         
     except Exception as e:
         logger.error(f"Chatbot error: {e}")
         return jsonify({'error': 'Chatbot service unavailable'}), 500
 
-def generate_chatbot_response_with_ai(message):
-    """
-    Generate chatbot response using Groq's LLM API.
-    Falls back to rule-based responses if API fails or key is missing.
-    """
-    groq_api_key = os.getenv('GROQ_API_KEY')
-    
-    # DEBUG: Log the key status
-    logger.info(f"🔑 GROQ_API_KEY loaded: {groq_api_key[:10] if groq_api_key else 'NONE'}...{groq_api_key[-4:] if groq_api_key and len(groq_api_key) > 14 else ''}")
-    
-    # If no API key is set, fall back to rule-based responses
-    if not groq_api_key or groq_api_key == 'your_groq_api_key_here':
-        logger.warning("GROQ_API_KEY not set, using fallback")
-        return generate_chatbot_response_fallback(message)
-    
-    try:
-        # Import Groq client (install with: pip install groq)
-        from groq import Groq
-        
-        logger.info("📡 Calling Groq API...")
-        client = Groq(api_key=groq_api_key)
-        
-        # System prompt that defines the chatbot's role and knowledge
-        system_prompt = """You are a friendly HR assistant for an Employee Management System.
+# System prompt that defines the chatbot's role and knowledge
+CHATBOT_SYSTEM_PROMPT = """You are a friendly HR assistant for an Employee Management System.
 
 Talk like a helpful colleague. Use casual but professional language.
 
@@ -469,87 +719,237 @@ If you don't know something, suggest they check the dashboard or contact HR.
 
 Be warm and helpful! 😊"""
 
-        # Call Groq API with streaming disabled for simplicity
-        # UPDATED: Use llama-3.3-70b-versatile (fast, supported, free tier compatible)
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": message}
-            ],
-            model="llama-3.3-70b-versatile",  # ✅ Updated model (was mixtral-8x7b-32768)
-            temperature=0.7,
-            max_tokens=512,
-            top_p=1,
-        )
-        
-        # Extract the response
-        ai_response = chat_completion.choices[0].message.content.strip()
-        
-        logger.info(f"✅ Groq returned: {ai_response[:100]}...")
-        
-        # If response is empty, use fallback
-        if not ai_response:
-            return generate_chatbot_response_fallback(message)
-        
-        return ai_response
-        
-    except ImportError:
-        logger.error("Groq SDK not installed. Run: pip install groq")
-        return generate_chatbot_response_fallback(message)
-    except Exception as e:
-        logger.error(f"Groq API error: {e}")
-        return generate_chatbot_response_fallback(message)
+# One pooled LLM client per worker (LLM_BACKEND=mock answers locally for tests)
+llm = LLMClientManager(
+    backend=os.getenv('LLM_BACKEND', 'groq'),
+    api_key=groq_key,
+    model=os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile'),
+    timeout=float(os.getenv('LLM_TIMEOUT', 20)),
+    connect_timeout=float(os.getenv('LLM_CONNECT_TIMEOUT', 5)),
+    max_retries=int(os.getenv('LLM_MAX_RETRIES', 2)),
+    max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', 10)),
+    base_url=os.getenv('GROQ_BASE_URL') or None
+)
+
+# Repeated questions are answered from here instead of calling the LLM
+answer_cache = AnswerCache(
+    maxsize=int(os.getenv('ANSWER_CACHE_SIZE', 256)),
+    ttl=int(os.getenv('ANSWER_CACHE_TTL', 600)),
+    threshold=float(os.getenv('ANSWER_CACHE_THRESHOLD', 0.85))
+)
+
+# Live counts for the system prompt and rule-based replies, refreshed in
+# the background at most every CHATBOT_DATA_TTL seconds
+data_context = DataContext(
+    store_sources(employee_directory, transfer_store, login_rollups, staffing_coverage,
+                  database_status=lambda: database_status()),  # defined further down
+    ttl=int(os.getenv('CHATBOT_DATA_TTL', 30))
+)
+
+# Questions with a rule-based or FAQ answer are answered without the LLM
+# (LOCAL_INTENT_THRESHOLD above 1 sends everything to the LLM)
+intent_classifier = IntentClassifier(
+    *chatbot_training_set(CHATBOT_ROUTER, load_faqs(os.getenv('CHATBOT_FAQ_FILE')) if os.getenv('CHATBOT_FAQ_FILE') else None),
+    threshold=float(os.getenv('LOCAL_INTENT_THRESHOLD', 0.75))
+)
+
+def local_chatbot_answer(message):
+    """Answer for a confidently classified message, or None to escalate to the LLM."""
+    intent = intent_classifier.route(message)
+    if intent is None:
+        return None
+    if intent in intent_classifier.answers:
+        return intent_classifier.answers[intent]
+    return data_context.render(FALLBACK_RESPONSES[intent]) if intent in FALLBACK_RESPONSES else None
+
+# Recent turns per user (or guest session id), shared by all workers.
+# Sessions are stored in MongoDB (or files) rather than a per-worker LRU so
+# a follow-up reaching another worker keeps its context; guest sessions,
+# which anyone can start, are bounded by the limiters below instead.
+conversations = ConversationStore(
+    db.chat_sessions if db is not None else None,
+    directory=os.path.join(LOGIN_LOG_DIR, 'chat_sessions'),
+    ttl=int(os.getenv('CHAT_SESSION_TTL', 1800)),
+    history_tokens=int(os.getenv('CHAT_HISTORY_TOKENS', 1500)),
+    summary_tokens=int(os.getenv('CHAT_SUMMARY_TOKENS', 200))
+)
+
+# New guest sessions per client IP, and from all clients together, per window
+GUEST_SESSION_WINDOW = int(os.getenv('GUEST_SESSION_WINDOW', 3600))
+guest_ip_limiter = SlidingWindowLimiter(
+    rate_limit_backend, int(os.getenv('GUEST_SESSIONS_PER_IP', 20)),
+    GUEST_SESSION_WINDOW, prefix='guest-ip:'
+)
+guest_total_limiter = SlidingWindowLimiter(
+    rate_limit_backend, int(os.getenv('GUEST_SESSIONS_MAX', 2000)),
+    GUEST_SESSION_WINDOW, prefix='guest-all:'
+)
+
+def chatbot_caller(data, issue=True):
+    """
+    Return (role, session key, guest session id) for a chatbot request: the
+    role partitions the answer cache ('guest' if anonymous) and the key
+    selects the conversation history. Signed-in callers are keyed by user;
+    guests by the body's sessionId if the server issued it, else by a new
+    id (None when `issue` is False) that the client sends back next time.
+    Once the client's IP or all guests together have started their quota
+    of sessions, a guest without one is answered without history (no key),
+    so nothing is stored for them.
+    """
+    user = optional_current_user()
+    if user:
+        return user.get('role') or 'guest', f"user:{user.get('userId') or user.get('username')}", None
+    session_id = data.get('sessionId')
+    if not check_guest_session_id(app.config['SECRET_KEY'], session_id):
+        if not issue:
+            return 'guest', None, None
+        if guest_ip_limiter.acquire(get_client_ip()) or guest_total_limiter.acquire('all'):
+            return 'guest', None, None
+        session_id = new_guest_session_id(app.config['SECRET_KEY'])
+    return 'guest', f"guest:{session_id}", session_id
+
+CHATBOT_COMPLETION_PARAMS = {'temperature': 0.7, 'max_tokens': 512, 'top_p': 1}
+
+def chatbot_messages(message, history=()):
+    return [
+        {"role": "system", "content": CHATBOT_SYSTEM_PROMPT + "\n\n" + data_context.prompt_block()},
+        *history,
+        {"role": "user", "content": message}
+    ]
+
+def generate_chatbot_response_with_ai(message, role='guest', session=None):
+    """
+    Generate chatbot response using Groq's LLM API, with the session's
+    recent history. Messages the local intent classifier recognizes get
+    their rule-based answer, and opening questions are served from the
+    answer cache of the caller's role while the live figures in the
+    prompt are unchanged. Falls back to rule-based responses
+    if API fails or key is missing.
+    """
+    response = None
+    history = conversations.history(session)
+    # If no API key is set, fall back to rule-based responses
+    if llm.configured:
+        response = local_chatbot_answer(message)
+    if llm.configured and not response:
+        # Follow-ups depend on the conversation, so only opening questions use the cache
+        # Taken before the prompt, so an answer is never filed under newer figures
+        version = data_context.version()
+        cached = answer_cache.get(message, role, version) if not history else None
+        if cached is not None:
+            response = cached['answer']
+        else:
+            try:
+                response = llm.complete(chatbot_messages(message, history), **CHATBOT_COMPLETION_PARAMS)
+                if response and not history:
+                    answer_cache.put(message, response, role, version)
+            except LLMError as e:
+                logger.error(f"LLM API error: {e}")
+    
+    # If response is empty, use fallback
+    if not response:
+        response = generate_chatbot_response_fallback(message)
+    conversations.append(session, message, response)
+    return response
+
+# Rule-based replies by CHATBOT_ROUTER intent; {placeholders} come from data_context
+FALLBACK_RESPONSES = {
+    'employee_search': "👥 Use the Employee Management section in the dashboard to search employees by name, school, zone, or department.",
+    'transfer': "🔄 Access Transfer Management from the dashboard. Current: {transfers_pending} pending, {transfers_approved} approved.",
+    'leave': "📝 Leave management is available in the dashboard. Types: Sick Leave (12 days/year), Casual Leave (8 days/year), Maternity (180 days).",
+    'navigation': "🧭 System Navigation Help: Use the dashboard to access Employee Management, Analytics, Transfer Management, and Settings. Need help with a specific feature?",
+    'reports': "📊 Reports & Analytics: View employee stats, transfer analytics, school distribution, and login analytics. Export data in CSV format.",
+    'security': "🔐 Security & Access: Role-based access (CEO, Admin, ZEO, Staff), IP tracking, secure JWT authentication, and login attempt monitoring.",
+    'data': "💾 Data Management: MongoDB with automated daily backups. CSV export available for all data. Status: {system_database}.",
+    'employee_id': "🆔 Employee ID Lookup: Provide the Employee ID (format: EMP001, EMP002, etc.) to find employee information, school assignment, transfer history, and zone/district details.",
+    'status': "✅ System Status: Application running, {system_database}, chatbot active, security features enabled.",
+}
+DEFAULT_FALLBACK_RESPONSE = "I can help with employee records, transfers, leave policies, and system navigation. What would you like to know?"
 
 def generate_chatbot_response_fallback(message):
     """
     Fallback to rule-based responses when AI is unavailable.
-    This is your existing function, renamed.
+    Intents are matched by CHATBOT_ROUTER (see intent_router.py).
     """
-    message_lower = message.lower()
-    
-    # Employee records and search
-    if 'employee' in message_lower and ('search' in message_lower or 'find' in message_lower):
-        return "👥 Use the Employee Management section in the dashboard to search employees by name, school, zone, or department."
-    
-    # Transfer management
-    if 'transfer' in message_lower:
-        return "🔄 Access Transfer Management from the dashboard. Current: 12 pending, 156 approved this month."
-    
-    # Leave management
-    if 'leave' in message_lower or 'holiday' in message_lower:
-        return "📝 Leave management is available in the dashboard. Types: Sick Leave (12 days/year), Casual Leave (8 days/year), Maternity (180 days)."
-    
-    # System navigation and features
-    if 'dashboard' in message_lower or 'feature' in message_lower or 'navigate' in message_lower or 'how to' in message_lower:
-        return "🧭 System Navigation Help: Use the dashboard to access Employee Management, Analytics, Transfer Management, and Settings. Need help with a specific feature?"
-    
-    # Reports and analytics
-    if 'report' in message_lower or 'analytics' in message_lower or 'statistics' in message_lower:
-        return "📊 Reports & Analytics: View employee stats, transfer analytics, school distribution, and login analytics. Export data in CSV format."
-    
-    # Login and security
-    if 'login' in message_lower or 'security' in message_lower or 'access' in message_lower:
-        return "🔐 Security & Access: Role-based access (CEO, Admin, ZEO, Staff), IP tracking, secure JWT authentication, and login attempt monitoring."
-    
-    # Data management
-    if 'data' in message_lower or 'database' in message_lower or 'backup' in message_lower:
-        return "💾 Data Management: MongoDB with automated daily backups. CSV export available for all data. Status: Database connected and healthy."
-    
-    # Employee ID lookup
-    if 'employee id' in message_lower or 'emp id' in message_lower:
-        return "🆔 Employee ID Lookup: Provide the Employee ID (format: EMP001, EMP002, etc.) to find employee information, school assignment, transfer history, and zone/district details."
+    intent = CHATBOT_ROUTER.route(message)
+    return data_context.render(FALLBACK_RESPONSES.get(intent, DEFAULT_FALLBACK_RESPONSE))
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event carrying a JSON payload."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+def stream_chatbot_response(message, role='guest', session=None, guest_session_id=None):
+    """
+    Yield SSE events for one chatbot reply: `token` events with text deltas,
+    then a `done` event with the full response (and the guest's sessionId).
+    Local and cached answers are sent as a single token.
+
+    If the LLM is not configured or fails before its first token, the
+    rule-based fallback is sent as a single token instead. A failure after
+    some text has streamed ends the reply with `truncated: true`.
+    """
+    # Comment line so proxies and the browser see the response start at once
+    yield ': stream\n\n'
+    parts = []
+    source = 'ai'
+    truncated = False
+    history = conversations.history(session)
+    local = local_chatbot_answer(message) if llm.configured else None
+    version = data_context.version()
+    cached = answer_cache.get(message, role, version) if llm.configured and not history and not local else None
+    if local:
+        source = 'local'
+        parts = [local]
+        yield sse_event({'token': local}, 'token')
+    elif cached is not None:
+        source = 'cache'
+        parts = [cached['answer']]
+        yield sse_event({'token': parts[0]}, 'token')
+    elif llm.configured:
+        try:
+            for delta in llm.stream(chatbot_messages(message, history), **CHATBOT_COMPLETION_PARAMS):
+                parts.append(delta)
+                yield sse_event({'token': delta}, 'token')
+        except LLMError as e:
+            logger.error(f"LLM streaming error: {e}")
+            truncated = bool(parts)
+        if parts and not truncated and not history:
+            answer_cache.put(message, ''.join(parts).strip(), role, version)
+    if not ''.join(parts).strip():
+        source = 'fallback'
+        parts = [generate_chatbot_response_fallback(message)]
+        yield sse_event({'token': parts[0]}, 'token')
+    response = ''.join(parts).strip()
+    conversations.append(session, message, response)
+    done = {'response': response, 'source': source, 'truncated': truncated}
+    if guest_session_id:
+        done['sessionId'] = guest_session_id
+    yield sse_event(done, 'done')
+
+@app.route('/api/chatbot/chat/stream', methods=['POST'])
+def chatbot_chat_stream():
+    """Streaming variant of /api/chatbot/chat (text/event-stream)."""
+    data = request.get_json(silent=True) or {}
+    message = (data.get('message') or '').strip()
     
-    # System status
-    if 'status' in message_lower or 'health' in message_lower:
-        return "✅ System Status: Application running smoothly, database connected, chatbot active, security features enabled."
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
     
-    # Default response
-    return f"I can help with employee records, transfers, leave policies, and system navigation. What would you like to know?"
+    role, session, guest_session_id = chatbot_caller(data)
+    return Response(
+        stream_with_context(stream_chatbot_response(message, role, session, guest_session_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/chatbot/reset', methods=['POST'])
 def chatbot_reset():
     """Reset chatbot conversation"""
-    return jsonify({'status': 'success', 'message': 'Conversation reset'})
+    _, session, _ = chatbot_caller(request.get_json(silent=True) or {}, issue=False)
+    cleared = conversations.reset(session) if session else False
+    return jsonify({'status': 'success', 'message': 'Conversation reset', 'cleared': cleared})
 
 # ==================== FRONTEND ROUTES ====================
 
@@ -635,13 +1035,40 @@ def serve_uploads(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
 
+def database_status():
+    """Live storage mode, reported by /health and /api/system/settings."""
+    return 'connected' if mongo is not None and mongo.connected else 'file_fallback'
+
+
 @app.route('/health')
 def health_check():
-    """Simple readiness probe."""
+    """Simple readiness probe (public, so no internals; see /api/system/health)."""
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
-        'database': 'connected' if db is not None else 'file_fallback'
+        'database': database_status()
+    })
+
+HEALTH_DETAIL_ROLES = {'ceo', 'admin'}
+
+@app.route('/api/system/health', methods=['GET'])
+@token_required
+def health_details(current_user):
+    """Connection, cache, LLM and chatbot statistics for operators."""
+    if (current_user.get('role') or '').lower() not in HEALTH_DETAIL_ROLES:
+        return jsonify({'error': 'Not allowed to view system health'}), 403
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'database': database_status(),
+        'mongo': mongo.info() if mongo is not None else None,
+        'llm': llm.info(),
+        'answer_cache': answer_cache.info(),
+        'intent_classifier': intent_classifier.info(llm.info()['avg_ms']),
+        'data_context': data_context.info(),
+        'chat_sessions': conversations.info(),
+        'response_cache': response_cache.info(),
+        'audit_writer': audit_writer.info()
     })
 
 
@@ -659,73 +1086,288 @@ def internal_error(error):
 
 @app.route('/api/employees', methods=['GET'])
 @token_required
+@response_cache.cached('employees', ttl=60)
 def get_employees(current_user):
-    """Get all employees with filtering"""
+    """
+    Get employees with filtering and server-side pagination.
+
+    Query params: search (substring of name/email/ID), school, zone,
+    department, status, page, limit.
+    """
     try:
-        # Mock employee data - replace with database query in production
-        employees = [
-            {'id': '1', 'name': 'John Doe', 'email': 'john.doe@school.edu', 'position': 'Teacher', 'department': 'Mathematics', 'school': 'Central High School', 'zone': 'Zone A', 'status': 'Active', 'joining_date': '2020-08-15', 'phone': '+1-555-0101'},
-            {'id': '2', 'name': 'Jane Smith', 'email': 'jane.smith@school.edu', 'position': 'Principal', 'department': 'Administration', 'school': 'West Elementary', 'zone': 'Zone B', 'status': 'Active', 'joining_date': '2018-06-20', 'phone': '+1-555-0102'},
-            {'id': '3', 'name': 'Bob Wilson', 'email': 'bob.wilson@school.edu', 'position': 'Teacher', 'department': 'Science', 'school': 'East Middle School', 'zone': 'Zone C', 'status': 'Active', 'joining_date': '2019-09-10', 'phone': '+1-555-0103'}
-        ]
+        page = max(int(request.args.get('page', 1)), 1)
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+        filters = {field: request.args.get(field, '') for field in ('school', 'zone', 'department', 'status')}
         
-        # Apply filters if provided
-        search = request.args.get('search', '').lower()
-        if search:
-            employees = [emp for emp in employees if search in emp['name'].lower() or search in emp['email'].lower()]
+        employees, total = employee_directory.search(
+            request.args.get('search', ''), filters, page=page, limit=limit
+        )
         
         return jsonify({
             'employees': employees,
-            'total': len(employees),
-            'page': 1,
-            'limit': 50
+            'total': total,
+            'page': page,
+            'limit': limit,
+            'totalPages': (total + limit - 1) // limit
         })
+    except ValueError:
+        return jsonify({'error': 'page and limit must be integers'}), 400
     except Exception as e:
         logger.error(f"Error fetching employees: {e}")
         return jsonify({'error': str(e)}), 500
 
+EMPLOYEE_EDITOR_ROLES = {'ceo', 'admin'}
+
+@app.route('/api/employees', methods=['POST'])
+@app.route('/api/employees/<employee_id>', methods=['PUT'])
+@token_required
+def save_employee(current_user, employee_id=None):
+    """Create an employee, or update one by id (CEO and school admins)."""
+    if (current_user.get('role') or '').lower() not in EMPLOYEE_EDITOR_ROLES:
+        return jsonify({'error': 'Not allowed to edit employees'}), 403
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        if employee_id is not None:
+            existing = employee_directory.get(employee_id)
+            if existing is None:
+                return jsonify({'error': 'Employee not found'}), 404
+            data = {**existing, **data, 'id': employee_id}
+        elif not data.get('id') or not data.get('name'):
+            return jsonify({'error': 'id and name are required'}), 400
+        elif employee_directory.get(str(data['id'])) is not None:
+            return jsonify({'error': 'Employee already exists'}), 409
+        
+        employee = employee_directory.upsert(data)
+        return jsonify({'employee': employee}), 200 if employee_id else 201
+    except Exception as e:
+        logger.error(f"Error saving employee: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/employees/suggest', methods=['GET'])
+@token_required
+def suggest_employees(current_user):
+    """
+    As-you-type employee suggestions for the search box.
+
+    Query params: q (name, email or ID prefix; small typos are tolerated),
+    limit (max 25).
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 25)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    try:
+        started = time.perf_counter()
+        matches = employee_suggester.suggest(request.args.get('q', ''), limit)
+        suggestions = [
+            {**record, 'distance': distance, 'matched': key}
+            for record, distance, key in matches
+        ]
+        return jsonify({
+            'suggestions': suggestions,
+            'took_ms': round((time.perf_counter() - started) * 1000, 3)
+        })
+    except Exception as e:
+        logger.error(f"Error suggesting employees: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Staffing figures are for leadership; ZEOs only see their own zone
+STAFFING_ROLES = {'ceo', 'admin', 'zeo'}
+
+def staffing_zone(current_user):
+    """
+    Return (zone to restrict to or None, error response or None) for a
+    staffing request: the `zone` query parameter, or the ZEO's own zone.
+    """
+    role = (current_user.get('role') or '').lower()
+    if role not in STAFFING_ROLES:
+        return None, (jsonify({'error': 'Not allowed to view staffing'}), 403)
+    zone = request.args.get('zone') or None
+    if role == 'zeo':
+        if not current_user.get('zone'):
+            return None, (jsonify({'error': 'No zone assigned to this account'}), 403)
+        if zone and zone != current_user['zone']:
+            return None, (jsonify({'error': 'Not allowed to view other zones'}), 403)
+        zone = current_user['zone']
+    return zone, None
+
+@app.route('/api/staffing/coverage', methods=['GET'])
+@token_required
+def get_staffing_coverage(current_user):
+    """Staffing coverage aggregated by zone (default), district or school."""
+    zone, error = staffing_zone(current_user)
+    if error:
+        return error
+    level = request.args.get('level', 'zone')
+    if level not in ('zone', 'district', 'school'):
+        return jsonify({'error': 'level must be zone, district or school'}), 400
+    
+    try:
+        return jsonify({'level': level, 'groups': staffing_coverage.aggregate(level, zone)})
+    except Exception as e:
+        logger.error(f"Error fetching staffing coverage: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/staffing/hotspots', methods=['GET'])
+@token_required
+def get_staffing_hotspots(current_user):
+    """School/department cells with the most unfilled sanctioned posts."""
+    zone, error = staffing_zone(current_user)
+    if error:
+        return error
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    try:
+        return jsonify({'hotspots': staffing_coverage.hotspots(limit, zone)})
+    except Exception as e:
+        logger.error(f"Error fetching staffing hotspots: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/staffing/sanctioned', methods=['PUT'])
+@token_required
+def set_sanctioned_posts(current_user):
+    """Set the approved post count for a school department (CEO only)."""
+    if (current_user.get('role') or '').lower() != 'ceo':
+        return jsonify({'error': 'Not allowed to change sanctioned posts'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        posts = int(data.get('posts'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'posts must be an integer'}), 400
+    if not data.get('school') or not data.get('department') or posts < 0:
+        return jsonify({'error': 'school, department and a non-negative posts count are required'}), 400
+    
+    try:
+        row = staffing_coverage.set_sanctioned(data['school'], data['department'], posts)
+        return jsonify({'sanctioned': row})
+    except Exception as e:
+        logger.error(f"Error setting sanctioned posts: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/analytics/summary', methods=['GET'])
 @token_required
+@response_cache.cached('employees', 'transfers', ttl=10)
 def get_analytics_summary(current_user):
     """Get analytics summary data"""
     try:
-        # Mock analytics data - replace with real calculations in production
         summary = {
-            'employees': {'total': 1247, 'active': 1198, 'inactive': 49, 'new_this_month': 23},
-            'transfers': {'pending': 12, 'approved': 156, 'rejected': 8, 'completed': 298},
-            'schools': {'total': 89, 'zones': 15, 'districts': 5},
-            'login_stats': {'total_logins_today': 342, 'unique_users_today': 156, 'failed_attempts_today': 23}
+            'employees': employee_summary(employee_directory),
+            'transfers': {status.lower(): count for status, count in transfer_store.status_counts().items()},
+            'schools': staffing_coverage.school_counts(),
+            # Login stats come from the incrementally maintained rollups
+            'login_stats': login_rollups.summary()
         }
         return jsonify(summary)
     except Exception as e:
         logger.error(f"Error fetching analytics: {e}")
         return jsonify({'error': str(e)}), 500
 
+def transfer_scope_claims(current_user):
+    """The token claims transfer scoping reads, for keying cached transfer pages."""
+    return tuple(current_user.get(claim) for claim, _ in SCOPED_ROLES.values())
+
 @app.route('/api/transfers', methods=['GET'])
 @token_required
+@response_cache.cached('transfers', per_user=transfer_scope_claims)
 def get_transfers(current_user):
-    """Get transfer requests"""
+    """
+    Get the transfer requests the caller may see, newest first.
+
+    Query params: status, zone (destination zone), limit, cursor (the
+    nextCursor of the previous page).
+    """
     try:
-        # Mock transfer data - replace with database query in production
-        transfers = [
-            {'id': '1', 'employee_name': 'John Doe', 'employee_id': 'EMP001', 'from_school': 'Central High School', 'to_school': 'West Elementary', 'from_zone': 'Zone A', 'to_zone': 'Zone B', 'reason': 'Personal reasons', 'status': 'Pending', 'request_date': '2025-10-20', 'priority': 'Normal'},
-            {'id': '2', 'employee_name': 'Jane Smith', 'employee_id': 'EMP002', 'from_school': 'East Middle School', 'to_school': 'North High School', 'from_zone': 'Zone C', 'to_zone': 'Zone A', 'reason': 'Promotion', 'status': 'Approved', 'request_date': '2025-10-18', 'priority': 'High'}
-        ]
-        
-        status_filter = request.args.get('status', '')
-        if status_filter:
-            transfers = [t for t in transfers if t['status'].lower() == status_filter.lower()]
-        
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    try:
+        result = transfer_store.page(
+            status=request.args.get('status', ''),
+            zone=request.args.get('zone', ''),
+            limit=limit,
+            cursor=request.args.get('cursor') or None,
+            scope=scope_for(current_user)
+        )
+        result['limit'] = limit
+        return jsonify(result)
+    except TransferError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        logger.error(f"Error fetching transfers: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/transfers', methods=['POST'])
+@token_required
+def create_transfer(current_user):
+    """Create a transfer request for a directory employee into a known school."""
+    try:
+        data = request.get_json(silent=True) or {}
+        employee = employee_directory.get(str(data.get('employee_id', '')))
+        if employee is None:
+            return jsonify({'error': 'Employee not found'}), 404
+        transfer = transfer_store.create(data, current_user, employee=employee,
+                                         destinations=employee_directory.schools_by_zone())
+        return jsonify({'transfer': transfer}), 201
+    except TransferError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        logger.error(f"Error creating transfer: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/transfers/queues', methods=['GET'])
+@token_required
+def get_transfer_queues(current_user):
+    """Per-zone review queue sizes (default: Pending requests) within the caller's scope."""
+    try:
+        status = request.args.get('status', 'Pending')
+        scope = scope_for(current_user)
         return jsonify({
-            'transfers': transfers,
-            'total': len(transfers)
+            'status': status,
+            'zones': transfer_store.zone_queues(status, scope),
+            'totals': transfer_store.status_counts(scope)
         })
+    except TransferError as e:
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
-        logger.error(f"Error fetching transfers: {e}")
+        logger.error(f"Error fetching transfer queues: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/transfers/<transfer_id>', methods=['GET'])
+@token_required
+def get_transfer(current_user, transfer_id):
+    """Get one transfer request with its history, if the caller may see it."""
+    try:
+        transfer = transfer_store.get(transfer_id, scope_for(current_user))
+    except TransferError as e:
+        return jsonify({'error': str(e)}), e.status
+    if transfer is None:
+        return jsonify({'error': 'Transfer request not found'}), 404
+    return jsonify({'transfer': transfer})
+
+@app.route('/api/transfers/<transfer_id>/<action>', methods=['POST'])
+@token_required
+def update_transfer(current_user, transfer_id, action):
+    """Approve, reject or complete a transfer request."""
+    try:
+        data = request.get_json(silent=True) or {}
+        transfer = transfer_store.transition(transfer_id, action, current_user, data.get('comment', ''))
+        return jsonify({'transfer': transfer})
+    except TransferError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        logger.error(f"Error updating transfer: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/system/settings', methods=['GET'])
 @token_required
+@response_cache.cached('settings', ttl=300, vary=database_status)
 def get_system_settings(current_user):
     """Get system settings"""
     try:
@@ -734,7 +1376,7 @@ def get_system_settings(current_user):
                 'system_name': 'Employee Management System',
                 'version': '2.0.0',
                 'maintenance_mode': False,
-                'max_login_attempts': 5,
+                'max_login_attempts': MAX_LOGIN_ATTEMPTS,
                 'session_timeout': 24
             },
             'features': {
@@ -745,7 +1387,7 @@ def get_system_settings(current_user):
                 'analytics_enabled': True
             },
             'database': {
-                'status': 'connected' if db is not None else 'file_fallback',
+                'status': database_status(),
                 'backup_enabled': True,
                 'last_backup': '2025-10-23T10:30:00Z'
             }
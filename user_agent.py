@@ -0,0 +1,109 @@
+"""
+User Agent Classifier - Table-driven, memoized device/browser/OS detection
+==========================================================================
+
+parse_user_agent() in unified_app.py delegates here. Each attribute is
+decided by an ordered rule table (first match wins); every rule's keywords
+are compiled into one regex up front. Results are memoized in a bounded LRU
+keyed on the raw User-Agent string, since a deployment sees the same few
+browsers thousands of times a day.
+
+Rule order matters: mobile platforms are checked before the desktop ones
+they embed (Android UAs contain "Linux", iOS UAs contain "Mac OS X"), and
+Edge/Opera before Chrome, whose token they also carry.
+
+Bulk mode: reclassify_collection() re-derives device_type/browser/os for
+historical login_logs, classifying each distinct User-Agent only once.
+Run `python user_agent.py` to apply it to the MONGO_URI / MONGO_DB database.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+UNKNOWN = {'device_type': 'unknown', 'browser': 'unknown', 'os': 'unknown'}
+
+
+def _compile(rules):
+    return tuple((value, re.compile('|'.join(re.escape(k) for k in keywords)))
+                 for value, keywords in rules)
+
+
+DEVICE_RULES = _compile([
+    ('tablet', ('ipad', 'tablet', 'kindle', 'silk/')),
+    ('mobile', ('mobile', 'iphone', 'ipod', 'android')),
+])
+
+BROWSER_RULES = _compile([
+    ('Edge', ('edg/', 'edge/', 'edga/', 'edgios/')),
+    ('Opera', ('opr/', 'opera')),
+    ('Firefox', ('firefox', 'fxios')),
+    ('Chrome', ('chrome', 'crios', 'chromium')),
+    ('Safari', ('safari',)),
+])
+
+OS_RULES = _compile([
+    ('iOS', ('iphone', 'ipad', 'ipod')),
+    ('Android', ('android',)),
+    ('Windows', ('windows',)),
+    ('macOS', ('macintosh', 'mac os')),
+    ('Linux', ('linux', 'x11')),
+])
+
+
+def _first_match(rules, ua, default):
+    for value, pattern in rules:
+        if pattern.search(ua):
+            return value
+    return default
+
+
+@lru_cache(maxsize=1024)
+def _classify(user_agent_string):
+    ua = user_agent_string.lower()
+    return (
+        _first_match(DEVICE_RULES, ua, 'desktop'),
+        _first_match(BROWSER_RULES, ua, 'Unknown'),
+        _first_match(OS_RULES, ua, 'Unknown'),
+    )
+
+
+def classify_user_agent(user_agent_string):
+    """Return device_type/browser/os for a User-Agent string."""
+    if not user_agent_string:
+        return dict(UNKNOWN)
+    device_type, browser, os_name = _classify(user_agent_string)
+    return {'device_type': device_type, 'browser': browser, 'os': os_name}
+
+
+def cache_info():
+    """Expose LRU hit/miss statistics."""
+    return _classify.cache_info()
+
+
+def classify_many(user_agents):
+    """Classify an iterable of User-Agent strings, once per distinct value."""
+    return {ua: classify_user_agent(ua) for ua in set(user_agents)}
+
+
+def reclassify_collection(collection):
+    """
+    Re-derive device_type/browser/os on every login_logs document.
+
+    Issues one update_many per distinct User-Agent; returns the number of
+    documents modified.
+    """
+    modified = 0
+    for ua, info in classify_many(collection.distinct('user_agent')).items():
+        result = collection.update_many({'user_agent': ua}, {'$set': info})
+        modified += result.modified_count
+    return modified
+
+
+if __name__ == '__main__':
+    from pymongo import MongoClient
+
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/employee_mgmt'),
+                         serverSelectionTimeoutMS=2000)
+    count = reclassify_collection(client[os.getenv('MONGO_DB', 'employee_mgmt')].login_logs)
+    print(f"✅ Reclassified {count} login log entries")
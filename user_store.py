@@ -0,0 +1,213 @@
+"""
+User Store - Login accounts with bcrypt hashes and cached lookups
+=================================================================
+
+Replaces the inline mock_users dict in /api/auth/login.
+
+- Accounts live in the MongoDB `users` collection (unique index on
+  username) or, when MongoDB is unavailable, in data/users.json.
+- Passwords are stored as bcrypt hashes with a configurable cost
+  (BCRYPT_ROUNDS). Hashes below that cost are upgraded on the next
+  successful login; stronger hashes are kept.
+- Lookups go through a short-TTL in-process cache, including misses, so
+  repeated logins and credential-stuffing bursts don't hit the database.
+- bcrypt releases the GIL while hashing, so with threaded gunicorn workers
+  other requests keep being served while a password is checked.
+- Accounts seeded while MongoDB is down are queued with defer_write() and
+  reach MongoDB when it comes back.
+- Optional scope fields (SCOPE_FIELDS: `zone` for ZEOs, `school` for
+  school admins, `employee_id` for staff) limit what an account may see
+  and act on; seeding fills them in on existing accounts that lack them.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+import bcrypt
+
+from login_log_store import file_lock
+from mongo_connection import usable, defer_write
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BCRYPT_ROUNDS = 12
+DEFAULT_CACHE_TTL = 30  # seconds
+SCOPE_FIELDS = ('zone', 'school', 'employee_id')
+
+
+def hash_password(password, rounds=DEFAULT_BCRYPT_ROUNDS):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _hash_rounds(password_hash):
+    """Extract the cost factor from a '$2b$12$...' hash."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class UserStore:
+    """Account lookups and password checks for the login endpoint."""
+
+    def __init__(self, collection=None, path='data/users.json',
+                 bcrypt_rounds=DEFAULT_BCRYPT_ROUNDS, cache_ttl=DEFAULT_CACHE_TTL):
+        self.collection = collection
+        self.path = path
+        self.bcrypt_rounds = bcrypt_rounds
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        # Verified against for unknown usernames so response time doesn't leak existence
+        self._dummy_hash = hash_password('dummy-password', bcrypt_rounds).encode('utf-8')
+
+        if collection is not None:
+            try:
+                collection.create_index('username', unique=True)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create users index: {e}")
+
+    # ---------- storage ----------
+
+    def _load_file(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_file(self, users):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(users, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _fetch(self, username):
+        if usable(self.collection):
+            try:
+                return self.collection.find_one({'username': username}, {'_id': 0})
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB user lookup failed: {e}. Falling back to file.")
+        return self._load_file().get(username)
+
+    def _update_hash(self, username, password_hash):
+        if usable(self.collection):
+            try:
+                self.collection.update_one({'username': username}, {'$set': {'password_hash': password_hash}})
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB user update failed: {e}. Falling back to file.")
+        defer_write(self.collection, 'update_one', {'username': username},
+                    {'$set': {'password_hash': password_hash}})
+        with file_lock(self.path + '.lock', self._file_lock):
+            users = self._load_file()
+            if username in users:
+                users[username]['password_hash'] = password_hash
+                self._save_file(users)
+
+    def seed(self, accounts):
+        """
+        Create any missing accounts from {username: {password, role, id}}
+        (plus optional SCOPE_FIELDS).
+
+        Existing accounts keep their passwords; only scope fields they lack
+        are added.
+        """
+        if usable(self.collection):
+            try:
+                existing = {doc['username'] for doc in self.collection.find(
+                    {'username': {'$in': list(accounts)}}, {'username': 1})}
+                for username, account in accounts.items():
+                    if username in existing:
+                        for field in SCOPE_FIELDS:
+                            if account.get(field):
+                                self.collection.update_one(
+                                    {'username': username, field: {'$exists': False}},
+                                    {'$set': {field: account[field]}}
+                                )
+                        continue
+                    self.collection.update_one(
+                        {'username': username},
+                        {'$setOnInsert': self._record(username, account)},
+                        upsert=True
+                    )
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB user seed failed: {e}. Falling back to file.")
+
+        with file_lock(self.path + '.lock', self._file_lock):
+            users = self._load_file()
+            changed = False
+            for username, account in accounts.items():
+                if username not in users:
+                    users[username] = self._record(username, account)
+                    changed = True
+                    continue
+                for field in SCOPE_FIELDS:
+                    if account.get(field) and field not in users[username]:
+                        users[username][field] = account[field]
+                        changed = True
+            if changed:
+                self._save_file(users)
+        # Replayed once MongoDB is back; $setOnInsert keeps accounts that exist there
+        for username in accounts:
+            defer_write(self.collection, 'update_one', {'username': username},
+                        {'$setOnInsert': users[username]}, upsert=True)
+
+    def _record(self, username, account):
+        record = {
+            'username': username,
+            'password_hash': hash_password(account['password'], self.bcrypt_rounds),
+            'role': account['role'],
+            'id': account['id']
+        }
+        record.update((field, account[field]) for field in SCOPE_FIELDS if account.get(field))
+        return record
+
+    # ---------- lookups ----------
+
+    def get(self, username):
+        """Return the account record (cached for cache_ttl seconds) or None."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(username)
+            if cached and cached[1] > now:
+                return cached[0]
+
+        user = self._fetch(username)
+        with self._lock:
+            if len(self._cache) > 10000:
+                self._cache.clear()
+            self._cache[username] = (user, now + self.cache_ttl)
+        return user
+
+    def invalidate(self, username=None):
+        with self._lock:
+            if username is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(username, None)
+
+    # ---------- password checks ----------
+
+    def authenticate(self, username, password):
+        """Return the account if the password matches, else None."""
+        user = self.get(username)
+        stored = (user or {}).get('password_hash')
+        candidate = stored.encode('utf-8') if stored else self._dummy_hash
+        matched = bcrypt.checkpw(password.encode('utf-8'), candidate)
+        if not user or not stored or not matched:
+            return None
+
+        if (_hash_rounds(stored) or 0) < self.bcrypt_rounds:
+            try:
+                self._update_hash(username, hash_password(password, self.bcrypt_rounds))
+                self.invalidate(username)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not upgrade password hash for {username}: {e}")
+        return user
@@ -16,85 +16,18 @@ from datetime import datetime
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from data_context import open_data_context
+from intent_router import whatsapp_reply
 
 app = FastAPI(title="WhatsApp Bot Demo Interface")
 
+# Live employee/transfer/login counts quoted in the replies
+data_context = open_data_context(ttl=int(os.getenv('CHATBOT_DATA_TTL', 30)))
+
 # Mock the process_user_message function if not imported
 def process_user_message(user_message: str) -> str:
     """Process user message and return appropriate response"""
-    
-    if user_message in ["hello", "hi", "hey", "start"]:
-        return (
-            "👋 *Welcome to 3U1 Integrated Management System!*\n\n"
-            "🏫 Your complete Employee Management solution for educational institutions.\n\n"
-            "✨ *Available Features:*\n"
-            "• Employee records & transfers\n"
-            "• School & district management\n"
-            "• Real-time analytics\n"
-            "• Security monitoring\n\n"
-            "Type *'help'* to see available commands! 🚀"
-        )
-    
-    elif user_message in ["report", "reports", "stats", "statistics"]:
-        return (
-            "📊 *3U1 IMS System Report*\n"
-            "━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            "👥 *Employee Statistics:*\n"
-            "• Total Employees: 1,247\n"
-            "• Active Staff: 1,198\n"
-            "• New Hires This Month: 23\n\n"
-            "🏫 *School Management:*\n"
-            "• Total Schools: 89\n"
-            "• Pending Approvals: 2\n"
-            "• Zones: 15 across 5 districts\n\n"
-            "🔄 *Transfer Updates:*\n"
-            "• Pending Transfers: 12\n"
-            "• Completed This Month: 156\n"
-            "• Staff Updates: 5 new postings\n\n"
-            "✅ All systems operational!"
-        )
-    
-    elif user_message in ["leave", "leaves", "apply leave", "leave request"]:
-        return (
-            "📝 *Leave Management System*\n"
-            "━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            "✅ *Demo Leave Request Recorded!*\n\n"
-            "📋 *Leave Types Available:*\n"
-            "• Sick Leave: 12 days/year\n"
-            "• Casual Leave: 8 days/year\n"
-            "• Maternity Leave: 180 days\n"
-            "• Paternity Leave: 15 days\n\n"
-            "⏱️ *Processing Time:* 24-48 hours\n"
-            "📧 *Status Updates:* Via SMS & Email\n\n"
-            "🔗 Use the web dashboard for detailed leave management!"
-        )
-    
-    elif user_message in ["help", "commands", "menu", "options"]:
-        return (
-            "🤖 *3U1 IMS WhatsApp Bot Commands*\n"
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            "💬 *Available Commands:*\n\n"
-            "🔸 *hello* - Welcome message & system info\n"
-            "🔸 *report* - View system statistics\n"
-            "🔸 *leave* - Leave management demo\n"
-            "🔸 *help* - Show this menu\n\n"
-            "🌐 *Full System Access:*\n"
-            "Visit the web dashboard for complete functionality!\n\n"
-            "📞 *Support:* Type any command to get started!"
-        )
-    
-    else:
-        return (
-            "❓ *Command Not Recognized*\n"
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            f"I didn't understand: *'{user_message}'*\n\n"
-            "🤖 *Try these commands:*\n"
-            "• *hello* - Get started\n"
-            "• *report* - System statistics\n"
-            "• *leave* - Leave management\n"
-            "• *help* - Full command list\n\n"
-            "💡 Type *'help'* for all available options!"
-        )
+    return whatsapp_reply(user_message, data_context)
 
 @app.get("/", response_class=HTMLResponse)
 async def demo_interface():